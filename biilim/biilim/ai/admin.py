@@ -1,3 +1,21 @@
 from django.contrib import admin
 
-# Register your models here.
+from .models import AICallLog
+
+
+@admin.register(AICallLog)
+class AICallLogAdmin(admin.ModelAdmin):
+    list_display = [
+        "created_at",
+        "endpoint",
+        "call_type",
+        "model",
+        "prompt_tokens",
+        "output_tokens",
+        "latency_ms",
+        "cache_hit",
+        "error",
+    ]
+    list_filter = ["call_type", "endpoint", "cache_hit"]
+    raw_id_fields = ["user"]
+    date_hierarchy = "created_at"
@@ -1,18 +1,35 @@
+import json
 import logging
 import os
-import json
 import re
+from functools import lru_cache
+from typing import TYPE_CHECKING
+from typing import Optional
+
+from celery.exceptions import SoftTimeLimitExceeded
 from django.conf import settings
-from typing import List, Optional
-from pydantic import BaseModel, ValidationError
-from smolagents import CodeAgent, LiteLLMModel
+from pydantic import BaseModel
+from pydantic import ValidationError
+
+from biilim.ai.call_log import AICall
+from biilim.ai.providers import TRANSIENT_STATUS_CODES
+from biilim.ai.resilience import CircuitBreaker
+from biilim.ai.resilience import CircuitOpenError
+from biilim.ai.resilience import call_deadline
+from biilim.core import metrics
+
+if TYPE_CHECKING:
+    from smolagents import CodeAgent
+    from smolagents import LiteLLMModel
 
 logger = logging.getLogger(__name__)
 
 # --- Configuration ---
-# Ensure GEMINI_API_KEY is set in your Django settings
-os.environ.setdefault("GEMINI_API_KEY", settings.GEMINI_API_KEY)
+# smolagents and litellm are heavy to import and only needed by the visual helpers, so
+# they are imported on the first agent run instead of in every web and Celery worker.
 CHAT_MODEL_FOR_AGENTS = "gemini/gemini-2.0-flash" # Or gemini-1.5-pro for more complex code generation
+# Description of the fallback animation returned when generation fails
+ANIMATION_ERROR_DESCRIPTION = "Error generating animation."
 
 # --- New Pydantic Schema for Combined HTML Output ---
 class AnimationSchema(BaseModel):
@@ -21,19 +38,39 @@ class AnimationSchema(BaseModel):
     description: str = "An animated visualization for the student."
 
 # --- The Agent Itself ---
-llm_model = LiteLLMModel(
-    model_id=CHAT_MODEL_FOR_AGENTS,
-    api_key=settings.GEMINI_API_KEY,
-    num_ctx=8192, # Context window size
-)
-
-# The agent now has no tools, as it's a direct code generation task
-visual_agent = CodeAgent(
-    name="HTMLAnimationGenerator",
-    tools=[], # No tools needed for this direct generation task
-    model=llm_model,
-    max_steps=1, # Allow for multiple steps of reasoning if needed
-)
+@lru_cache(maxsize=1)
+def get_agent_model() -> "LiteLLMModel":
+    """Build the LiteLLM model shared by all agent runs of this process on first use."""
+    from smolagents import LiteLLMModel  # noqa: PLC0415
+
+    # Ensure GEMINI_API_KEY is set in your Django settings
+    if settings.GEMINI_API_KEY:
+        os.environ.setdefault("GEMINI_API_KEY", settings.GEMINI_API_KEY)
+    return LiteLLMModel(
+        model_id=CHAT_MODEL_FOR_AGENTS,
+        api_key=settings.GEMINI_API_KEY,
+        num_ctx=8192, # Context window size
+        # Passed on to litellm, bounds each model call
+        timeout=call_deadline("animation"),
+    )
+
+
+def get_visual_agent() -> "CodeAgent":
+    """
+    Return an agent for one animation run.
+
+    A ``CodeAgent`` keeps the memory of its current run, so concurrent requests each
+    get their own; building one is cheap once the shared model exists.
+    """
+    from smolagents import CodeAgent  # noqa: PLC0415
+
+    # The agent now has no tools, as it's a direct code generation task
+    return CodeAgent(
+        name="HTMLAnimationGenerator",
+        tools=[], # No tools needed for this direct generation task
+        model=get_agent_model(),
+        max_steps=1, # Allow for multiple steps of reasoning if needed
+    )
 
 # --- Public function to invoke the agent ---
 def get_html_animation_for_topic(topic_title: str, topic_description: str, user_profile: dict, section_title: Optional[str] = None) -> AnimationSchema:
@@ -86,10 +123,10 @@ def get_html_animation_for_topic(topic_title: str, topic_description: str, user_
     """
     
     logger.info("Invoking smolagents agent for HTML animation...")
+    call = AICall(CHAT_MODEL_FOR_AGENTS, "animation")
     try:
-        # Run the agent with the detailed prompt
-        response_text = visual_agent.run(prompt_instruction)
-        
+        response_text = _run_visual_agent(prompt_instruction, call)
+
         # The agent returns the final answer as a string, which we need to parse.
         # It's possible the agent might wrap the JSON in markdown code blocks, so we need to extract it.
         json_match = re.search(r"```json\n(.*)\n```", response_text, re.DOTALL)
@@ -101,10 +138,90 @@ def get_html_animation_for_topic(topic_title: str, topic_description: str, user_
         parsed_response = AnimationSchema.model_validate_json(json_str)
         return parsed_response
     except ValidationError as e:
+        call.error = type(e).__name__
         logger.error(f"Failed to validate AI response for HTML animation: {e.errors()}")
         # Return a fallback object with a simple error message
-        return AnimationSchema(full_html_code="<p>Failed to generate a valid animation code. Please try again.</p>", description="Error generating animation.")
+        return AnimationSchema(
+            full_html_code=(
+                "<p>Failed to generate a valid animation code. Please try again.</p>"
+            ),
+            description=ANIMATION_ERROR_DESCRIPTION,
+        )
+    except CircuitOpenError as e:
+        call.error = type(e).__name__
+        logger.warning("Skipping the HTML animation agent: %s", e)
+        return AnimationSchema(
+            full_html_code=(
+                "<p>Animations are unavailable right now. "
+                "Please try again in a minute.</p>"
+            ),
+            description=ANIMATION_ERROR_DESCRIPTION,
+        )
+    except SoftTimeLimitExceeded as e:
+        # Not the agent's fault: the Celery task retries it
+        call.error = type(e).__name__
+        raise
     except Exception as e:
-        logger.error(f"Error invoking smolagents agent for HTML animation: {e}")
+        call.error = type(e).__name__
+        logger.exception("Error invoking smolagents agent for HTML animation")
         # Return a fallback object with a simple error message
-        return AnimationSchema(full_html_code="<p>An unexpected error occurred while generating the animation.</p>", description="Error generating animation.")
+        return AnimationSchema(
+            full_html_code=(
+                "<p>An unexpected error occurred while generating the animation.</p>"
+            ),
+            description=ANIMATION_ERROR_DESCRIPTION,
+        )
+    finally:
+        call.save()
+
+
+def _run_visual_agent(prompt: str, call: AICall) -> str:
+    """
+    Run the visual agent, recording the outcome of its Gemini calls on the breaker.
+
+    The agent calls Gemini through litellm, so it shares the circuit of the Gemini
+    provider.
+    A run is not retried: it is slow, and the student can simply ask again. Only the
+    timeouts and transient errors of litellm count as failures, never a bug of ours.
+    """
+    breaker = CircuitBreaker.from_settings("gemini")
+    breaker.before_call()
+    agent = get_visual_agent()
+    try:
+        response_text = call.counted(agent.run)(prompt)
+    except Exception as e:
+        upstream_error = _upstream_error(e)
+        if upstream_error is not None and _is_transient(upstream_error):
+            breaker.record_failure()
+            metrics.incr("llm.animation.unavailable")
+        elif upstream_error is not None:
+            # Gemini answered, it is healthy; the call itself is at fault
+            breaker.record_success()
+        raise
+    finally:
+        token_usage = agent.monitor.get_total_token_counts()
+        call.add_usage(token_usage.input_tokens, token_usage.output_tokens)
+    breaker.record_success()
+    return response_text
+
+
+def _upstream_error(error: BaseException) -> BaseException | None:
+    """The timeout or litellm error behind an agent failure, chained as its cause."""
+    # A litellm dependency; litellm errors subclass its ones. Loaded by the agent run.
+    import openai  # noqa: PLC0415
+
+    cause: BaseException | None = error
+    while cause is not None:
+        if isinstance(cause, TimeoutError | openai.APIError):
+            return cause
+        cause = cause.__cause__
+    return None
+
+
+def _is_transient(error: BaseException) -> bool:
+    import openai  # noqa: PLC0415
+
+    # litellm's Timeout is an APIConnectionError
+    return isinstance(error, TimeoutError | openai.APIConnectionError) or (
+        getattr(error, "status_code", None) in TRANSIENT_STATUS_CODES
+    )
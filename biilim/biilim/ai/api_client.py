@@ -1,21 +1,18 @@
 import logging
-from django.conf import settings
 from pydantic import BaseModel as PydanticBaseModel
-import json
+from collections.abc import AsyncGenerator
 
-from google import genai
+from asgiref.sync import sync_to_async
+
+from biilim.ai.providers import get_provider
+from biilim.ai.resilience import LLMError
 from biilim.users.models import Profile
 from biilim.learn.models import Topic
-from biilim.learn.models import ChatMessage
+from biilim.learn.chat_context import build_chat_context
 
 logger = logging.getLogger(__name__)
 
 
-def get_local_development_api_response(file_name="gemini_topic"):
-    with open(f"{settings.APPS_DIR}/ai/example_responses/{file_name}.json", "r") as file:
-        
-        return json.load(file)
-
 def get_topic_prompt(user_profile: Profile, topic_query: str) -> str:
     """
     Generate a highly structured prompt for the Gemini API to create a topic.
@@ -73,27 +70,27 @@ def get_topic_prompt(user_profile: Profile, topic_query: str) -> str:
     
     return prompt
 
-def gemini_generate_topic(user_profile: Profile, prompt: str, response_schema: PydanticBaseModel, model: str = "gemini-2.0-flash"):
+def generate_topic_json(
+    user_profile: Profile,
+    prompt: str,
+    response_schema: type[PydanticBaseModel],
+) -> str:
     """
-    Generates a topic using the Gemini API based on a structured prompt.
+    Generates a topic with the configured LLM provider based on a structured prompt.
+
+    Returns:
+        str: The topic as JSON text following ``response_schema``.
+
+    Raises:
+        LLMError: When the LLM failed to answer.
     """
-    # if settings.DEBUG:
-    #     logger.info("Using local development API response for gemini_generate_topic")
-    #     return get_local_development_api_response("topic")
-    client = genai.Client(api_key=settings.GEMINI_API_KEY)
-    
     # Use the new structured prompt function
     structured_prompt = get_topic_prompt(user_profile, prompt)
-    
-    response = client.models.generate_content(
-        model=model,
-        contents=structured_prompt,
-        config={
-            "response_mime_type": "application/json",
-            "response_schema": response_schema,
-        },
+    return get_provider().generate_json(
+        structured_prompt,
+        response_schema,
+        call_type="topic",
     )
-    return response.text
 
 
 def get_explanation_evaluation_prompt(user_explanation: str, topic_data: dict, profile_data: dict) -> str:
@@ -155,17 +152,33 @@ def get_explanation_evaluation_prompt(user_explanation: str, topic_data: dict, p
     return prompt
 
 
-def evaluate_student_explanation(user_message: str, topic: Topic, profile: Profile) -> str:
+def get_profile_data(profile: Profile) -> dict:
+    """Return the profile fields used to personalize prompts."""
+    return {
+        "age": profile.age,
+        "city": profile.city,
+        "country": profile.country,
+        "cultural_background": profile.cultural_background,
+        "hobbies": profile.hobbies,
+        "learning_styles": profile.learning_styles,
+    }
+
+
+def get_explanation_evaluation_prompt_for(
+    user_message: str,
+    topic: Topic,
+    profile: Profile,
+) -> str:
     """
-    Evaluates a student's explanation of a topic and provides feedback.
-    
+    Build the explanation evaluation prompt for a student's explanation of ``topic``.
+
     Args:
         user_message (str): The student's explanation message.
         topic (Topic): The topic being discussed.
         profile (Profile): The student's profile data.
-    
+
     Returns:
-        str: The AI's feedback on the student's explanation.
+        str: The formatted prompt for the Gemini API.
     """
     # Prepare topic data for the prompt
     topic_sections_list = [
@@ -177,37 +190,50 @@ def evaluate_student_explanation(user_message: str, topic: Topic, profile: Profi
         "description": topic.description,
         "sections": topic_sections_list,
     }
+    return get_explanation_evaluation_prompt(
+        user_message,
+        topic_data,
+        get_profile_data(profile),
+    )
 
-    # Prepare profile data for the prompt
-    profile_data = {
-        "age": profile.age,
-        "city": profile.city,
-        "country": profile.country,
-        "cultural_background": profile.cultural_background,
-        "hobbies": profile.hobbies,
-        "learning_styles": profile.learning_styles,
-    }
 
-    # Construct the structured prompt
-    structured_prompt = get_explanation_evaluation_prompt(user_message, topic_data, profile_data)
+def evaluate_student_explanation(
+    user_message: str,
+    topic: Topic,
+    profile: Profile,
+) -> str:
+    """
+    Evaluates a student's explanation of a topic and provides feedback.
 
-    # Initialize Gemini client (ensure settings.GEMINI_API_KEY is configured)
-    client = genai.Client(api_key=settings.GEMINI_API_KEY)
+    Args:
+        user_message (str): The student's explanation message.
+        topic (Topic): The topic being discussed.
+        profile (Profile): The student's profile data.
+
+    Returns:
+        str: The AI's feedback on the student's explanation.
+    """
+    structured_prompt = get_explanation_evaluation_prompt_for(
+        user_message,
+        topic,
+        profile,
+    )
 
     try:
-        # Call Gemini API
-        response = client.models.generate_content(
-            model="gemini-2.0-flash", # Or gemini-1.5-pro for more complex reasoning
-            contents=structured_prompt,
-            # No response_schema here as we want a plain string feedback
-        )
-        return response.text
-    except Exception as e:
-        logger.error(f"Error calling Gemini API for explanation evaluation: {e}")
+        # Plain string feedback, no response schema
+        return get_provider().generate_text(structured_prompt, call_type="explanation")
+    except LLMError:
+        logger.exception("Error calling the LLM for explanation evaluation")
         return "I'm sorry, I couldn't evaluate your explanation right now. Please try again later!"
 
 
-def get_chat_prompt(user_message: str, topic_data: dict, profile_data: dict, chat_history: list[dict]) -> str:
+def get_chat_prompt(
+    user_message: str,
+    topic_data: dict,
+    profile_data: dict,
+    chat_history: list[dict],
+    summary: str = "",
+) -> str:
     """
     Generates a structured prompt for the Gemini API to handle general chat.
     
@@ -218,6 +244,7 @@ def get_chat_prompt(user_message: str, topic_data: dict, profile_data: dict, cha
         topic_data (dict): A dictionary containing the topic's title and description.
         profile_data (dict): A dictionary containing the student's profile information.
         chat_history (list[dict]): A list of past chat messages.
+        summary (str): A summary of the conversation before ``chat_history``.
         
     Returns:
         str: The formatted prompt for the Gemini API.
@@ -228,6 +255,8 @@ def get_chat_prompt(user_message: str, topic_data: dict, profile_data: dict, cha
         history_str = "\n".join([f"{msg['sender'].capitalize()}: {msg['message_text']}" for msg in chat_history])
     else:
         history_str = "No prior chat history for this topic."
+    if summary:
+        history_str = f"Summary of the earlier conversation: {summary}\n\n{history_str}"
 
     prompt = f"""
     You are an expert AI study buddy. Your goal is to have a helpful, friendly, and contextual conversation with a student.
@@ -265,18 +294,18 @@ def get_chat_prompt(user_message: str, topic_data: dict, profile_data: dict, cha
     return prompt
 
 
-def chat_with_student(user_message: str, topic: Topic, profile: Profile) -> str:
+def get_chat_prompt_for(user_message: str, topic: Topic, profile: Profile) -> str:
     """
-    Handles a chat interaction with a student about a specific topic,
-    including the conversation history for context.
-    
+    Build the chat prompt for ``user_message``, including the recent conversation
+    history and a summary of the older part.
+
     Args:
         user_message (str): The student's message.
         topic (Topic): The topic being discussed.
         profile (Profile): The student's profile data.
-    
+
     Returns:
-        str: The AI's response to the student's message.
+        str: The formatted prompt for the Gemini API.
     """
     # Prepare topic data for the prompt
     topic_data = {
@@ -284,43 +313,192 @@ def chat_with_student(user_message: str, topic: Topic, profile: Profile) -> str:
         "description": topic.description,
     }
 
-    # Prepare profile data for the prompt
-    profile_data = {
-        "age": profile.age,
-        "city": profile.city,
-        "country": profile.country,
-        "cultural_background": profile.cultural_background,
-        "hobbies": profile.hobbies,
-        "learning_styles": profile.learning_styles,
-    }
+    # Only the recent turns and a summary of older ones, within the token budget
+    context = build_chat_context(profile.user, topic)
 
-    # Fetch chat history from the database
-    # IMPORTANT FIX: Convert the QuerySet to a list before slicing
-    chat_history_queryset = ChatMessage.objects.filter(
-        user=profile.user,
-        topic=topic,
-    ).exclude(
-        chat_type__in=["explanation_submission", "evaluation_feedback"]
-    ).order_by('created_at').values('sender', 'message_text')
-    
-    # Convert to a list to allow standard Python slicing with negative indices
-    chat_history_list = list(chat_history_queryset)
-    
-    # Exclude the most recent message (which is the user's current message)
-    formatted_history = chat_history_list[:-1] 
+    return get_chat_prompt(
+        user_message,
+        topic_data,
+        get_profile_data(profile),
+        context.history,
+        context.summary,
+    )
 
-    # Construct the structured prompt
-    structured_prompt = get_chat_prompt(user_message, topic_data, profile_data, formatted_history)
 
-    client = genai.Client(api_key=settings.GEMINI_API_KEY)
+def chat_with_student(user_message: str, topic: Topic, profile: Profile) -> str:
+    """
+    Handles a chat interaction with a student about a specific topic,
+    including the conversation history for context.
+
+    Args:
+        user_message (str): The student's message.
+        topic (Topic): The topic being discussed.
+        profile (Profile): The student's profile data.
+
+    Returns:
+        str: The AI's response to the student's message.
+    """
+    structured_prompt = get_chat_prompt_for(user_message, topic, profile)
 
     try:
-        response = client.models.generate_content(
-            model="gemini-2.0-flash", 
-            contents=structured_prompt,
-        )
-        return response.text
-    except Exception as e:
-        logger.error(f"Error calling Gemini API for general chat with history: {e}")
+        return get_provider().generate_text(structured_prompt, call_type="chat")
+    except LLMError:
+        logger.exception("Error calling the LLM for general chat with history")
         return "I'm sorry, I couldn't respond to that right now. Please try again later!"
 
+
+def summarize_chat(
+    previous_summary: str,
+    messages: list[dict],
+    topic: Topic,
+    max_tokens: int,
+) -> str:
+    """
+    Fold chat messages into the running summary of a conversation.
+
+    Args:
+        previous_summary (str): The current summary; empty for a new one.
+        messages (list[dict]): Messages to add, oldest first, with ``sender`` and
+            ``message_text``.
+        topic (Topic): The topic being discussed.
+        max_tokens (int): Upper bound for the length of the new summary.
+
+    Returns:
+        str: The updated summary.
+    """
+    transcript = "\n".join(
+        f"{msg['sender'].capitalize()}: {msg['message_text']}" for msg in messages
+    )
+    prompt = f"""
+    You maintain a running summary of a conversation between a student and an AI
+    study buddy about **{topic.title}**.
+
+    ### Current Summary
+    {previous_summary or "The conversation has just started."}
+
+    ### New Messages
+    {transcript}
+
+    ### Instructions
+    Rewrite the summary so it also covers the new messages. Keep the student's
+    questions, what was explained, misconceptions that came up and anything the
+    student said about themselves. Write plain prose in the language of the
+    conversation, without markdown, in no more than {max_tokens} tokens.
+    """
+    return (
+        get_provider()
+        .generate_text(prompt, call_type="summary", max_output_tokens=max_tokens)
+        .strip()
+    )
+
+
+def generate_supplementary_material(
+    topic: Topic,
+    style: str,
+    style_prompt: str,
+) -> str:
+    """
+    Generate the material for one learning style from a topic's supplementary prompt.
+
+    Args:
+        topic (Topic): The topic the material supports.
+        style (str): The learning style, e.g. ``"kinesthetic"`` or ``"real_world"``.
+        style_prompt (str): The style-specific instruction generated with the topic.
+
+    Returns:
+        str: The material, as plain text for the student.
+    """
+    prompt = f"""
+    You are an expert AI study buddy preparing supplementary material for the topic
+    **{topic.title}**.
+    Topic description: {topic.description}
+
+    The material is for a student whose preferred learning style is **{style}**.
+    Follow this instruction:
+    {style_prompt}
+
+    Address the student directly with clear, numbered steps where it helps. Keep it
+    under 300 words and do not use markdown formatting beyond what's necessary for
+    readability.
+    """
+    return get_provider().generate_text(prompt, call_type="material").strip()
+
+
+def get_student_reply_prompt_for(
+    user_message: str,
+    topic: Topic,
+    profile: Profile,
+    chat_type: str,
+) -> tuple[str, str]:
+    """
+    Build the prompt of the AI's reply to a student's chat message or explanation.
+
+    Reads the chat context from the database.
+
+    Args:
+        user_message (str): The student's message.
+        topic (Topic): The topic being discussed.
+        profile (Profile): The student's profile data.
+        chat_type (str): ``"explanation"`` to evaluate an explanation, anything else
+            to chat.
+
+    Returns:
+        tuple[str, str]: The prompt and the reply to show when the LLM call fails.
+    """
+    if chat_type == "explanation":
+        structured_prompt = get_explanation_evaluation_prompt_for(
+            user_message,
+            topic,
+            profile,
+        )
+        fallback = (
+            "I'm sorry, I couldn't evaluate your explanation right now. "
+            "Please try again later!"
+        )
+    else:
+        structured_prompt = get_chat_prompt_for(user_message, topic, profile)
+        fallback = (
+            "I'm sorry, I couldn't respond to that right now. Please try again later!"
+        )
+    return structured_prompt, fallback
+
+
+async def astream_student_reply(
+    user_message: str,
+    topic: Topic,
+    profile: Profile,
+    chat_type: str,
+) -> AsyncGenerator[str]:
+    """
+    Stream the AI's reply to a student's chat message or explanation as it is generated.
+
+    The prompt is built in a thread, the response is awaited on the event loop.
+
+    Args:
+        user_message (str): The student's message.
+        topic (Topic): The topic being discussed.
+        profile (Profile): The student's profile data.
+        chat_type (str): ``"explanation"`` to evaluate an explanation, anything
+            else to chat.
+
+    Yields:
+        str: Consecutive pieces of the AI's response text.
+    """
+    structured_prompt, fallback = await sync_to_async(get_student_reply_prompt_for)(
+        user_message,
+        topic,
+        profile,
+        chat_type,
+    )
+    streamed = False
+    try:
+        call_type = "explanation" if chat_type == "explanation" else "chat"
+        stream = get_provider().stream_text(structured_prompt, call_type=call_type)
+        async for text in stream:
+            streamed = True
+            yield text
+    except LLMError:
+        logger.exception("Error streaming LLM response for %s", chat_type)
+        # Keep a partially streamed answer rather than appending an apology to it
+        if not streamed:
+            yield fallback
@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class AiConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'biilim.ai'
+
+    def ready(self):
+        from biilim.ai import signals  # noqa: F401, PLC0415
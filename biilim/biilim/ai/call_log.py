@@ -0,0 +1,197 @@
+"""
+Token and latency accounting of every AI call.
+
+Each provider call and agent run is measured by an ``AICall`` and saved as one
+``AICallLog`` row: model, prompt and output tokens, latency, attempts, whether the
+response cache answered, the error of a failed call, and where the call came from. The
+same observation is recorded as the ``ai_call.<call_type>`` timing of ``core.metrics``,
+whose log line is the structured stream of the calls.
+
+The origin (view or task, and user) is read from a context variable:
+``AICallOriginMiddleware`` sets it to the request, whose resolved view is the endpoint,
+and it is set to the task name for Celery tasks. It stays set after the view returned,
+so streamed responses are attributed to their view too. ``call_origin`` narrows it, e.g.
+to a user.
+The ``ai_call_stats`` command rolls the rows up per endpoint and day.
+"""
+
+import time
+from collections.abc import AsyncGenerator
+from collections.abc import Callable
+from collections.abc import Iterator
+from contextlib import aclosing
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import sync_to_async
+
+from biilim.ai.models import AICallLog
+from biilim.core import metrics
+
+
+class CallOrigin:
+    """Where AI calls come from: a view or task name, and the user."""
+
+    def __init__(self, endpoint: str = "", user_id: int | None = None):
+        self._endpoint = endpoint
+        self._user_id = user_id
+
+    @property
+    def endpoint(self) -> str:
+        return self._endpoint
+
+    @property
+    def user_id(self) -> int | None:
+        return self._user_id
+
+
+class RequestOrigin(CallOrigin):
+    """
+    The view and user of a request. Both are only looked up when a call is saved: the
+    origin is set before the URL is resolved and the user authenticated.
+    """
+
+    def __init__(self, request):
+        super().__init__()
+        self._request = request
+
+    @property
+    def endpoint(self) -> str:
+        resolver_match = getattr(self._request, "resolver_match", None)
+        return resolver_match.view_name if resolver_match is not None else ""
+
+    @property
+    def user_id(self) -> int | None:
+        user = getattr(self._request, "user", None)
+        return user.pk if user is not None and user.is_authenticated else None
+
+
+_NO_ORIGIN = CallOrigin()
+
+_origin: ContextVar[CallOrigin | None] = ContextVar("ai_call_origin", default=None)
+
+
+def current_origin() -> CallOrigin:
+    """Return the view or task and user AI calls are currently attributed to."""
+    return _origin.get() or _NO_ORIGIN
+
+
+def set_call_origin(origin: CallOrigin) -> None:
+    """Attribute the AI calls of the current request or task to ``origin``."""
+    _origin.set(origin)
+
+
+@contextmanager
+def call_origin(
+    endpoint: str | None = None,
+    user_id: int | None = None,
+) -> Iterator[None]:
+    """Attribute the AI calls of the block to ``endpoint`` and ``user_id`` if given."""
+    current = current_origin()
+    token = _origin.set(
+        CallOrigin(
+            endpoint=endpoint or current.endpoint,
+            user_id=user_id if user_id is not None else current.user_id,
+        ),
+    )
+    try:
+        yield
+    finally:
+        _origin.reset(token)
+
+
+class AICall:
+    """
+    Measures one AI call from its creation until ``save``.
+
+    Backends report the tokens of each request with ``add_usage``; requests are counted
+    by the attempts wrapped in ``counted``. A call without attempts or error was
+    answered by the response cache.
+    """
+
+    def __init__(self, model: str, call_type: str):
+        self.model = model
+        self.call_type = call_type
+        self.origin = current_origin()
+        self.prompt_tokens: int | None = None
+        self.output_tokens: int | None = None
+        self.attempts = 0
+        self.error = ""
+        self._started = time.perf_counter()
+
+    def restart(self) -> None:
+        """Measure the latency from now on, e.g. when a stream starts to be consumed."""
+        self._started = time.perf_counter()
+
+    def counted[T](self, attempt: Callable[..., T]) -> Callable[..., T]:
+        """Wrap a function making one LLM request, to count the attempts of the call."""
+
+        def counted_attempt(*args, **kwargs):
+            self.attempts += 1
+            return attempt(*args, **kwargs)
+
+        return counted_attempt
+
+    def add_usage(self, prompt_tokens: int | None, output_tokens: int | None) -> None:
+        """Add the tokens of one LLM request; ``None`` when the backend omits them."""
+        if prompt_tokens is not None:
+            self.prompt_tokens = (self.prompt_tokens or 0) + prompt_tokens
+        if output_tokens is not None:
+            self.output_tokens = (self.output_tokens or 0) + output_tokens
+
+    @property
+    def cache_hit(self) -> bool:
+        return self.attempts == 0 and not self.error
+
+    def save(self) -> AICallLog:
+        latency_ms = (time.perf_counter() - self._started) * 1000
+        metrics.timing(
+            f"ai_call.{self.call_type}",
+            latency_ms,
+            endpoint=self.origin.endpoint or "-",
+            model=self.model,
+            prompt_tokens=self.prompt_tokens,
+            output_tokens=self.output_tokens,
+            cache_hit=self.cache_hit,
+            error=self.error or "-",
+        )
+        return AICallLog.objects.create(
+            endpoint=self.origin.endpoint,
+            user_id=self.origin.user_id,
+            call_type=self.call_type,
+            model=self.model,
+            prompt_tokens=self.prompt_tokens,
+            output_tokens=self.output_tokens,
+            latency_ms=round(latency_ms),
+            cache_hit=self.cache_hit,
+            attempts=self.attempts,
+            error=self.error[:60],
+        )
+
+
+@contextmanager
+def log_call(model: str, call_type: str) -> Iterator[AICall]:
+    """Measure the AI call made in the block and save it, also when it fails."""
+    call = AICall(model, call_type)
+    try:
+        yield call
+    except Exception as e:
+        call.error = type(e).__name__
+        raise
+    finally:
+        call.save()
+
+
+async def alog_stream(call: AICall, stream: AsyncGenerator[str]) -> AsyncGenerator[str]:
+    """Stream ``stream`` and save ``call`` once it ended, failed or was closed early."""
+    call.restart()
+    try:
+        async with aclosing(stream):
+            async for piece in stream:
+                yield piece
+    except BaseException as e:
+        # GeneratorExit when the client went away before the end
+        call.error = type(e).__name__
+        raise
+    finally:
+        await sync_to_async(call.save)()
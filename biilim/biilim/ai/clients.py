@@ -0,0 +1,215 @@
+"""
+Process-wide Gemini client with HTTP connection pooling.
+
+``google-genai`` opens a brand new ``requests.Session`` for every request, which
+throws away HTTP keep-alive and TLS sessions. The client returned by
+``get_gemini_client`` sends every request through one pooled session per process
+instead. The client is rebuilt after ``fork()`` so gunicorn and Celery prefork
+workers never share sockets with their parent process.
+
+Async calls (``client.aio``) go through one ``httpx.AsyncClient`` per event loop
+instead of ``google-genai``'s default of running the blocking call in a thread, so an
+ASGI worker can wait on many LLM responses at once without a thread per response.
+"""
+
+import asyncio
+import json
+import os
+import threading
+import weakref
+
+import httpx
+import requests
+from django.conf import settings
+from google import genai
+from google.genai import errors
+from google.genai._api_client import ApiClient
+from google.genai._api_client import HttpResponse
+from requests.adapters import HTTPAdapter
+
+_lock = threading.Lock()
+_client: genai.Client | None = None
+_client_pid: int | None = None
+_async_http_clients: weakref.WeakKeyDictionary = weakref.WeakKeyDictionary()
+
+
+class _PooledApiClient(ApiClient):
+    """``ApiClient`` reusing a shared ``requests.Session`` for API key calls."""
+
+    def __init__(self, *, session: requests.Session, connect_timeout: float, **kwargs):
+        super().__init__(**kwargs)
+        self._session = session
+        self._connect_timeout = connect_timeout
+
+    def _request_unauthorized(self, http_request, stream=False):  # noqa: FBT002
+        data = None
+        if http_request.data:
+            data = (
+                http_request.data
+                if isinstance(http_request.data, bytes)
+                else json.dumps(http_request.data)
+            )
+
+        response = self._session.request(
+            method=http_request.method,
+            url=http_request.url,
+            headers=http_request.headers,
+            data=data,
+            timeout=(self._connect_timeout, http_request.timeout),
+            stream=stream,
+        )
+        errors.APIError.raise_for_response(response)
+        return HttpResponse(response.headers, response if stream else [response.text])
+
+    async def _async_request(self, http_request, stream=False):  # noqa: FBT002
+        if self.vertexai:
+            return await super()._async_request(http_request, stream=stream)
+
+        data = None
+        if http_request.data:
+            data = (
+                http_request.data
+                if isinstance(http_request.data, bytes)
+                else json.dumps(http_request.data)
+            )
+
+        client = _get_async_http_client()
+        request = client.build_request(
+            method=http_request.method,
+            url=http_request.url,
+            headers=http_request.headers,
+            content=data,
+            timeout=httpx.Timeout(http_request.timeout, connect=self._connect_timeout),
+        )
+        response = await client.send(request, stream=stream)
+        if response.status_code != httpx.codes.OK:
+            await response.aread()
+            await response.aclose()
+            errors.APIError.raise_for_response(_ErrorResponse(response))
+        if stream:
+            return _AsyncStreamedResponse(response)
+        return HttpResponse(response.headers, [response.text])
+
+
+class _AsyncStreamedResponse(HttpResponse):
+    """Server-sent JSON chunks of a streamed ``httpx`` response, read asynchronously."""
+
+    def __init__(self, response: httpx.Response):
+        super().__init__(response.headers)
+        self._response = response
+
+    def __aiter__(self):
+        return self._segments()
+
+    async def _segments(self):
+        try:
+            async for line in self._response.aiter_lines():
+                if line:
+                    yield json.loads(line.removeprefix("data: "))
+        finally:
+            # Also runs when the consumer stops early, to release the connection
+            await self._response.aclose()
+
+
+class _ErrorResponse:
+    """The parts of an ``httpx`` error response that ``errors.APIError`` reads."""
+
+    def __init__(self, response: httpx.Response):
+        self.status_code = response.status_code
+        try:
+            self.body_segments = [response.json()]
+        except ValueError:
+            self.body_segments = [
+                {"error": {"message": response.text, "status": response.reason_phrase}},
+            ]
+
+
+def _get_async_http_client() -> httpx.AsyncClient:
+    # Connections belong to the event loop that opened them: under ASGI that is the
+    # worker's loop, under WSGI each async view runs in a short-lived loop of its own
+    loop = asyncio.get_running_loop()
+    client = _async_http_clients.get(loop)
+    if client is None:
+        client = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=settings.GEMINI_ASYNC_MAX_CONNECTIONS,
+                max_keepalive_connections=settings.GEMINI_POOL_MAXSIZE,
+            ),
+        )
+        _async_http_clients[loop] = client
+    return client
+
+
+class _PooledClient(genai.Client):
+    """``genai.Client`` whose API client shares one pooled HTTP session."""
+
+    def __init__(self, *, session: requests.Session, connect_timeout: float, **kwargs):
+        self._session = session
+        self._connect_timeout = connect_timeout
+        super().__init__(**kwargs)
+
+    def _get_api_client(self, debug_config=None, **kwargs):
+        return _PooledApiClient(
+            session=self._session,
+            connect_timeout=self._connect_timeout,
+            **kwargs,
+        )
+
+
+def _build_session() -> requests.Session:
+    session = requests.Session()
+    adapter = HTTPAdapter(
+        pool_connections=1,
+        pool_maxsize=settings.GEMINI_POOL_MAXSIZE,
+    )
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def build_gemini_client() -> genai.Client:
+    """Build a new pooled Gemini client from the ``GEMINI_*`` settings."""
+    http_options = {"timeout": settings.GEMINI_TIMEOUT}
+    if settings.GEMINI_BASE_URL:
+        http_options["base_url"] = settings.GEMINI_BASE_URL
+    return _PooledClient(
+        api_key=settings.GEMINI_API_KEY,
+        http_options=http_options,
+        session=_build_session(),
+        connect_timeout=settings.GEMINI_CONNECT_TIMEOUT,
+    )
+
+
+def get_gemini_client() -> genai.Client:
+    """
+    Return the Gemini client shared by the current process.
+
+    Returns:
+        genai.Client: A client whose HTTP connections are pooled and kept alive.
+    """
+    global _client, _client_pid  # noqa: PLW0603
+    pid = os.getpid()
+    if _client is None or _client_pid != pid:
+        with _lock:
+            if _client is None or _client_pid != pid:
+                _client = build_gemini_client()
+                _client_pid = pid
+    return _client
+
+
+def reset_gemini_client() -> None:
+    """Drop the shared client, e.g. after settings changed or in a forked child."""
+    global _client, _client_pid  # noqa: PLW0603
+    _client = None
+    _client_pid = None
+
+
+def _reinit_after_fork() -> None:
+    global _lock, _async_http_clients  # noqa: PLW0603
+    _lock = threading.Lock()
+    _async_http_clients = weakref.WeakKeyDictionary()
+    reset_gemini_client()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reinit_after_fork)
@@ -0,0 +1,139 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db.models import Aggregate
+from django.db.models import Count
+from django.db.models import FloatField
+from django.db.models import Q
+from django.db.models import Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from biilim.ai.models import AICallLog
+
+TOKENS_PER_PRICE_UNIT = 1_000_000
+
+
+def call_cost(
+    model: str,
+    prompt_tokens: int | None,
+    output_tokens: int | None,
+) -> float:
+    """The USD cost of a call in ``LLM_TOKEN_PRICES``; 0 for models without a price."""
+    # Agent calls go through litellm, which prefixes the provider, e.g.
+    # "gemini/gemini-2.0-flash"
+    prompt_price, output_price = settings.LLM_TOKEN_PRICES.get(
+        model.split("/")[-1],
+        (0, 0),
+    )
+    return (
+        (prompt_tokens or 0) * prompt_price + (output_tokens or 0) * output_price
+    ) / TOKENS_PER_PRICE_UNIT
+
+
+class PercentileCont(Aggregate):
+    """Postgres ``percentile_cont``: the interpolated ``fraction`` percentile."""
+
+    function = "PERCENTILE_CONT"
+    template = "%(function)s(%(fraction)s) WITHIN GROUP (ORDER BY %(expressions)s)"
+    output_field = FloatField()
+
+    def __init__(self, expression, fraction: float, **extra):
+        super().__init__(expression, fraction=float(fraction), **extra)
+
+
+class Command(BaseCommand):
+    """
+    Roll the ``AICallLog`` rows up per day and endpoint: calls, response cache hits,
+    errors, tokens, p50/p95 latency (over all calls, cache hits included) and the cost
+    from ``LLM_TOKEN_PRICES``.
+
+    The database aggregates the rows, so only one row per day, endpoint and model is
+    loaded however many calls were logged.
+    """
+
+    help = "Shows AI calls, tokens, p50/p95 latency and cost per endpoint per day."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--days",
+            type=int,
+            default=7,
+            help="Days to report, today included.",
+        )
+        parser.add_argument(
+            "--delete-older-than",
+            type=int,
+            metavar="DAYS",
+            help="Delete the calls logged more than DAYS days ago first.",
+        )
+
+    def handle(self, *args, **options):
+        now = timezone.now()
+        if options["delete_older_than"] is not None:
+            deleted, _ = AICallLog.objects.filter(
+                created_at__lt=now - timedelta(days=options["delete_older_than"]),
+            ).delete()
+            self.stdout.write(f"Deleted {deleted} calls")
+
+        since = timezone.localtime(now).replace(
+            hour=0,
+            minute=0,
+            second=0,
+            microsecond=0,
+        ) - timedelta(
+            days=options["days"] - 1,
+        )
+        calls = AICallLog.objects.filter(created_at__gte=since).annotate(
+            day=TruncDate("created_at"),
+        )
+        stats = (
+            calls.values("day", "endpoint")
+            .annotate(
+                calls=Count("pk"),
+                cached=Count("pk", filter=Q(cache_hit=True)),
+                errors=Count("pk", filter=~Q(error="")),
+                p50=PercentileCont("latency_ms", 0.5),
+                p95=PercentileCont("latency_ms", 0.95),
+            )
+            .order_by("day", "endpoint")
+        )
+        # Prices are per model, so tokens are summed per model and priced here
+        tokens = calls.values("day", "endpoint", "model").annotate(
+            prompt=Sum("prompt_tokens", default=0),
+            output=Sum("output_tokens", default=0),
+        )
+
+        groups = {}
+        for row in stats:
+            groups[row["day"], row["endpoint"] or "-"] = {
+                **row,
+                "prompt": 0,
+                "output": 0,
+                "cost": 0.0,
+            }
+        for row in tokens:
+            group = groups[row["day"], row["endpoint"] or "-"]
+            group["prompt"] += row["prompt"]
+            group["output"] += row["output"]
+            group["cost"] += call_cost(row["model"], row["prompt"], row["output"])
+
+        if not groups:
+            self.stdout.write("No AI calls logged")
+            return
+
+        current_day = None
+        total_cost = 0.0
+        for (day, endpoint), group in groups.items():
+            if day != current_day:
+                self.stdout.write(self.style.MIGRATE_HEADING(day.isoformat()))
+                current_day = day
+            total_cost += group["cost"]
+            self.stdout.write(
+                f"  {endpoint:<32} calls={group['calls']} cached={group['cached']} "
+                f"errors={group['errors']} "
+                f"tokens={group['prompt']}/{group['output']} p50={group['p50']:.0f}ms "
+                f"p95={group['p95']:.0f}ms cost=${group['cost']:.4f}",
+            )
+        self.stdout.write(self.style.SUCCESS(f"Total cost: ${total_cost:.4f}"))
@@ -0,0 +1,87 @@
+import logging
+import statistics
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.test import override_settings
+from google import genai
+
+from biilim.ai.clients import build_gemini_client
+from biilim.ai.stub_server import run_stub_server
+
+
+class Command(BaseCommand):
+    """
+    Compare per-call latency of a fresh ``genai.Client`` per call against the shared,
+    pooled client, using a local stub of the Gemini API.
+    """
+
+    help = "Benchmarks a new Gemini client per call against the pooled shared client."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--calls", type=int, default=50, help="Calls per scenario.")
+        parser.add_argument(
+            "--latency-ms",
+            type=float,
+            default=5,
+            help="Simulated generation time per request.",
+        )
+        parser.add_argument(
+            "--handshake-ms",
+            type=float,
+            default=30,
+            help="Simulated connection setup (TCP + TLS) cost.",
+        )
+
+    def handle(self, *args, **options):
+        # google-genai logs every call at INFO level through the root logger
+        logging.disable(logging.INFO)
+        with (
+            run_stub_server(
+                latency=options["latency_ms"] / 1000,
+                handshake_latency=options["handshake_ms"] / 1000,
+            ) as server,
+            override_settings(
+                GEMINI_BASE_URL=server.base_url,
+                GEMINI_API_KEY=settings.GEMINI_API_KEY or "stub",
+            ),
+        ):
+            http_options = {"base_url": server.base_url}
+            scenarios = {
+                "new client per call": lambda: genai.Client(
+                    api_key="stub",
+                    http_options=http_options,
+                ),
+                "shared pooled client": self._shared(build_gemini_client()),
+            }
+            for name, get_client in scenarios.items():
+                connections_before = server.connections
+                timings = self._run(get_client, options["calls"])
+                self._report(name, timings, server.connections - connections_before)
+
+    @staticmethod
+    def _shared(client):
+        return lambda: client
+
+    @staticmethod
+    def _run(get_client, calls: int) -> list[float]:
+        timings = []
+        for _ in range(calls):
+            started = time.perf_counter()
+            get_client().models.generate_content(
+                model="gemini-2.0-flash",
+                contents="ping",
+            )
+            timings.append((time.perf_counter() - started) * 1000)
+        return timings
+
+    def _report(self, name: str, timings: list[float], connections: int):
+        p95 = (
+            statistics.quantiles(timings, n=20)[-1] if len(timings) > 1 else timings[0]
+        )
+        self.stdout.write(
+            f"{name:<22} calls={len(timings)} connections={connections} "
+            f"mean={statistics.mean(timings):.1f}ms "
+            f"p50={statistics.median(timings):.1f}ms p95={p95:.1f}ms",
+        )
@@ -0,0 +1,149 @@
+import json
+import os
+import subprocess
+import sys
+
+from django.core.management.base import BaseCommand
+from django.core.management.base import CommandError
+
+# Runs in a fresh interpreter: what a gunicorn or Celery worker imports before serving
+# its first request, i.e. Django itself, the URLconf (all views) and the task modules.
+COLD_START_SCRIPT = """
+import importlib, json, resource, sys, time
+started = time.perf_counter()
+import django
+django.setup()
+from django.conf import settings
+for module in [settings.ROOT_URLCONF, *sys.argv[1:]]:
+    importlib.import_module(module)
+print(json.dumps({
+    "ms": (time.perf_counter() - started) * 1000,
+    "rss_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+    "modules": sorted(sys.modules),
+}))
+"""
+
+
+class Command(BaseCommand):
+    """
+    Measure the cold-start import time and memory of a worker process with
+    ``python -X importtime`` and fail when it regresses past the given limits.
+    """
+
+    help = (
+        "Benchmarks worker cold-start import time and RSS, optionally failing on "
+        "regressions."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--import",
+            dest="modules",
+            action="append",
+            default=None,
+            help=(
+                "Module imported after the URLconf. Repeatable. "
+                "Defaults to biilim.learn.tasks."
+            ),
+        )
+        parser.add_argument(
+            "--runs",
+            type=int,
+            default=3,
+            help="Cold starts to take the best of.",
+        )
+        parser.add_argument(
+            "--top",
+            type=int,
+            default=10,
+            help="Slowest imports to list.",
+        )
+        parser.add_argument(
+            "--max-ms",
+            type=float,
+            help="Fail when the cold start takes longer.",
+        )
+        parser.add_argument(
+            "--max-rss-mb",
+            type=float,
+            help="Fail when the peak RSS is higher.",
+        )
+        parser.add_argument(
+            "--forbid",
+            action="append",
+            default=None,
+            help=(
+                "Top-level package that must not be imported at start-up. "
+                "Defaults to smolagents and litellm."
+            ),
+        )
+
+    def handle(self, *args, **options):
+        modules = options["modules"] or ["biilim.learn.tasks"]
+        forbidden = options["forbid"] or ["smolagents", "litellm"]
+
+        runs = [self._cold_start(modules) for _ in range(options["runs"])]
+        best = min(runs, key=lambda run: run["ms"])
+        rss_mb = best["rss_kb"] / 1024
+
+        self.stdout.write(
+            f"cold start: {best['ms']:.0f}ms (best of {len(runs)}), "
+            f"peak RSS {rss_mb:.1f}MB",
+        )
+        self.stdout.write("slowest imports (cumulative):")
+        for name, cumulative_us in best["slowest"][: options["top"]]:
+            self.stdout.write(f"  {cumulative_us / 1000:>8.1f}ms  {name}")
+
+        failures: list[str] = []
+        loaded = {module.split(".")[0] for module in best["modules"]}
+        failures.extend(
+            f"{package} is imported at start-up"
+            for package in forbidden
+            if package in loaded
+        )
+        if options["max_ms"] is not None and best["ms"] > options["max_ms"]:
+            failures.append(
+                f"cold start took {best['ms']:.0f}ms, "
+                f"the limit is {options['max_ms']:.0f}ms",
+            )
+        if options["max_rss_mb"] is not None and rss_mb > options["max_rss_mb"]:
+            failures.append(
+                f"peak RSS is {rss_mb:.1f}MB, "
+                f"the limit is {options['max_rss_mb']:.1f}MB",
+            )
+        if failures:
+            raise CommandError("; ".join(failures))
+
+    @staticmethod
+    def _cold_start(modules: list[str]) -> dict:
+        result = subprocess.run(  # noqa: S603
+            [sys.executable, "-X", "importtime", "-c", COLD_START_SCRIPT, *modules],
+            capture_output=True,
+            text=True,
+            env=os.environ.copy(),
+            check=False,
+        )
+        if result.returncode:
+            msg = f"Cold start failed:\n{result.stderr[-2000:]}"
+            raise CommandError(msg)
+
+        run = json.loads(result.stdout.strip().splitlines()[-1])
+        run["slowest"] = _top_level_imports(result.stderr)
+        return run
+
+
+def _top_level_imports(importtime_output: str) -> list[tuple[str, int]]:
+    """
+    Parse ``-X importtime`` output into the (module, cumulative microseconds) of the
+    top-level imports, slowest first.
+    """
+    imports = []
+    for line in importtime_output.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _self_us, cumulative_us, name = line.removeprefix("import time:").split("|", 2)
+        # Nested imports are indented below the import that triggered them
+        if not cumulative_us.strip().isdigit() or name.startswith("  "):
+            continue
+        imports.append((name.strip(), int(cumulative_us)))
+    return sorted(imports, key=lambda item: item[1], reverse=True)
@@ -0,0 +1,41 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from biilim.core import metrics
+
+COUNTERS = ["hit_local", "hit_shared", "miss", "stored", "bytes_stored", "bytes_served"]
+
+
+class Command(BaseCommand):
+    """Report the LLM response cache hit rate and sizes per call type."""
+
+    help = "Shows LLM response cache hits, misses and cached bytes per call type."
+
+    def handle(self, *args, **options):
+        for call_type in settings.LLM_RESPONSE_CACHE_TTLS:
+            names = [f"llm_cache.{call_type}.{counter}" for counter in COUNTERS]
+            counters = dict(
+                zip(COUNTERS, metrics.get_counters(*names).values(), strict=True),
+            )
+            hits = counters["hit_local"] + counters["hit_shared"]
+            total = hits + counters["miss"]
+            hit_rate = (hits / total) * 100 if total > 0 else 0
+            average_size = (
+                counters["bytes_stored"] / counters["stored"]
+                if counters["stored"]
+                else 0
+            )
+
+            self.stdout.write(self.style.MIGRATE_HEADING(call_type))
+            self.stdout.write(f"Lookups: {total}")
+            self.stdout.write(
+                f"Hits (LLM calls saved): {hits} ({counters['hit_local']} in-process)",
+            )
+            self.stdout.write(f"Misses (LLM calls): {counters['miss']}")
+            self.stdout.write(
+                f"Stored: {counters['stored']} responses, "
+                f"{counters['bytes_stored']} bytes",
+            )
+            self.stdout.write(f"Average response size: {average_size:.0f} bytes")
+            self.stdout.write(f"Served from cache: {counters['bytes_served']} bytes")
+            self.stdout.write(self.style.SUCCESS(f"Hit rate: {hit_rate:.1f}%"))
@@ -0,0 +1,49 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from biilim.ai.providers import PROVIDERS
+from biilim.ai.resilience import CLOSED
+from biilim.ai.resilience import CircuitBreaker
+from biilim.core import metrics
+
+CIRCUIT_COUNTERS = ["failed", "opened", "closed", "rejected"]
+CALL_COUNTERS = ["retried", "deadline_exceeded", "unavailable"]
+
+
+class Command(BaseCommand):
+    """
+    Report the circuit breaker state of each LLM backend and the retries and failures
+    per call type, to tell a degraded upstream from a busy one.
+    """
+
+    help = "Shows LLM circuit breaker states, retries and failed calls."
+
+    def handle(self, *args, **options):
+        for name in PROVIDERS:
+            breaker = CircuitBreaker.from_settings(name)
+            state = breaker.state()
+            counters = metrics.get_counters(
+                *(f"circuit.{name}.{counter}" for counter in CIRCUIT_COUNTERS),
+            )
+
+            self.stdout.write(self.style.MIGRATE_HEADING(f"circuit {name}"))
+            style = self.style.SUCCESS if state == CLOSED else self.style.ERROR
+            self.stdout.write(style(f"State: {state}"))
+            for counter in CIRCUIT_COUNTERS:
+                self.stdout.write(
+                    f"{counter.capitalize()}: {counters[f'circuit.{name}.{counter}']}",
+                )
+
+        for call_type in settings.LLM_CALL_DEADLINES:
+            counters = metrics.get_counters(
+                *(f"llm.{call_type}.{counter}" for counter in CALL_COUNTERS),
+            )
+            self.stdout.write(self.style.MIGRATE_HEADING(call_type))
+            self.stdout.write(f"Deadline: {settings.LLM_CALL_DEADLINES[call_type]}s")
+            self.stdout.write(f"Retries: {counters[f'llm.{call_type}.retried']}")
+            self.stdout.write(
+                f"Deadline exceeded: {counters[f'llm.{call_type}.deadline_exceeded']}",
+            )
+            self.stdout.write(
+                f"Out of retries: {counters[f'llm.{call_type}.unavailable']}",
+            )
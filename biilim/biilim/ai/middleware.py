@@ -0,0 +1,32 @@
+from asgiref.sync import iscoroutinefunction
+from asgiref.sync import markcoroutinefunction
+
+from biilim.ai.call_log import RequestOrigin
+from biilim.ai.call_log import set_call_origin
+
+
+class AICallOriginMiddleware:
+    """
+    Attribute the AI calls of each request to its view and user, see ``ai.call_log``.
+
+    The origin is set before the view is called, in the context of the request, so the
+    middleware is sync and async capable without a ``process_view`` hop to a thread.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        set_call_origin(RequestOrigin(request))
+        return self.get_response(request)
+
+    async def __acall__(self, request):
+        set_call_origin(RequestOrigin(request))
+        return await self.get_response(request)
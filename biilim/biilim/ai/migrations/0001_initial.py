@@ -0,0 +1,38 @@
+# Generated by Django 5.1.11 on 2026-10-17 07:30
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AICallLog',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('endpoint', models.CharField(blank=True, max_length=100)),
+                ('call_type', models.CharField(max_length=30)),
+                ('model', models.CharField(max_length=60)),
+                ('prompt_tokens', models.PositiveIntegerField(blank=True, help_text='Empty when unknown', null=True)),
+                ('output_tokens', models.PositiveIntegerField(blank=True, help_text='Empty when unknown', null=True)),
+                ('latency_ms', models.PositiveIntegerField()),
+                ('cache_hit', models.BooleanField(default=False)),
+                ('attempts', models.PositiveSmallIntegerField(default=0, help_text='LLM requests made, including retries')),
+                ('error', models.CharField(blank=True, help_text='Exception class of a failed call', max_length=60)),
+                ('user', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['created_at'], name='ai_aicalllog_created')],
+            },
+        ),
+    ]
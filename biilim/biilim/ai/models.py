@@ -1,3 +1,54 @@
 from django.db import models
 
-# Create your models here.
+
+class AICallLog(models.Model):
+    """
+    One LLM call or agent run, written by ``ai.call_log``.
+
+    Kept compact, one narrow row per call, so every call can be recorded; see the
+    ``ai_call_stats`` command for the daily rollup.
+    """
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    # The view name (e.g. "learn:hx-chat-stream") or Celery task the call comes from
+    endpoint = models.CharField(max_length=100, blank=True)
+    user = models.ForeignKey(
+        "users.User",
+        on_delete=models.SET_NULL,
+        related_name="+",
+        null=True,
+        blank=True,
+    )
+    call_type = models.CharField(max_length=30)
+    model = models.CharField(max_length=60)
+    prompt_tokens = models.PositiveIntegerField(
+        null=True,
+        blank=True,
+        help_text="Empty when unknown",
+    )
+    output_tokens = models.PositiveIntegerField(
+        null=True,
+        blank=True,
+        help_text="Empty when unknown",
+    )
+    latency_ms = models.PositiveIntegerField()
+    cache_hit = models.BooleanField(default=False)
+    attempts = models.PositiveSmallIntegerField(
+        default=0,
+        help_text="LLM requests made, including retries",
+    )
+    error = models.CharField(
+        max_length=60,
+        blank=True,
+        help_text="Exception class of a failed call",
+    )
+
+    class Meta:
+        ordering = ["-created_at"]
+        indexes = [
+            # The daily rollup and pruning
+            models.Index(fields=["created_at"], name="ai_aicalllog_created"),
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.call_type} {self.model} {self.latency_ms}ms"
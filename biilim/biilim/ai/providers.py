@@ -0,0 +1,455 @@
+"""
+LLM backends of the AI features.
+
+``get_provider`` returns the backend selected by the ``LLM_PROVIDER`` setting:
+
+- ``"gemini"``: the Gemini API, through the pooled client of ``ai.clients``.
+- ``"stub"``: replays the recorded responses in ``ai/example_responses`` after a
+  simulated latency, so benchmarks and capacity tests run offline and free of charge.
+
+Every backend offers the same three calls: ``generate_text``, ``generate_json`` (a
+response matching a pydantic schema) and ``stream_text``. Responses are cached per
+call type, see ``ai.response_cache``; calls that reach the LLM have a deadline, are
+retried and go through the backend's circuit breaker, see ``ai.resilience``. Every call
+is logged with its tokens and latency, see ``ai.call_log``.
+"""
+
+import asyncio
+import random
+import time
+from collections.abc import AsyncGenerator
+from functools import cache
+from pathlib import Path
+from typing import Any
+
+import httpx
+import requests
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from google.genai import errors
+from pydantic import BaseModel as PydanticBaseModel
+
+from biilim.ai.call_log import AICall
+from biilim.ai.call_log import alog_stream
+from biilim.ai.call_log import log_call
+from biilim.ai.clients import get_gemini_client
+from biilim.ai.resilience import CircuitBreaker
+from biilim.ai.resilience import astream_with_resilience
+from biilim.ai.resilience import call_with_resilience
+from biilim.ai.response_cache import acached_stream
+from biilim.ai.response_cache import cached_response
+from biilim.ai.response_cache import response_cache_key
+from biilim.learn.chat_context import estimate_tokens
+
+
+class LLMProvider:
+    """
+    Interface of an LLM backend.
+
+    The public calls answer from ``ai.response_cache`` when they can and otherwise
+    call the LLM through ``ai.resilience``; backends implement the underscored methods
+    that make one attempt within ``timeout`` seconds and report its token usage to
+    ``call``, and tell which of their errors are transient.
+    """
+
+    name: str
+    model: str
+
+    @classmethod
+    def from_settings(cls) -> "LLMProvider":
+        raise NotImplementedError
+
+    def generate_text(
+        self,
+        prompt: str,
+        *,
+        call_type: str,
+        max_output_tokens: int | None = None,
+        use_cache: bool = True,
+    ) -> str:
+        """
+        Generate a plain text response.
+
+        Args:
+            prompt (str): The prompt.
+            call_type (str): The kind of call, e.g. ``"chat"``; selects its cache TTL.
+            max_output_tokens (int | None): Upper bound for the length of the response.
+            use_cache (bool): ``False`` to always call the LLM.
+
+        Returns:
+            str: The response text.
+
+        Raises:
+            LLMError: When the LLM failed to answer, see ``ai.resilience``.
+        """
+        params = {"max_output_tokens": max_output_tokens} if max_output_tokens else {}
+        with log_call(self.model, call_type) as call:
+            return cached_response(
+                call_type,
+                response_cache_key(self.model, prompt, None, **params),
+                lambda: self._call(
+                    call,
+                    lambda timeout: self._generate_text(
+                        prompt,
+                        max_output_tokens=max_output_tokens,
+                        timeout=timeout,
+                        call=call,
+                    ),
+                ),
+                use_cache=use_cache,
+            )
+
+    def generate_json(
+        self,
+        prompt: str,
+        schema: type[PydanticBaseModel],
+        *,
+        call_type: str,
+        use_cache: bool = True,
+    ) -> str:
+        """
+        Generate a JSON response that follows ``schema``.
+
+        Args:
+            prompt (str): The prompt.
+            schema (type[PydanticBaseModel]): The schema the response must follow.
+            call_type (str): The kind of call, e.g. ``"topic"``; selects its cache TTL.
+            use_cache (bool): ``False`` to always call the LLM.
+
+        Returns:
+            str: The JSON text; callers validate it against ``schema``.
+
+        Raises:
+            LLMError: When the LLM failed to answer, see ``ai.resilience``.
+        """
+        with log_call(self.model, call_type) as call:
+            return cached_response(
+                call_type,
+                response_cache_key(self.model, prompt, schema),
+                lambda: self._call(
+                    call,
+                    lambda timeout: self._generate_json(
+                        prompt,
+                        schema,
+                        timeout=timeout,
+                        call=call,
+                    ),
+                ),
+                use_cache=use_cache,
+            )
+
+    def stream_text(
+        self,
+        prompt: str,
+        *,
+        call_type: str,
+        use_cache: bool = True,
+    ) -> AsyncGenerator[str]:
+        """
+        Stream a plain text response as it is generated.
+
+        Args:
+            prompt (str): The prompt.
+            call_type (str): The kind of call, e.g. ``"chat"``; selects its cache TTL.
+            use_cache (bool): ``False`` to always call the LLM.
+
+        Yields:
+            str: Consecutive pieces of the response text; a cached response arrives
+                in one piece.
+
+        Raises:
+            LLMError: When the LLM failed to answer, see ``ai.resilience``.
+        """
+        call = AICall(self.model, call_type)
+        stream = acached_stream(
+            call_type,
+            response_cache_key(self.model, prompt),
+            lambda: astream_with_resilience(
+                call.counted(
+                    lambda timeout: self._stream_text(
+                        prompt,
+                        timeout=timeout,
+                        call=call,
+                    ),
+                ),
+                call_type=call_type,
+                breaker=CircuitBreaker.from_settings(self.name),
+                is_transient=self.is_transient,
+                is_upstream_error=self.is_upstream_error,
+            ),
+            use_cache=use_cache,
+        )
+        return alog_stream(call, stream)
+
+    def is_upstream_error(self, error: Exception) -> bool:
+        """Whether ``error`` was reported by the backend, as opposed to a bug."""
+        return False
+
+    def is_transient(self, error: Exception) -> bool:
+        """Whether the backend may answer a retry of the call that raised ``error``."""
+        return False
+
+    def _call(self, call: AICall, attempt):
+        return call_with_resilience(
+            call.counted(attempt),
+            call_type=call.call_type,
+            breaker=CircuitBreaker.from_settings(self.name),
+            is_transient=self.is_transient,
+            is_upstream_error=self.is_upstream_error,
+        )
+
+    def _generate_text(
+        self,
+        prompt: str,
+        *,
+        max_output_tokens: int | None,
+        timeout: float,
+        call: AICall,
+    ) -> str:
+        raise NotImplementedError
+
+    def _generate_json(
+        self,
+        prompt: str,
+        schema: type[PydanticBaseModel],
+        *,
+        timeout: float,
+        call: AICall,
+    ) -> str:
+        raise NotImplementedError
+
+    def _stream_text(
+        self,
+        prompt: str,
+        *,
+        timeout: float,
+        call: AICall,
+    ) -> AsyncGenerator[str]:
+        raise NotImplementedError
+
+
+# Rate limited, or overloaded or failing upstream
+TRANSIENT_STATUS_CODES = {408, 429, 500, 502, 503, 504}
+
+
+class GeminiProvider(LLMProvider):
+    name = "gemini"
+
+    def __init__(self, model: str):
+        self.model = model
+
+    @classmethod
+    def from_settings(cls) -> "GeminiProvider":
+        return cls(model=settings.LLM_MODEL)
+
+    def is_upstream_error(self, error: Exception) -> bool:
+        return isinstance(
+            error,
+            errors.APIError | requests.RequestException | httpx.HTTPError,
+        )
+
+    def is_transient(self, error: Exception) -> bool:
+        if isinstance(error, errors.APIError):
+            return error.code in TRANSIENT_STATUS_CODES
+        return isinstance(
+            error,
+            requests.ConnectionError | requests.Timeout | httpx.TransportError,
+        )
+
+    def _generate_text(
+        self,
+        prompt: str,
+        *,
+        max_output_tokens: int | None,
+        timeout: float,
+        call: AICall,
+    ) -> str:
+        config: dict[str, Any] = {"http_options": _http_options(timeout)}
+        if max_output_tokens:
+            config["max_output_tokens"] = max_output_tokens
+        response = get_gemini_client().models.generate_content(
+            model=self.model,
+            contents=prompt,
+            config=config,
+        )
+        _add_usage(call, response.usage_metadata)
+        return response.text
+
+    def _generate_json(
+        self,
+        prompt: str,
+        schema: type[PydanticBaseModel],
+        *,
+        timeout: float,
+        call: AICall,
+    ) -> str:
+        response = get_gemini_client().models.generate_content(
+            model=self.model,
+            contents=prompt,
+            config={
+                "response_mime_type": "application/json",
+                "response_schema": schema,
+                "http_options": _http_options(timeout),
+            },
+        )
+        _add_usage(call, response.usage_metadata)
+        return response.text
+
+    async def _stream_text(
+        self,
+        prompt: str,
+        *,
+        timeout: float,  # noqa: ASYNC109
+        call: AICall,
+    ) -> AsyncGenerator[str]:
+        # Every chunk carries the usage so far, the last one the total
+        usage = None
+        try:
+            async for (
+                chunk
+            ) in await get_gemini_client().aio.models.generate_content_stream(
+                model=self.model,
+                contents=prompt,
+                config={"http_options": _http_options(timeout)},
+            ):
+                usage = chunk.usage_metadata or usage
+                if chunk.text:
+                    yield chunk.text
+        finally:
+            _add_usage(call, usage)
+
+
+class StubProvider(LLMProvider):
+    """
+    Replays recorded responses: ``text.txt`` for text, ``<schema>.json`` for JSON
+    (``topic.json`` for ``TopicSchema``).
+
+    Each response takes ``latency_ms`` plus or minus up to ``jitter_ms``, and streamed
+    words arrive ``chunk_latency_ms`` apart. The jitter is seeded with the prompt, so
+    a run with the same prompts is reproducible. A response slower than the time left
+    before its deadline times out, like a hung upstream would. Token usage is estimated
+    from the length of the prompt and response.
+    """
+
+    name = "stub"
+    model = "stub"
+
+    def __init__(
+        self,
+        responses_dir: Path,
+        latency_ms: float,
+        jitter_ms: float,
+        chunk_latency_ms: float,
+    ):
+        self.responses_dir = Path(responses_dir)
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.chunk_latency_ms = chunk_latency_ms
+
+    @classmethod
+    def from_settings(cls) -> "StubProvider":
+        return cls(
+            responses_dir=settings.LLM_STUB_RESPONSES_DIR,
+            latency_ms=settings.LLM_STUB_LATENCY,
+            jitter_ms=settings.LLM_STUB_JITTER,
+            chunk_latency_ms=settings.LLM_STUB_CHUNK_LATENCY,
+        )
+
+    def latency(self, prompt: str) -> float:
+        """The simulated seconds before the response to ``prompt`` or its first word."""
+        rng = random.Random(prompt)  # noqa: S311
+        jitter = rng.uniform(-self.jitter_ms, self.jitter_ms)
+        return max(0.0, self.latency_ms + jitter) / 1000
+
+    def _wait(self, prompt: str, timeout: float) -> None:
+        latency = self.latency(prompt)
+        time.sleep(min(latency, timeout))
+        if latency > timeout:
+            msg = f"The stub took longer than {timeout:.1f}s"
+            raise TimeoutError(msg)
+
+    def _generate_text(
+        self,
+        prompt: str,
+        *,
+        max_output_tokens: int | None,
+        timeout: float,
+        call: AICall,
+    ) -> str:
+        self._wait(prompt, timeout)
+        text = _read_recorded(self.responses_dir / "text.txt")
+        call.add_usage(estimate_tokens(prompt), estimate_tokens(text))
+        return text
+
+    def _generate_json(
+        self,
+        prompt: str,
+        schema: type[PydanticBaseModel],
+        *,
+        timeout: float,
+        call: AICall,
+    ) -> str:
+        self._wait(prompt, timeout)
+        name = schema.__name__.removesuffix("Schema").lower()
+        text = _read_recorded(self.responses_dir / f"{name}.json")
+        call.add_usage(estimate_tokens(prompt), estimate_tokens(text))
+        return text
+
+    async def _stream_text(
+        self,
+        prompt: str,
+        *,
+        timeout: float,  # noqa: ASYNC109
+        call: AICall,
+    ) -> AsyncGenerator[str]:
+        # ``astream_with_resilience`` enforces the deadline of the first word
+        await asyncio.sleep(self.latency(prompt))
+        text = _read_recorded(self.responses_dir / "text.txt")
+        call.add_usage(estimate_tokens(prompt), estimate_tokens(text))
+        words = text.split(" ")
+        for index, word in enumerate(words):
+            if index:
+                await asyncio.sleep(self.chunk_latency_ms / 1000)
+            yield word if index == len(words) - 1 else f"{word} "
+
+
+PROVIDERS: dict[str, type[LLMProvider]] = {
+    GeminiProvider.name: GeminiProvider,
+    StubProvider.name: StubProvider,
+}
+
+
+@cache
+def _read_recorded(path: Path) -> str:
+    return path.read_text()
+
+
+def _add_usage(call: AICall, usage_metadata) -> None:
+    if usage_metadata is not None:
+        call.add_usage(
+            usage_metadata.prompt_token_count,
+            usage_metadata.candidates_token_count,
+        )
+
+
+def _http_options(timeout: float) -> dict:
+    # Per-request timeout of google-genai, in milliseconds
+    return {"timeout": max(1, int(timeout * 1000))}
+
+
+def get_provider() -> LLMProvider:
+    """
+    Return the LLM backend selected by ``LLM_PROVIDER``.
+
+    Raises:
+        ImproperlyConfigured: When ``LLM_PROVIDER`` names no known backend.
+    """
+    try:
+        provider_class = PROVIDERS[settings.LLM_PROVIDER]
+    except KeyError:
+        msg = (
+            f"Unknown LLM_PROVIDER {settings.LLM_PROVIDER!r}, "
+            f"expected one of {sorted(PROVIDERS)}"
+        )
+        raise ImproperlyConfigured(msg) from None
+    return provider_class.from_settings()
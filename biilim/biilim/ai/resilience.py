@@ -0,0 +1,329 @@
+"""
+Deadlines, retries and a circuit breaker around every LLM call.
+
+Each call gets a deadline per call type (``LLM_CALL_DEADLINES``) that bounds all of its
+attempts together; every attempt is given the time that is left, so a hung socket can
+no longer hold a worker longer than the deadline. Errors the backend reports as
+transient (timeouts, dropped connections, ``429`` and ``5xx``) are retried up to
+``LLM_RETRY_ATTEMPTS`` times with full-jitter exponential backoff. Other errors of the
+backend are raised at once as ``LLMError``; anything else is a bug and propagates as is.
+
+A ``CircuitBreaker`` per backend opens after ``LLM_CIRCUIT_FAILURE_THRESHOLD``
+transient failures within ``LLM_CIRCUIT_FAILURE_WINDOW`` seconds. While it is open,
+calls fail immediately with ``CircuitOpenError``; after ``LLM_CIRCUIT_RESET_TIMEOUT``
+seconds a single probe call is let through and closes it again on success. Its state
+lives in the default cache, so all workers see the same circuit.
+
+``circuit.<name>.failed``, ``.opened``, ``.closed`` and ``.rejected`` and
+``llm.<call_type>.retried``, ``.deadline_exceeded`` and ``.unavailable`` counters are
+kept in ``core.metrics``; see the ``llm_resilience_stats`` command.
+"""
+
+import asyncio
+import logging
+import random
+import time
+from collections.abc import AsyncGenerator
+from collections.abc import Callable
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+
+from biilim.core import metrics
+
+logger = logging.getLogger(__name__)
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class LLMError(Exception):
+    """Raised when the LLM backend rejects a call."""
+
+
+class LLMUnavailableError(LLMError):
+    """Raised when the LLM did not answer in time, or every retry failed."""
+
+
+class CircuitOpenError(LLMUnavailableError):
+    """Raised without calling the LLM while its circuit breaker is open."""
+
+    def __init__(self, name: str, retry_after: float):
+        super().__init__(f"Circuit {name!r} is open, retry after {retry_after:.1f}s")
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker shared by all workers through the cache.
+
+    The circuit opens once ``failure_threshold`` transient failures happened within
+    ``failure_window`` seconds, whether or not successful calls came in between.
+
+    Args:
+        name (str): The name of the guarded upstream, e.g. ``"gemini"``.
+        failure_threshold (int): Transient failures within ``failure_window`` that open
+            the circuit.
+        failure_window (int): Seconds after which failures are forgotten.
+        reset_timeout (int): Seconds the circuit stays open before a probe call is let
+            through.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        failure_threshold: int,
+        failure_window: int,
+        reset_timeout: int,
+    ):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.failure_window = failure_window
+        self.reset_timeout = reset_timeout
+        self._failures_key = f"circuit:{name}:failures"
+        self._opened_at_key = f"circuit:{name}:opened_at"
+        self._probe_key = f"circuit:{name}:probe"
+
+    @classmethod
+    def from_settings(cls, name: str) -> "CircuitBreaker":
+        return cls(
+            name,
+            failure_threshold=settings.LLM_CIRCUIT_FAILURE_THRESHOLD,
+            failure_window=settings.LLM_CIRCUIT_FAILURE_WINDOW,
+            reset_timeout=settings.LLM_CIRCUIT_RESET_TIMEOUT,
+        )
+
+    def state(self) -> str:
+        """``"closed"``, ``"open"`` or ``"half_open"`` (a probe call may go through)."""
+        opened_at = cache.get(self._opened_at_key)
+        if opened_at is None:
+            return CLOSED
+        return OPEN if time.time() < opened_at + self.reset_timeout else HALF_OPEN
+
+    def before_call(self) -> None:
+        """
+        Check that a call may go through.
+
+        Raises:
+            CircuitOpenError: While the circuit is open, or half open with a probe
+                already running.
+        """
+        opened_at = cache.get(self._opened_at_key)
+        if opened_at is None:
+            return
+        retry_after = opened_at + self.reset_timeout - time.time()
+        # Half open: only the first caller probes the upstream, the others keep
+        # failing fast
+        if retry_after > 0 or not cache.add(
+            self._probe_key,
+            1,
+            timeout=self.reset_timeout,
+        ):
+            metrics.incr(f"circuit.{self.name}.rejected")
+            raise CircuitOpenError(self.name, max(retry_after, 1))
+
+    def record_success(self) -> None:
+        keys = [self._failures_key, self._opened_at_key, self._probe_key]
+        # Healthy calls only read: nothing is written unless a key is set
+        found = cache.get_many(keys)
+        if not found:
+            return
+        if self._opened_at_key in found:
+            metrics.incr(f"circuit.{self.name}.closed")
+            logger.warning("Circuit %r closed", self.name)
+        cache.delete_many(list(found))
+
+    def record_failure(self) -> None:
+        metrics.incr(f"circuit.{self.name}.failed")
+        cache.add(self._failures_key, 0, timeout=self.failure_window)
+        try:
+            failures = cache.incr(self._failures_key)
+        except ValueError:
+            # Expired between ``add`` and ``incr``
+            failures = 1
+        probing = cache.get(self._probe_key) is not None
+        if failures >= self.failure_threshold or probing:
+            # Stored without expiry: only a successful probe closes the circuit
+            cache.set(self._opened_at_key, time.time(), timeout=None)
+            cache.delete(self._probe_key)
+            metrics.incr(f"circuit.{self.name}.opened")
+            logger.warning("Circuit %r opened after %s failures", self.name, failures)
+
+
+def call_deadline(call_type: str) -> float:
+    """The seconds all attempts of a ``call_type`` call may take together."""
+    return settings.LLM_CALL_DEADLINES[call_type]
+
+
+def task_soft_time_limit(call_type: str) -> float:
+    """
+    The soft time limit of a Celery task making a ``call_type`` call.
+
+    It leaves the call its whole deadline, retries included, so the deadline rather
+    than Celery decides when a slow call gives up.
+    """
+    return call_deadline(call_type) + settings.LLM_TASK_TIME_LIMIT_MARGIN
+
+
+def backoff_delay(attempt: int) -> float:
+    """Full-jitter exponential backoff: a random delay up to ``base * 2 ** attempt``."""
+    ceiling = min(
+        settings.LLM_RETRY_MAX_DELAY,
+        settings.LLM_RETRY_BASE_DELAY * 2**attempt,
+    )
+    return random.uniform(0, ceiling)  # noqa: S311
+
+
+def call_with_resilience[T](
+    call: Callable[[float], T],
+    *,
+    call_type: str,
+    breaker: CircuitBreaker,
+    is_transient: Callable[[Exception], bool],
+    is_upstream_error: Callable[[Exception], bool],
+) -> T:
+    """
+    Call the LLM within the deadline of ``call_type``, retrying transient failures.
+
+    Args:
+        call (Callable[[float], T]): Makes one attempt; receives the seconds left
+            before the deadline.
+        call_type (str): The kind of call, selects its deadline in
+            ``LLM_CALL_DEADLINES``.
+        breaker (CircuitBreaker): The circuit breaker of the backend.
+        is_transient (Callable[[Exception], bool]): Whether an error is worth retrying.
+        is_upstream_error (Callable[[Exception], bool]): Whether an error was reported
+            by the backend.
+
+    Returns:
+        T: The result of the first successful attempt.
+
+    Raises:
+        CircuitOpenError: When the circuit breaker is open.
+        LLMUnavailableError: When the deadline passed or every attempt failed
+            transiently.
+        LLMError: When the backend rejected the call.
+    """
+    deadline = time.monotonic() + call_deadline(call_type)
+    attempt = 0
+    while True:
+        breaker.before_call()
+        try:
+            result = call(deadline - time.monotonic())
+        except Exception as e:  # noqa: BLE001
+            delay = _handle_failure(
+                e,
+                attempt,
+                deadline,
+                call_type,
+                breaker,
+                is_transient,
+                is_upstream_error,
+            )
+            time.sleep(delay)
+            attempt += 1
+            continue
+        breaker.record_success()
+        return result
+
+
+async def astream_with_resilience(
+    stream: Callable[[float], AsyncGenerator[str]],
+    *,
+    call_type: str,
+    breaker: CircuitBreaker,
+    is_transient: Callable[[Exception], bool],
+    is_upstream_error: Callable[[Exception], bool],
+) -> AsyncGenerator[str]:
+    """
+    Stream a response like ``call_with_resilience`` calls.
+
+    The deadline bounds the wait for the first piece, and attempts are only retried
+    until it arrives: a stream that fails later raises ``LLMUnavailableError``, since
+    the caller already received part of it. See ``call_with_resilience`` for the
+    arguments.
+    """
+    deadline = time.monotonic() + call_deadline(call_type)
+    attempt = 0
+    while True:
+        await sync_to_async(breaker.before_call)()
+        pieces = stream(deadline - time.monotonic())
+        try:
+            async with asyncio.timeout(max(0.0, deadline - time.monotonic())):
+                first = await anext(pieces, None)
+        except Exception as e:  # noqa: BLE001
+            await pieces.aclose()
+            error = (
+                TimeoutError(f"No response within the {call_type} deadline")
+                if isinstance(e, TimeoutError)
+                else e
+            )
+            delay = await sync_to_async(_handle_failure)(
+                error,
+                attempt,
+                deadline,
+                call_type,
+                breaker,
+                is_transient,
+                is_upstream_error,
+            )
+            await asyncio.sleep(delay)
+            attempt += 1
+            continue
+        break
+
+    try:
+        if first is not None:
+            yield first
+        async for piece in pieces:
+            yield piece
+    except Exception as e:
+        if not is_upstream_error(e):
+            raise
+        if is_transient(e):
+            await sync_to_async(breaker.record_failure)()
+        msg = f"{call_type} stream broke off: {e}"
+        raise LLMUnavailableError(msg) from e
+    finally:
+        await pieces.aclose()
+    await sync_to_async(breaker.record_success)()
+
+
+def _handle_failure(  # noqa: PLR0913
+    error: Exception,
+    attempt: int,
+    deadline: float,
+    call_type: str,
+    breaker: CircuitBreaker,
+    is_transient: Callable[[Exception], bool],
+    is_upstream_error: Callable[[Exception], bool],
+) -> float:
+    """
+    Record a failed attempt.
+
+    Returns the backoff before the next attempt, or raises when there is none.
+    """
+    timed_out = isinstance(error, TimeoutError)
+    if not timed_out and not is_upstream_error(error):
+        raise error
+    if not timed_out and not is_transient(error):
+        # The upstream answered, it is healthy; the call itself is at fault
+        breaker.record_success()
+        raise LLMError(str(error)) from error
+
+    breaker.record_failure()
+    delay = backoff_delay(attempt)
+    if time.monotonic() + delay >= deadline:
+        metrics.incr(f"llm.{call_type}.deadline_exceeded")
+        msg = f"{call_type} call exceeded its deadline: {error}"
+        raise LLMUnavailableError(msg) from error
+    if attempt + 1 >= settings.LLM_RETRY_ATTEMPTS:
+        metrics.incr(f"llm.{call_type}.unavailable")
+        msg = f"{call_type} call failed {attempt + 1} times: {error}"
+        raise LLMUnavailableError(msg) from error
+
+    metrics.incr(f"llm.{call_type}.retried")
+    logger.warning("Retrying %s call in %.2fs after: %s", call_type, delay, error)
+    return delay
@@ -0,0 +1,222 @@
+"""
+Content-addressed cache of LLM responses.
+
+Prompts are pure functions of their inputs, so a response is cached under a hash of
+the model, the prompt, the response schema and the generation parameters. Identical
+calls (retries, refreshes, the same explanation submitted twice) are answered without
+calling the LLM.
+
+Responses are kept in two tiers: a small in-process LRU for the hottest entries, and
+the default cache (Redis in production) shared by all workers. Each call type has its
+own TTL in ``LLM_RESPONSE_CACHE_TTLS``; call types missing there, such as creative
+calls whose variety is wanted, are never cached.
+
+Per call type, ``llm_cache.<call_type>.hit_local``, ``.hit_shared``, ``.miss``,
+``.stored``, ``.bytes_stored`` and ``.bytes_served`` counters are kept in
+``core.metrics``; see the ``llm_cache_stats`` command.
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import AsyncGenerator
+from collections.abc import Callable
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from pydantic import BaseModel as PydanticBaseModel
+
+from biilim.core import metrics
+
+# Bump when the cached value format or the key derivation changes
+LLM_RESPONSE_CACHE_VERSION = 1
+
+
+class _LocalLRU:
+    """Thread-safe in-process LRU of ``key -> (expires_at, text)``."""
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self._entries: OrderedDict[str, tuple[float, str]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> str | None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, text = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return text
+
+    def set(self, key: str, text: str, timeout: int | None) -> None:
+        if timeout is None:
+            # The call type is not cached
+            return
+        with self._lock:
+            self._entries[key] = (time.monotonic() + timeout, text)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+_local = _LocalLRU(maxsize=settings.LLM_RESPONSE_CACHE_LOCAL_SIZE)
+
+
+def response_cache_key(
+    model: str,
+    prompt: str,
+    schema: type[PydanticBaseModel] | None = None,
+    **params,
+) -> str:
+    """
+    Return the cache key of an LLM call.
+
+    Args:
+        model (str): The model answering the call.
+        prompt (str): The prompt.
+        schema (type[PydanticBaseModel] | None): The schema of a JSON response.
+        **params: Generation parameters that change the response, e.g.
+            ``max_output_tokens``.
+
+    Returns:
+        str: A key derived from a SHA-256 hash of all of the above.
+    """
+    content = json.dumps(
+        {
+            "model": model,
+            "prompt": prompt,
+            "schema": schema.model_json_schema() if schema else None,
+            "params": params,
+        },
+        sort_keys=True,
+    )
+    digest = hashlib.sha256(content.encode()).hexdigest()
+    return f"ai:llm_response:v{LLM_RESPONSE_CACHE_VERSION}:{digest}"
+
+
+def cache_timeout(call_type: str) -> int | None:
+    """The TTL of ``call_type`` in seconds, ``None`` when it is not cached."""
+    return settings.LLM_RESPONSE_CACHE_TTLS.get(call_type) or None
+
+
+def get_cached_response(call_type: str, key: str) -> str | None:
+    """
+    Return the cached response of ``key``, from the local tier first.
+
+    The hit or miss is counted per tier.
+    """
+    text = _local.get(key)
+    if text is not None:
+        _count_hit(call_type, "hit_local", text)
+        return text
+
+    text = cache.get(key)
+    if text is not None:
+        # Promote to the local tier, for at most the call type's TTL
+        _local.set(key, text, timeout=cache_timeout(call_type))
+        _count_hit(call_type, "hit_shared", text)
+        return text
+
+    metrics.incr(f"llm_cache.{call_type}.miss")
+    return None
+
+
+def set_cached_response(call_type: str, key: str, text: str) -> None:
+    """Store a response in both tiers for the TTL of ``call_type``."""
+    timeout = cache_timeout(call_type)
+    cache.set(key, text, timeout=timeout)
+    _local.set(key, text, timeout=timeout)
+    metrics.incr(f"llm_cache.{call_type}.stored")
+    metrics.incr(f"llm_cache.{call_type}.bytes_stored", len(text.encode()))
+
+
+def cached_response(
+    call_type: str,
+    key: str,
+    generate: Callable[[], str],
+    *,
+    use_cache: bool = True,
+) -> str:
+    """
+    Return the cached response of ``key``, or generate and cache it.
+
+    Args:
+        call_type (str): The kind of call, selects the TTL in
+            ``LLM_RESPONSE_CACHE_TTLS``.
+        key (str): The ``response_cache_key`` of the call.
+        generate (Callable[[], str]): Calls the LLM on a miss.
+        use_cache (bool): ``False`` to always call the LLM, e.g. when a new answer is
+            asked for.
+
+    Returns:
+        str: The response text.
+    """
+    if not use_cache or cache_timeout(call_type) is None:
+        return generate()
+
+    text = get_cached_response(call_type, key)
+    if text is None:
+        text = generate()
+        set_cached_response(call_type, key, text)
+    return text
+
+
+async def acached_stream(
+    call_type: str,
+    key: str,
+    stream: Callable[[], AsyncGenerator[str]],
+    *,
+    use_cache: bool = True,
+) -> AsyncGenerator[str]:
+    """
+    Stream the cached response of ``key`` in one piece, or from the LLM and cache it.
+
+    Only complete responses are cached; a stream that fails or is closed early is not.
+    See ``cached_response`` for the arguments.
+    """
+    if not use_cache or cache_timeout(call_type) is None:
+        async for text in stream():
+            yield text
+        return
+
+    cached = await sync_to_async(get_cached_response)(call_type, key)
+    if cached is not None:
+        yield cached
+        return
+
+    parts: list[str] = []
+    async for text in stream():
+        parts.append(text)
+        yield text
+    await sync_to_async(set_cached_response)(call_type, key, "".join(parts))
+
+
+def clear_local_cache() -> None:
+    """Empty the in-process tier, e.g. in tests or after ``fork()``."""
+    _local.clear()
+
+
+def _count_hit(call_type: str, tier: str, text: str) -> None:
+    metrics.incr(f"llm_cache.{call_type}.{tier}")
+    metrics.incr(f"llm_cache.{call_type}.bytes_served", len(text.encode()))
+
+
+def _reinit_after_fork() -> None:
+    global _local  # noqa: PLW0603
+    _local = _LocalLRU(maxsize=settings.LLM_RESPONSE_CACHE_LOCAL_SIZE)
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reinit_after_fork)
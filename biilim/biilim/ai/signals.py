@@ -0,0 +1,15 @@
+from celery.signals import task_postrun
+from celery.signals import task_prerun
+
+from biilim.ai.call_log import CallOrigin
+from biilim.ai.call_log import set_call_origin
+
+
+@task_prerun.connect
+def attribute_ai_calls_to_task(sender=None, task=None, **kwargs):
+    set_call_origin(CallOrigin(endpoint=task.name))
+
+
+@task_postrun.connect
+def reset_ai_call_origin(sender=None, task=None, **kwargs):
+    set_call_origin(CallOrigin())
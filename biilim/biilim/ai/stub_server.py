@@ -0,0 +1,117 @@
+"""
+Local HTTP server that imitates the Gemini ``generateContent`` and
+``streamGenerateContent`` endpoints.
+
+Used by benchmarks and tests to exercise the real Gemini client without network access
+or API costs. ``handshake_latency`` is paid once per new TCP connection (like a TLS
+handshake would be) and ``latency`` once per request (like model generation).
+"""
+
+import json
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler
+from http.server import ThreadingHTTPServer
+
+
+class GeminiStubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+    server: "GeminiStubServer"
+
+    def setup(self):
+        super().setup()
+        with self.server.stats_lock:
+            self.server.connections += 1
+        time.sleep(self.server.handshake_latency)
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        time.sleep(self.server.latency)
+        with self.server.stats_lock:
+            self.server.requests += 1
+
+        if ":streamGenerateContent" in self.path:
+            self._send_stream()
+            return
+
+        body = json.dumps(self._response_chunk(self.server.response_text)).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _response_chunk(self, text):
+        return {
+            "candidates": [
+                {
+                    "content": {"parts": [{"text": text}], "role": "model"},
+                    "finishReason": "STOP",
+                },
+            ],
+            "usageMetadata": {
+                "promptTokenCount": 1,
+                "candidatesTokenCount": 1,
+                "totalTokenCount": 2,
+            },
+        }
+
+    def _send_stream(self):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        words = self.server.response_text.split(" ")
+        for index, word in enumerate(words):
+            if index:
+                time.sleep(self.server.chunk_latency)
+            text = word if index == len(words) - 1 else f"{word} "
+            event = f"data: {json.dumps(self._response_chunk(text))}\r\n\r\n".encode()
+            self.wfile.write(f"{len(event):x}\r\n".encode() + event + b"\r\n")
+            self.wfile.flush()
+        self.wfile.write(b"0\r\n\r\n")
+
+    def log_message(self, format, *args):  # noqa: A002
+        pass
+
+
+class GeminiStubServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(
+        self,
+        address: tuple[str, int],
+        *,
+        latency: float = 0.0,
+        handshake_latency: float = 0.0,
+        chunk_latency: float = 0.0,
+        response_text: str = "Hello from the stub!",
+    ):
+        super().__init__(address, GeminiStubHandler)
+        self.latency = latency
+        self.chunk_latency = chunk_latency
+        self.handshake_latency = handshake_latency
+        self.response_text = response_text
+        self.stats_lock = threading.Lock()
+        self.connections: int = 0
+        self.requests: int = 0
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.socket.getsockname()[:2]
+        return f"http://{host}:{port}/"
+
+
+@contextmanager
+def run_stub_server(**kwargs):
+    """Run a ``GeminiStubServer`` on a free local port for the duration of the block."""
+    server = GeminiStubServer(("127.0.0.1", 0), **kwargs)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield server
+    finally:
+        server.shutdown()
+        server.server_close()
@@ -0,0 +1,75 @@
+from io import StringIO
+from types import SimpleNamespace
+from unittest import mock
+
+import litellm
+import pytest
+from celery.exceptions import SoftTimeLimitExceeded
+from django.core.cache import cache
+from django.core.management import call_command
+from smolagents.utils import AgentGenerationError
+
+from biilim.ai.agents import ANIMATION_ERROR_DESCRIPTION
+from biilim.ai.agents import get_html_animation_for_topic
+from biilim.ai.resilience import CLOSED
+from biilim.ai.resilience import OPEN
+from biilim.ai.resilience import CircuitBreaker
+
+
+def test_worker_start_up_does_not_import_agent_stack():
+    out = StringIO()
+
+    # Raises CommandError when smolagents or litellm are imported at start-up
+    call_command("bench_import_time", "--runs", "1", stdout=out)
+
+    assert "cold start:" in out.getvalue()
+
+
+@pytest.fixture
+def visual_agent(settings):
+    cache.clear()
+    settings.LLM_CIRCUIT_FAILURE_THRESHOLD = 1
+    agent = mock.Mock()
+    agent.monitor.get_total_token_counts.return_value = SimpleNamespace(
+        input_tokens=10,
+        output_tokens=20,
+    )
+    with mock.patch("biilim.ai.agents.get_visual_agent", return_value=agent):
+        yield agent
+
+
+def generate():
+    return get_html_animation_for_topic("Orbits", "How planets move", {"age": 14})
+
+
+@pytest.mark.django_db
+def test_malformed_agent_output_does_not_open_the_circuit(visual_agent):
+    visual_agent.run.return_value = {"not": "a string"}
+
+    assert generate().description == ANIMATION_ERROR_DESCRIPTION
+    assert CircuitBreaker.from_settings("gemini").state() == CLOSED
+
+
+@pytest.mark.django_db
+def test_transient_litellm_errors_open_the_circuit(visual_agent):
+    timeout = litellm.Timeout(
+        "Request timed out",
+        model="gemini-2.0-flash",
+        llm_provider="gemini",
+    )
+    visual_agent.run.side_effect = AgentGenerationError(
+        "Error in generating model output",
+        mock.Mock(),
+    )
+    visual_agent.run.side_effect.__cause__ = timeout
+
+    assert generate().description == ANIMATION_ERROR_DESCRIPTION
+    assert CircuitBreaker.from_settings("gemini").state() == OPEN
+
+
+@pytest.mark.django_db
+def test_time_limit_is_raised_for_the_task_to_retry(visual_agent):
+    visual_agent.run.side_effect = SoftTimeLimitExceeded()
+
+    with pytest.raises(SoftTimeLimitExceeded):
+        generate()
@@ -0,0 +1,140 @@
+from io import StringIO
+
+import pytest
+from asgiref.sync import async_to_sync
+from asgiref.sync import iscoroutinefunction
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import RequestFactory
+from django.urls import resolve
+from django.urls import reverse
+
+from biilim.ai.call_log import CallOrigin
+from biilim.ai.call_log import call_origin
+from biilim.ai.call_log import current_origin
+from biilim.ai.call_log import set_call_origin
+from biilim.ai.middleware import AICallOriginMiddleware
+from biilim.ai.models import AICallLog
+from biilim.ai.providers import get_provider
+from biilim.ai.resilience import LLMUnavailableError
+from biilim.ai.response_cache import clear_local_cache
+from biilim.users.tests.factories import UserFactory
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture(autouse=True)
+def stub_provider(settings):
+    cache.clear()
+    clear_local_cache()
+    settings.LLM_PROVIDER = "stub"
+    settings.LLM_STUB_LATENCY = 0
+    settings.LLM_STUB_JITTER = 0
+    settings.LLM_STUB_CHUNK_LATENCY = 0
+    set_call_origin(CallOrigin())
+    return get_provider()
+
+
+def test_calls_are_logged_with_tokens_origin_and_cache_hits(stub_provider):
+    user = UserFactory()
+
+    with call_origin("learn:topic-search", user_id=user.pk):
+        stub_provider.generate_text("Why?", call_type="chat")
+        stub_provider.generate_text("Why?", call_type="chat")
+
+    cached, called = AICallLog.objects.order_by("-pk")
+    assert (called.endpoint, called.user, called.model, called.call_type) == (
+        "learn:topic-search",
+        user,
+        "stub",
+        "chat",
+    )
+    assert called.prompt_tokens
+    assert called.output_tokens
+    assert (called.attempts, called.cache_hit) == (1, False)
+    assert (cached.attempts, cached.cache_hit, cached.prompt_tokens) == (0, True, None)
+
+
+def test_failed_calls_are_logged(settings):
+    settings.LLM_STUB_LATENCY = 1_000
+    settings.LLM_CALL_DEADLINES = {**settings.LLM_CALL_DEADLINES, "material": 0.05}
+
+    with pytest.raises(LLMUnavailableError):
+        get_provider().generate_text("Draw it", call_type="material")
+
+    log = AICallLog.objects.get()
+    assert log.error == "LLMUnavailableError"
+    assert log.attempts == 1
+    assert not log.cache_hit
+
+
+def test_streams_are_logged_once_consumed(stub_provider):
+    async def consume():
+        return "".join(
+            [
+                text
+                async for text in stub_provider.stream_text("Why?", call_type="chat")
+            ],
+        )
+
+    text = async_to_sync(consume)()
+
+    log = AICallLog.objects.get()
+    assert text
+    assert log.output_tokens
+    assert log.attempts == 1
+
+
+def test_middleware_attributes_calls_to_the_view_and_user():
+    user = UserFactory()
+    request = RequestFactory().get(reverse("learn:topics"))
+
+    def view(request):
+        # Resolved and authenticated after the middleware set the origin
+        request.resolver_match = resolve(request.path)
+        request.user = user
+        return (current_origin().endpoint, current_origin().user_id)
+
+    assert AICallOriginMiddleware(view)(request) == ("learn:topics", user.pk)
+
+
+def test_middleware_sets_the_origin_of_async_views_in_their_context():
+    request = RequestFactory().get(reverse("learn:topics"))
+    request.resolver_match = resolve(request.path)
+
+    async def view(request):
+        return current_origin().endpoint
+
+    middleware = AICallOriginMiddleware(view)
+
+    assert iscoroutinefunction(middleware)
+    assert async_to_sync(middleware)(request) == "learn:topics"
+
+
+def test_stats_roll_up_latency_and_cost_per_endpoint(settings):
+    settings.LLM_TOKEN_PRICES = {"gemini-2.0-flash": (1.0, 2.0)}
+    for latency_ms in [100, 200, 300]:
+        AICallLog.objects.create(
+            endpoint="learn:hx-chat-stream",
+            call_type="chat",
+            model="gemini-2.0-flash",
+            prompt_tokens=1_000_000,
+            output_tokens=1_000_000,
+            latency_ms=latency_ms,
+        )
+    AICallLog.objects.create(
+        endpoint="learn:hx-chat-stream",
+        call_type="chat",
+        model="gemini-2.0-flash",
+        latency_ms=1,
+        cache_hit=True,
+    )
+    out = StringIO()
+
+    call_command("ai_call_stats", stdout=out)
+
+    output = out.getvalue()
+    assert "learn:hx-chat-stream" in output
+    assert "calls=4 cached=1 errors=0" in output
+    assert "p50=150ms" in output
+    assert "Total cost: $9.0000" in output
@@ -0,0 +1,81 @@
+from unittest import mock
+
+import pytest
+from asgiref.sync import async_to_sync
+
+from biilim.ai import clients
+from biilim.ai.stub_server import run_stub_server
+
+
+@pytest.fixture
+def stub_server(settings):
+    with run_stub_server() as server:
+        settings.GEMINI_BASE_URL = server.base_url
+        settings.GEMINI_API_KEY = "stub"
+        clients.reset_gemini_client()
+        yield server
+    clients.reset_gemini_client()
+
+
+def test_shared_client_reuses_connections(stub_server):
+    calls = 3
+    for _ in range(calls):
+        response = clients.get_gemini_client().models.generate_content(
+            model="gemini-2.0-flash",
+            contents="ping",
+        )
+        assert response.text == "Hello from the stub!"
+
+    assert stub_server.requests == calls
+    assert stub_server.connections == 1
+
+
+def test_streamed_response_arrives_in_chunks(stub_server):
+    stream = clients.get_gemini_client().models.generate_content_stream(
+        model="gemini-2.0-flash",
+        contents="ping",
+    )
+
+    assert [chunk.text for chunk in stream] == ["Hello ", "from ", "the ", "stub!"]
+
+
+def test_client_is_rebuilt_in_forked_process(stub_server):
+    client = clients.get_gemini_client()
+    assert clients.get_gemini_client() is client
+
+    with mock.patch("biilim.ai.clients.os.getpid", return_value=-1):
+        assert clients.get_gemini_client() is not client
+
+
+def test_async_stream_is_read_without_threads(stub_server):
+    async def stream():
+        with mock.patch(
+            "asyncio.to_thread",
+            side_effect=AssertionError("blocking call in a thread"),
+        ):
+            response = (
+                await clients.get_gemini_client().aio.models.generate_content_stream(
+                    model="gemini-2.0-flash",
+                    contents="ping",
+                )
+            )
+            return [chunk.text async for chunk in response]
+
+    assert async_to_sync(stream)() == ["Hello ", "from ", "the ", "stub!"]
+
+
+def test_async_requests_share_connections_of_their_event_loop(stub_server):
+    async def generate_twice():
+        client = clients.get_gemini_client()
+        return [
+            (
+                await client.aio.models.generate_content(
+                    model="gemini-2.0-flash",
+                    contents="ping",
+                )
+            ).text
+            for _ in range(2)
+        ]
+
+    assert async_to_sync(generate_twice)() == ["Hello from the stub!"] * 2
+    assert stub_server.connections == 1
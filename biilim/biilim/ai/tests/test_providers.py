@@ -0,0 +1,97 @@
+import pytest
+from asgiref.sync import async_to_sync
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+
+from biilim.ai import clients
+from biilim.ai.providers import GeminiProvider
+from biilim.ai.providers import StubProvider
+from biilim.ai.providers import get_provider
+from biilim.ai.response_cache import clear_local_cache
+from biilim.ai.stub_server import run_stub_server
+from biilim.learn.schemas import TopicSchema
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture(autouse=True)
+def _clear_cache():
+    cache.clear()
+    clear_local_cache()
+
+
+@pytest.fixture
+def stub_provider(settings):
+    settings.LLM_PROVIDER = "stub"
+    settings.LLM_STUB_LATENCY = 0
+    settings.LLM_STUB_JITTER = 0
+    settings.LLM_STUB_CHUNK_LATENCY = 0
+    return get_provider()
+
+
+def test_recorded_topic_follows_the_topic_schema(stub_provider):
+    topic = TopicSchema.model_validate_json(
+        stub_provider.generate_json("Python memory", TopicSchema, call_type="topic"),
+    )
+
+    assert topic.quiz.questions
+    assert all(section.quiz.questions for section in topic.sections)
+
+
+def test_stream_replays_the_recorded_text(stub_provider):
+    async def stream():
+        return [
+            text
+            async for text in stub_provider.stream_text(
+                "Why?",
+                call_type="chat",
+                use_cache=False,
+            )
+        ]
+
+    words = async_to_sync(stream)()
+
+    assert len(words) > 1
+    assert "".join(words) == stub_provider.generate_text("Why?", call_type="chat")
+
+
+def test_stub_latency_is_jittered_reproducibly(settings):
+    provider = StubProvider(
+        settings.LLM_STUB_RESPONSES_DIR,
+        latency_ms=100,
+        jitter_ms=50,
+        chunk_latency_ms=0,
+    )
+
+    assert provider.latency("a") == provider.latency("a")
+    assert provider.latency("a") != provider.latency("b")
+    min_latency, max_latency = 0.05, 0.15
+    assert all(
+        min_latency <= provider.latency(prompt) <= max_latency for prompt in "abcdef"
+    )
+
+
+def test_gemini_provider_uses_the_configured_model(settings):
+    settings.LLM_PROVIDER = "gemini"
+    settings.LLM_MODEL = "gemini-test"
+    with run_stub_server() as server:
+        settings.GEMINI_BASE_URL = server.base_url
+        settings.GEMINI_API_KEY = "stub"
+        clients.reset_gemini_client()
+        provider = get_provider()
+        try:
+            assert isinstance(provider, GeminiProvider)
+            assert provider.model == "gemini-test"
+            assert (
+                provider.generate_text("ping", call_type="chat")
+                == "Hello from the stub!"
+            )
+        finally:
+            clients.reset_gemini_client()
+
+
+def test_unknown_provider_is_rejected(settings):
+    settings.LLM_PROVIDER = "nope"
+
+    with pytest.raises(ImproperlyConfigured):
+        get_provider()
@@ -0,0 +1,216 @@
+import time
+from types import SimpleNamespace
+
+import pytest
+import requests
+from asgiref.sync import async_to_sync
+from django.core.cache import cache
+from google.genai import errors
+
+from biilim.ai.providers import GeminiProvider
+from biilim.ai.providers import get_provider
+from biilim.ai.resilience import CLOSED
+from biilim.ai.resilience import HALF_OPEN
+from biilim.ai.resilience import OPEN
+from biilim.ai.resilience import CircuitBreaker
+from biilim.ai.resilience import CircuitOpenError
+from biilim.ai.resilience import LLMError
+from biilim.ai.resilience import LLMUnavailableError
+from biilim.ai.resilience import astream_with_resilience
+from biilim.ai.resilience import call_with_resilience
+from biilim.ai.response_cache import clear_local_cache
+from biilim.core import metrics
+
+pytestmark = pytest.mark.django_db
+
+ATTEMPTS = 3
+
+
+class OverloadedError(Exception):
+    pass
+
+
+class RejectedError(Exception):
+    pass
+
+
+@pytest.fixture(autouse=True)
+def _settings(settings):
+    cache.clear()
+    clear_local_cache()
+    settings.LLM_RETRY_ATTEMPTS = ATTEMPTS
+    settings.LLM_RETRY_BASE_DELAY = 0
+    settings.LLM_CIRCUIT_FAILURE_THRESHOLD = 3
+
+
+def breaker():
+    return CircuitBreaker(
+        "test",
+        failure_threshold=3,
+        failure_window=60,
+        reset_timeout=30,
+    )
+
+
+def expire_open_state(circuit):
+    cache.set("circuit:test:opened_at", time.time() - circuit.reset_timeout - 1)
+
+
+def call(attempt, circuit=None):
+    return call_with_resilience(
+        attempt,
+        call_type="chat",
+        breaker=circuit or breaker(),
+        is_transient=lambda e: isinstance(e, OverloadedError),
+        is_upstream_error=lambda e: isinstance(e, OverloadedError | RejectedError),
+    )
+
+
+class Flaky:
+    """An attempt that raises or returns ``outcomes`` in turn, recording timeouts."""
+
+    def __init__(self, *outcomes):
+        self.remaining = list(outcomes)
+        self.timeouts: list[float] = []
+
+    def __call__(self, timeout: float):
+        self.timeouts.append(timeout)
+        outcome = self.remaining.pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+
+def test_transient_errors_are_retried_within_the_deadline(settings):
+    retried_before = metrics.get_counter("llm.chat.retried")
+    attempt = Flaky(OverloadedError(), OverloadedError(), "Hello")
+
+    assert call(attempt) == "Hello"
+    assert len(attempt.timeouts) == ATTEMPTS
+    assert all(
+        0 < timeout <= settings.LLM_CALL_DEADLINES["chat"]
+        for timeout in attempt.timeouts
+    )
+    assert metrics.get_counter("llm.chat.retried") == retried_before + 2
+
+
+def test_retries_are_bounded():
+    attempt = Flaky(OverloadedError(), OverloadedError(), OverloadedError(), "Too late")
+
+    with pytest.raises(LLMUnavailableError):
+        call(attempt)
+    assert len(attempt.timeouts) == ATTEMPTS
+
+
+def test_rejected_calls_and_bugs_are_not_retried():
+    attempt = Flaky(RejectedError("400 INVALID_ARGUMENT"))
+    with pytest.raises(LLMError) as excinfo:
+        call(attempt)
+    assert not isinstance(excinfo.value, LLMUnavailableError)
+
+    with pytest.raises(KeyError):
+        call(Flaky(KeyError("bug")))
+
+
+def test_circuit_opens_fails_fast_and_closes_after_a_probe():
+    circuit = breaker()
+    with pytest.raises(LLMUnavailableError):
+        call(Flaky(OverloadedError(), OverloadedError(), OverloadedError()), circuit)
+    assert circuit.state() == OPEN
+
+    attempt = Flaky("Hello")
+    with pytest.raises(CircuitOpenError):
+        call(attempt, circuit)
+    assert attempt.timeouts == []
+
+    # Once the reset timeout passed, one probe goes through and closes the circuit
+    expire_open_state(circuit)
+    assert circuit.state() == HALF_OPEN
+    assert call(attempt, circuit) == "Hello"
+    assert circuit.state() == CLOSED
+
+
+def test_failed_probe_reopens_the_circuit():
+    circuit = breaker()
+    for _ in range(3):
+        circuit.record_failure()
+    expire_open_state(circuit)
+
+    circuit.before_call()
+    with pytest.raises(CircuitOpenError):
+        # Only one probe at a time
+        circuit.before_call()
+    circuit.record_failure()
+
+    assert cache.get("circuit:test:probe") is None
+    assert circuit.state() == OPEN
+
+
+def test_success_on_a_closed_circuit_deletes_nothing(monkeypatch):
+    circuit = breaker()
+    deleted: list[list[str]] = []
+    monkeypatch.setattr(cache, "delete_many", deleted.append)
+
+    circuit.record_success()
+    assert deleted == []
+
+    circuit.record_failure()
+    circuit.record_success()
+    assert deleted == [["circuit:test:failures"]]
+
+
+def test_slow_stub_response_hits_the_deadline(settings):
+    settings.LLM_PROVIDER = "stub"
+    settings.LLM_STUB_LATENCY = 1_000
+    settings.LLM_STUB_JITTER = 0
+    settings.LLM_CALL_DEADLINES = {**settings.LLM_CALL_DEADLINES, "material": 0.05}
+
+    with pytest.raises(LLMUnavailableError):
+        get_provider().generate_text("Draw it", call_type="material")
+
+
+def test_stream_is_retried_until_its_first_piece_only():
+    def stream_of(*pieces):
+        async def stream(_timeout):
+            for piece in pieces:
+                if isinstance(piece, Exception):
+                    raise piece
+                yield piece
+
+        return stream
+
+    attempts = [stream_of(OverloadedError()), stream_of("Hello ", "there")]
+
+    async def consume(circuit):
+        stream = astream_with_resilience(
+            lambda timeout: attempts.pop(0)(timeout),
+            call_type="chat",
+            breaker=circuit,
+            is_transient=lambda e: isinstance(e, OverloadedError),
+            is_upstream_error=lambda e: isinstance(e, OverloadedError),
+        )
+        return [piece async for piece in stream]
+
+    assert async_to_sync(consume)(breaker()) == ["Hello ", "there"]
+
+    attempts = [stream_of("Hello ", OverloadedError()), stream_of("Never")]
+    with pytest.raises(LLMUnavailableError):
+        async_to_sync(consume)(breaker())
+    assert len(attempts) == 1
+
+
+def test_gemini_errors_are_classified():
+    provider = GeminiProvider(model="gemini-test")
+
+    def api_error(code):
+        response = SimpleNamespace(
+            body_segments=[{"error": {"message": "boom", "status": "x"}}],
+        )
+        return errors.APIError(code, response)
+
+    assert provider.is_transient(api_error(503))
+    assert provider.is_transient(api_error(429))
+    assert provider.is_transient(requests.ReadTimeout())
+    assert not provider.is_transient(api_error(400))
+    assert provider.is_upstream_error(api_error(400))
+    assert not provider.is_upstream_error(ValueError())
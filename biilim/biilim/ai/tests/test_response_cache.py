@@ -0,0 +1,115 @@
+from unittest import mock
+
+import pytest
+from asgiref.sync import async_to_sync
+from django.core.cache import cache
+
+from biilim.ai.response_cache import _LocalLRU
+from biilim.ai.response_cache import acached_stream
+from biilim.ai.response_cache import cached_response
+from biilim.ai.response_cache import clear_local_cache
+from biilim.ai.response_cache import response_cache_key
+from biilim.core import metrics
+from biilim.learn.schemas import QuizSchema
+from biilim.learn.schemas import TopicSchema
+
+
+@pytest.fixture(autouse=True)
+def _clear_cache():
+    cache.clear()
+    clear_local_cache()
+
+
+def test_key_covers_model_prompt_schema_and_params():
+    key = response_cache_key("gemini-2.0-flash", "Explain gravity")
+
+    assert key == response_cache_key("gemini-2.0-flash", "Explain gravity")
+    assert key != response_cache_key("gemini-2.5-pro", "Explain gravity")
+    assert key != response_cache_key("gemini-2.0-flash", "Explain gravity!")
+    assert key != response_cache_key(
+        "gemini-2.0-flash",
+        "Explain gravity",
+        max_output_tokens=100,
+    )
+    assert response_cache_key("m", "p", TopicSchema) != response_cache_key(
+        "m",
+        "p",
+        QuizSchema,
+    )
+
+
+def test_response_is_served_from_local_then_shared_tier():
+    generate = mock.Mock(return_value="Feedback")
+    key = response_cache_key("m", "p")
+    counters_before = metrics.get_counters(
+        "llm_cache.explanation.hit_local",
+        "llm_cache.explanation.hit_shared",
+    )
+
+    assert cached_response("explanation", key, generate) == "Feedback"
+    assert cached_response("explanation", key, generate) == "Feedback"
+    clear_local_cache()
+    assert cached_response("explanation", key, generate) == "Feedback"
+
+    generate.assert_called_once()
+    counters = metrics.get_counters(
+        "llm_cache.explanation.hit_local",
+        "llm_cache.explanation.hit_shared",
+    )
+    assert (
+        counters["llm_cache.explanation.hit_local"]
+        == counters_before["llm_cache.explanation.hit_local"] + 1
+    )
+    assert (
+        counters["llm_cache.explanation.hit_shared"]
+        == counters_before["llm_cache.explanation.hit_shared"] + 1
+    )
+    assert metrics.get_counter("llm_cache.explanation.bytes_stored") >= len("Feedback")
+
+
+def test_uncached_call_types_and_opt_out_always_call_the_llm():
+    generate = mock.Mock(return_value="Draw it.")
+
+    cached_response("material", "key", generate)
+    cached_response("material", "key", generate)
+    cached_response("chat", "key", generate, use_cache=False)
+    cached_response("chat", "key", generate, use_cache=False)
+
+    calls = 4
+    assert generate.call_count == calls
+
+
+def test_only_complete_streams_are_cached():
+    async def words():
+        yield "Hello "
+        yield "there"
+
+    async def consume(count=None):
+        stream = acached_stream("chat", "key", words)
+        parts = (
+            [part async for part in stream]
+            if count is None
+            else [await anext(stream) for _ in range(count)]
+        )
+        await stream.aclose()
+        return parts
+
+    assert async_to_sync(consume)(count=1) == ["Hello "]
+    assert cache.get("key") is None
+
+    assert async_to_sync(consume)() == ["Hello ", "there"]
+    assert async_to_sync(consume)() == ["Hello there"]
+
+
+def test_local_tier_evicts_least_recently_used_and_expired_entries():
+    lru = _LocalLRU(maxsize=2)
+    lru.set("a", "1", timeout=60)
+    lru.set("b", "2", timeout=60)
+    lru.get("a")
+    lru.set("c", "3", timeout=60)
+
+    assert lru.get("a") == "1"
+    assert lru.get("b") is None
+
+    lru.set("d", "4", timeout=-1)
+    assert lru.get("d") is None
@@ -0,0 +1,37 @@
+"""
+Cross-process concurrency limits backed by the cache (Redis in production).
+"""
+
+from contextlib import contextmanager
+
+from django.core.cache import cache
+
+
+class SemaphoreFullError(Exception):
+    """Raised when every slot of a ``cache_semaphore`` is taken."""
+
+
+@contextmanager
+def cache_semaphore(name: str, limit: int, timeout: int):
+    """
+    Hold one of ``limit`` slots named ``name`` for the duration of the block.
+
+    Slots expire after ``timeout`` seconds, so a crashed holder cannot leak one.
+
+    Args:
+        name (str): The name of the limited resource.
+        limit (int): How many holders may run at the same time.
+        timeout (int): Seconds after which an unreleased slot frees itself.
+
+    Raises:
+        SemaphoreFullError: When no slot is free.
+    """
+    for slot in range(limit):
+        key = f"semaphore:{name}:{slot}"
+        if cache.add(key, 1, timeout=timeout):
+            try:
+                yield
+            finally:
+                cache.delete(key)
+            return
+    raise SemaphoreFullError(name)
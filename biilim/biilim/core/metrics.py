@@ -0,0 +1,54 @@
+"""
+Lightweight counters and timings shared across the project.
+
+Counters live in the default cache, so they are aggregated across processes when
+the cache is Redis (production) and per process with the local memory cache.
+Timings are additionally emitted as log lines on the ``biilim.metrics`` logger.
+"""
+
+import logging
+
+from django.core.cache import cache
+
+logger = logging.getLogger("biilim.metrics")
+
+METRICS_KEY_PREFIX = "metrics"
+
+
+def _key(name: str) -> str:
+    return f"{METRICS_KEY_PREFIX}:{name}"
+
+
+def incr(name: str, value: int = 1) -> None:
+    """Increment the counter ``name`` by ``value``, creating it when missing."""
+    try:
+        cache.incr(_key(name), value)
+    except ValueError:
+        # The key does not exist yet; ``add`` is atomic, so a concurrent creator wins
+        # and we simply increment its value.
+        cache.add(_key(name), 0, timeout=None)
+        cache.incr(_key(name), value)
+
+
+def get_counter(name: str) -> int:
+    """Return the current value of the counter ``name``."""
+    return cache.get(_key(name), 0)
+
+
+def get_counters(*names: str) -> dict[str, int]:
+    """Return the current values of several counters at once."""
+    values = cache.get_many([_key(name) for name in names])
+    return {name: values.get(_key(name), 0) for name in names}
+
+
+def timing(name: str, duration_ms: float, **tags) -> None:
+    """
+    Record a duration in milliseconds.
+
+    Keeps ``<name>.count`` and ``<name>.total_ms`` counters so averages can be derived,
+    and logs the individual observation together with ``tags``.
+    """
+    incr(f"{name}.count")
+    incr(f"{name}.total_ms", round(duration_ms))
+    tags_str = " ".join(f"{key}={value}" for key, value in tags.items())
+    logger.info(f"{name}={duration_ms:.1f}ms {tags_str}".rstrip())
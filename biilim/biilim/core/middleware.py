@@ -0,0 +1,118 @@
+import time
+from contextlib import ExitStack
+
+from asgiref.sync import iscoroutinefunction
+from asgiref.sync import markcoroutinefunction
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+from django.db import connections
+from django.db import transaction
+
+from biilim.core import metrics
+
+
+class _TransactionTracker:
+    """
+    Database execute wrapper that measures how long transactions stay open.
+
+    A transaction is considered open from the first query executed inside an atomic
+    block until the outermost block commits. Rolled back or still open transactions are
+    closed when the request finishes.
+    """
+
+    def __init__(self, using: str):
+        self.using = using
+        self.started_at: float | None = None
+        self.held_seconds = 0.0
+        self.transactions = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        if self.started_at is None and context["connection"].in_atomic_block:
+            self.started_at = time.monotonic()
+            self.transactions += 1
+            transaction.on_commit(self.finish, using=self.using)
+        return execute(sql, params, many, context)
+
+    def finish(self):
+        if self.started_at is not None:
+            self.held_seconds += time.monotonic() - self.started_at
+            self.started_at = None
+
+
+class TransactionTimingMiddleware:
+    """
+    Report requests that held database transactions for long.
+
+    Under ``ATOMIC_REQUESTS`` nearly every request holds one, so only durations of at
+    least ``DB_TRANSACTION_HELD_THRESHOLD_MS`` are recorded as the
+    ``db.transaction_held`` timing metric. With ``DB_TRANSACTION_SERVER_TIMING`` (the
+    default under ``DEBUG``) every duration is exposed to the browser devtools through
+    a ``Server-Timing`` header.
+
+    The middleware is sync and async capable, so async views are not adapted to a
+    thread under ASGI. Their queries run in the thread of ``sync_to_async``, which has a
+    connection of its own: the execute wrapper is installed and removed there.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        tracker = _TransactionTracker(DEFAULT_DB_ALIAS)
+        with connections[DEFAULT_DB_ALIAS].execute_wrapper(tracker):
+            response = self.get_response(request)
+        tracker.finish()
+        self._add_header(response, tracker)
+        if self._is_slow(tracker):
+            self._record(request, tracker)
+        return response
+
+    async def __acall__(self, request):
+        tracker = _TransactionTracker(DEFAULT_DB_ALIAS)
+        wrapper = ExitStack()
+        await sync_to_async(self._install)(wrapper, tracker)
+        try:
+            response = await self.get_response(request)
+        finally:
+            await sync_to_async(wrapper.close)()
+        tracker.finish()
+        self._add_header(response, tracker)
+        if self._is_slow(tracker):
+            await sync_to_async(self._record)(request, tracker)
+        return response
+
+    @staticmethod
+    def _install(wrapper: ExitStack, tracker: _TransactionTracker) -> None:
+        wrapper.enter_context(connections[DEFAULT_DB_ALIAS].execute_wrapper(tracker))
+
+    @staticmethod
+    def _add_header(response, tracker: _TransactionTracker) -> None:
+        if tracker.transactions and settings.DB_TRANSACTION_SERVER_TIMING:
+            held_ms = tracker.held_seconds * 1000
+            response["Server-Timing"] = (
+                f'db-txn;dur={held_ms:.1f};desc="DB transaction held"'
+            )
+
+    @staticmethod
+    def _is_slow(tracker: _TransactionTracker) -> bool:
+        return bool(tracker.transactions) and (
+            tracker.held_seconds * 1000 >= settings.DB_TRANSACTION_HELD_THRESHOLD_MS
+        )
+
+    @staticmethod
+    def _record(request, tracker: _TransactionTracker) -> None:
+        metrics.timing(
+            "db.transaction_held",
+            tracker.held_seconds * 1000,
+            path=request.path,
+            transactions=tracker.transactions,
+        )
@@ -0,0 +1,79 @@
+"""
+Keyset (cursor) pagination over ``BaseModel`` rows, newest first.
+
+Pages are keyed on ``(created_at, id)`` instead of an offset, so each page is one
+indexed range query however deep the user scrolls, and rows created meanwhile do
+not shift later pages.
+"""
+
+import base64
+import binascii
+from dataclasses import dataclass
+from datetime import datetime
+
+from django.db.models import Q
+
+
+@dataclass(frozen=True)
+class Page:
+    items: list
+    next_cursor: str | None = None
+
+    @property
+    def has_more(self) -> bool:
+        return self.next_cursor is not None
+
+
+class InvalidCursorError(ValueError):
+    """Raised when a cursor was not produced by ``encode_cursor``."""
+
+
+def encode_cursor(obj) -> str:
+    """Return the opaque cursor of the rows older than ``obj``."""
+    value = f"{obj.created_at.isoformat()}|{obj.pk}"
+    return base64.urlsafe_b64encode(value.encode()).decode()
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, int]:
+    """
+    Decode a cursor of ``encode_cursor``.
+
+    Raises:
+        InvalidCursorError: When the cursor is malformed.
+    """
+    try:
+        created_at, pk = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+        return datetime.fromisoformat(created_at), int(pk)
+    except (binascii.Error, UnicodeError, ValueError) as e:
+        raise InvalidCursorError(cursor) from e
+
+
+def paginate_before(queryset, cursor: str | None, page_size: int) -> Page:
+    """
+    Return the newest ``page_size`` rows of ``queryset`` older than ``cursor``.
+
+    Args:
+        queryset (QuerySet): Rows with ``created_at`` and an integer primary key.
+        cursor (str | None): The ``next_cursor`` of the previous page, ``None`` for the
+            first page.
+        page_size (int): The maximum number of rows per page.
+
+    Returns:
+        Page: The rows, newest first, and the cursor of the next (older) page if there
+        is one.
+
+    Raises:
+        InvalidCursorError: When the cursor is malformed.
+    """
+    if cursor:
+        created_at, pk = decode_cursor(cursor)
+        queryset = queryset.filter(
+            Q(created_at__lt=created_at) | Q(created_at=created_at, pk__lt=pk),
+        )
+
+    # One extra row tells whether an older page exists
+    rows = list(queryset.order_by("-created_at", "-pk")[: page_size + 1])
+    if len(rows) > page_size:
+        rows = rows[:page_size]
+        return Page(items=rows, next_cursor=encode_cursor(rows[-1]))
+    return Page(items=rows)
@@ -0,0 +1,268 @@
+"""
+Per-user rate limits and a global concurrency cap for the LLM-backed views.
+
+``rate_limit`` takes one token from a per-user and a shared token bucket of the
+endpoint, configured in ``LLM_RATE_LIMITS`` as Celery-style rates such as ``"10/m"``:
+up to 10 requests at once, refilled at 10 per minute. With Redis (production) a bucket
+is updated atomically by a Lua script; other caches fall back to a best-effort
+read-modify-write.
+
+``limit_concurrency`` holds one of ``LLM_MAX_CONCURRENCY`` slots of a
+``cache_semaphore`` while the view runs, and for streaming responses until the stream
+ends.
+
+Both decorators wrap sync and async views; for async views the cache round trips run
+in a thread. Rejected requests get a fast ``429`` (an htmx partial for htmx requests)
+instead of waiting. ``ratelimit.<endpoint>.admitted`` and
+``ratelimit.<endpoint>.rejected`` counters are kept in ``core.metrics``.
+"""
+
+import time
+from contextlib import ExitStack
+from functools import wraps
+from inspect import iscoroutinefunction
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.shortcuts import render
+
+from biilim.core import metrics
+from biilim.core.concurrency import SemaphoreFullError
+from biilim.core.concurrency import cache_semaphore
+
+RATE_PERIODS = {"s": 1, "m": 60, "h": 60 * 60}
+
+TOKEN_BUCKET_SCRIPT = """
+local capacity = tonumber(ARGV[1])
+local refill_per_second = tonumber(ARGV[2])
+local now = tonumber(ARGV[3])
+local bucket = redis.call("HMGET", KEYS[1], "tokens", "updated_at")
+local tokens = tonumber(bucket[1]) or capacity
+local updated_at = tonumber(bucket[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - updated_at) * refill_per_second)
+local retry_after = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+else
+    retry_after = (1 - tokens) / refill_per_second
+end
+redis.call("HSET", KEYS[1], "tokens", tostring(tokens), "updated_at", tostring(now))
+redis.call("EXPIRE", KEYS[1], math.ceil(capacity / refill_per_second) + 1)
+return tostring(retry_after)
+"""  # noqa: S105
+
+
+class RateLimitedError(Exception):
+    """Raised when a token bucket is empty."""
+
+    def __init__(self, retry_after: float):
+        super().__init__(f"Retry after {retry_after:.1f}s")
+        self.retry_after = retry_after
+
+
+def parse_rate(rate: str) -> tuple[int, float]:
+    """
+    Parse a rate like ``"10/m"``.
+
+    Returns:
+        tuple[int, float]: The bucket capacity and the tokens refilled per second.
+    """
+    count, period = rate.split("/")
+    return int(count), int(count) / RATE_PERIODS[period]
+
+
+def take_token(key: str, rate: str) -> None:
+    """
+    Take one token from the bucket ``key``.
+
+    Raises:
+        RateLimitedError: When the bucket is empty.
+    """
+    capacity, refill_per_second = parse_rate(rate)
+    now = time.time()
+    get_client = getattr(getattr(cache, "client", None), "get_client", None)
+    if get_client is not None:
+        # django-redis: one atomic round trip, EVALSHA once the script is loaded
+        script = get_client(write=True).register_script(TOKEN_BUCKET_SCRIPT)
+        retry_after = float(
+            script(keys=[cache.make_key(key)], args=[capacity, refill_per_second, now]),
+        )
+    else:
+        retry_after = _take_token_locally(key, capacity, refill_per_second, now)
+    if retry_after > 0:
+        raise RateLimitedError(retry_after)
+
+
+def _take_token_locally(
+    key: str,
+    capacity: int,
+    refill_per_second: float,
+    now: float,
+) -> float:
+    tokens, updated_at = cache.get(key, (capacity, now))
+    tokens = min(capacity, tokens + max(0.0, now - updated_at) * refill_per_second)
+    retry_after = 0.0
+    if tokens >= 1:
+        tokens -= 1
+    else:
+        retry_after = (1 - tokens) / refill_per_second
+    cache.set(key, (tokens, now), timeout=int(capacity / refill_per_second) + 1)
+    return retry_after
+
+
+def rate_limit(endpoint: str):
+    """
+    Limit a view to the per-user and shared budgets of ``endpoint``.
+
+    The budgets are read from ``LLM_RATE_LIMITS``.
+
+    Args:
+        endpoint (str): The key of the view's budgets in ``LLM_RATE_LIMITS``.
+    """
+
+    def decorator(view):
+        if iscoroutinefunction(view):
+
+            @wraps(view)
+            async def async_wrapper(request, *args, **kwargs):
+                user = await request.auser()
+                retry_after = await sync_to_async(_take_tokens)(endpoint, user.pk)
+                if retry_after is not None:
+                    return await sync_to_async(_reject)(request, endpoint, retry_after)
+                return await view(request, *args, **kwargs)
+
+            return async_wrapper
+
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            retry_after = _take_tokens(endpoint, request.user.pk)
+            if retry_after is not None:
+                return _reject(request, endpoint, retry_after)
+            return view(request, *args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def _take_tokens(endpoint: str, user_pk) -> float | None:
+    """Take a token of ``endpoint`` for the user; returns the wait when rejected."""
+    budgets = settings.LLM_RATE_LIMITS[endpoint]
+    try:
+        # The user's own bucket first, so one user cannot drain the shared one
+        take_token(f"ratelimit:{endpoint}:user:{user_pk}", budgets["user"])
+        take_token(f"ratelimit:{endpoint}:global", budgets["global"])
+    except RateLimitedError as e:
+        return e.retry_after
+    metrics.incr(f"ratelimit.{endpoint}.admitted")
+    return None
+
+
+def limit_concurrency(view):
+    """Cap the LLM calls in flight across all workers at ``LLM_MAX_CONCURRENCY``."""
+    if iscoroutinefunction(view):
+
+        @wraps(view)
+        async def async_wrapper(request, *args, **kwargs):
+            slot = await sync_to_async(_acquire_slot)()
+            if slot is None:
+                return await sync_to_async(_reject)(
+                    request,
+                    "concurrency",
+                    retry_after=1,
+                )
+
+            try:
+                response = await view(request, *args, **kwargs)
+            except BaseException:
+                await sync_to_async(slot.close)()
+                raise
+            if response.streaming:
+                # The LLM call runs while the body is streamed
+                release = _arelease_on_close if response.is_async else _ReleaseOnClose
+                response.streaming_content = release(response.streaming_content, slot)
+            else:
+                await sync_to_async(slot.close)()
+            return response
+
+        return async_wrapper
+
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        slot = _acquire_slot()
+        if slot is None:
+            return _reject(request, "concurrency", retry_after=1)
+
+        try:
+            response = view(request, *args, **kwargs)
+        except BaseException:
+            slot.close()
+            raise
+        if response.streaming:
+            # The LLM call runs while the body is streamed
+            response.streaming_content = _ReleaseOnClose(
+                response.streaming_content,
+                slot,
+            )
+        else:
+            slot.close()
+        return response
+
+    return wrapper
+
+
+def _acquire_slot() -> ExitStack | None:
+    """Take a concurrency slot, or ``None`` when all are taken; closing it frees it."""
+    slot = ExitStack()
+    try:
+        slot.enter_context(
+            cache_semaphore(
+                "llm_calls",
+                settings.LLM_MAX_CONCURRENCY,
+                timeout=settings.LLM_CONCURRENCY_SLOT_TIMEOUT,
+            ),
+        )
+    except SemaphoreFullError:
+        return None
+    metrics.incr("ratelimit.concurrency.admitted")
+    return slot
+
+
+class _ReleaseOnClose:
+    """Streams ``content`` and frees the concurrency slot when the response closes."""
+
+    def __init__(self, content, slot: ExitStack):
+        self._content = iter(content)
+        self._slot = slot
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        return next(self._content)
+
+    def close(self):
+        self._slot.close()
+
+
+async def _arelease_on_close(content, slot: ExitStack):
+    """Streams async ``content`` and frees the concurrency slot once it ends."""
+    try:
+        async for chunk in content:
+            yield chunk
+    finally:
+        await sync_to_async(slot.close)()
+
+
+def _reject(request, endpoint: str, retry_after: float):
+    metrics.incr(f"ratelimit.{endpoint}.rejected")
+    retry_after = max(1, round(retry_after))
+    template = (
+        "core/hx_rate_limited.html"
+        if getattr(request, "htmx", False)
+        else "core/rate_limited.html"
+    )
+    response = render(request, template, {"retry_after": retry_after}, status=429)
+    response["Retry-After"] = str(retry_after)
+    return response
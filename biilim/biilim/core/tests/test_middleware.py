@@ -0,0 +1,89 @@
+import threading
+
+import pytest
+from asgiref.sync import async_to_sync
+from asgiref.sync import iscoroutinefunction
+from asgiref.sync import sync_to_async
+from django.db import transaction
+from django.http import HttpResponse
+from django.test import RequestFactory
+
+from biilim.core import metrics
+from biilim.core.middleware import TransactionTimingMiddleware
+from biilim.users.models import User
+
+
+@pytest.fixture
+def report_every_transaction(settings):
+    settings.DB_TRANSACTION_HELD_THRESHOLD_MS = 0
+    settings.DB_TRANSACTION_SERVER_TIMING = True
+
+
+@pytest.mark.django_db(transaction=True)
+@pytest.mark.usefixtures("report_every_transaction")
+def test_reports_time_a_transaction_was_held(rf: RequestFactory):
+    def view(request):
+        with transaction.atomic():
+            User.objects.count()
+        return HttpResponse()
+
+    before = metrics.get_counter("db.transaction_held.count")
+    response = TransactionTimingMiddleware(view)(rf.get("/"))
+
+    assert response["Server-Timing"].startswith("db-txn;dur=")
+    assert metrics.get_counter("db.transaction_held.count") == before + 1
+
+
+@pytest.mark.django_db(transaction=True)
+def test_fast_transactions_are_not_reported_by_default(rf: RequestFactory, settings):
+    settings.DB_TRANSACTION_SERVER_TIMING = False
+
+    def view(request):
+        with transaction.atomic():
+            User.objects.count()
+        return HttpResponse()
+
+    before = metrics.get_counter("db.transaction_held.count")
+    response = TransactionTimingMiddleware(view)(rf.get("/"))
+
+    assert "Server-Timing" not in response
+    assert metrics.get_counter("db.transaction_held.count") == before
+
+
+@pytest.mark.django_db(transaction=True)
+@pytest.mark.usefixtures("report_every_transaction")
+def test_autocommit_queries_are_not_reported(rf: RequestFactory):
+    def view(request):
+        User.objects.count()
+        return HttpResponse()
+
+    response = TransactionTimingMiddleware(view)(rf.get("/"))
+
+    assert "Server-Timing" not in response
+
+
+@pytest.mark.django_db(transaction=True)
+@pytest.mark.usefixtures("report_every_transaction")
+def test_async_view_is_called_without_a_thread_hop(rf: RequestFactory):
+    def count_in_transaction():
+        with transaction.atomic():
+            User.objects.count()
+
+    threads = {}
+
+    async def view(request):
+        threads["view"] = threading.get_ident()
+        await sync_to_async(count_in_transaction)()
+        return HttpResponse()
+
+    middleware = TransactionTimingMiddleware(view)
+
+    async def call(request):
+        threads["caller"] = threading.get_ident()
+        return await middleware(request)
+
+    response = async_to_sync(call)(rf.get("/"))
+
+    assert iscoroutinefunction(middleware)
+    assert threads["view"] == threads["caller"]
+    assert response["Server-Timing"].startswith("db-txn;dur=")
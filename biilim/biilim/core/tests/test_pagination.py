@@ -0,0 +1,31 @@
+import pytest
+from django.utils import timezone
+
+from biilim.core.pagination import InvalidCursorError
+from biilim.core.pagination import paginate_before
+from biilim.learn.models import ChatMessage
+from biilim.learn.tests.factories import ChatMessageFactory
+
+pytestmark = pytest.mark.django_db
+
+
+def test_pages_walk_back_through_rows_with_equal_timestamps():
+    messages = ChatMessageFactory.create_batch(5)
+    # Rows created in the same instant are ordered by primary key
+    ChatMessage.objects.update(created_at=timezone.now())
+    queryset = ChatMessage.objects.all()
+
+    first = paginate_before(queryset, None, page_size=2)
+    second = paginate_before(queryset, first.next_cursor, page_size=2)
+    last = paginate_before(queryset, second.next_cursor, page_size=2)
+
+    newest_first = [message.pk for message in reversed(messages)]
+    assert [
+        message.pk for page in (first, second, last) for message in page.items
+    ] == newest_first
+    assert (first.has_more, second.has_more, last.has_more) == (True, True, False)
+
+
+def test_malformed_cursor_is_rejected():
+    with pytest.raises(InvalidCursorError):
+        paginate_before(ChatMessage.objects.all(), "not-a-cursor", page_size=2)
@@ -0,0 +1,92 @@
+from http import HTTPStatus
+
+import pytest
+from asgiref.sync import async_to_sync
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.http import StreamingHttpResponse
+from django.test import RequestFactory
+
+from biilim.core import metrics
+from biilim.core.ratelimit import RateLimitedError
+from biilim.core.ratelimit import limit_concurrency
+from biilim.core.ratelimit import parse_rate
+from biilim.core.ratelimit import rate_limit
+from biilim.core.ratelimit import take_token
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture(autouse=True)
+def _clear_cache():
+    cache.clear()
+
+
+def test_parse_rate():
+    assert parse_rate("30/m") == (30, 0.5)
+
+
+def test_bucket_refills_over_time(monkeypatch):
+    now = 1_000.0
+    monkeypatch.setattr("biilim.core.ratelimit.time.time", lambda: now)
+    take_token("bucket", "2/m")
+    take_token("bucket", "2/m")
+
+    with pytest.raises(RateLimitedError) as exc_info:
+        take_token("bucket", "2/m")
+    assert exc_info.value.retry_after == pytest.approx(30)
+
+    now += 30
+    take_token("bucket", "2/m")
+
+
+def test_rate_limited_view_returns_htmx_partial(rf: RequestFactory, user, settings):
+    settings.LLM_RATE_LIMITS = {"chat": {"user": "1/m", "global": "100/m"}}
+    view = rate_limit("chat")(lambda request: HttpResponse("answer"))
+    request = rf.post("/", HTTP_HX_REQUEST="true")
+    request.user = user
+    request.htmx = True  # type: ignore[attr-defined]
+    rejected_before = metrics.get_counter("ratelimit.chat.rejected")
+
+    assert view(request).content == b"answer"
+    response = view(request)
+
+    assert response.status_code == HTTPStatus.TOO_MANY_REQUESTS
+    assert response["Retry-After"] == "60"
+    assert "Too many requests" in response.content.decode()
+    assert metrics.get_counter("ratelimit.chat.rejected") == rejected_before + 1
+
+
+def test_concurrency_slot_is_held_until_stream_is_closed(rf: RequestFactory, settings):
+    settings.LLM_MAX_CONCURRENCY = 1
+    view = limit_concurrency(lambda request: StreamingHttpResponse(iter([b"token"])))
+
+    streaming = view(rf.get("/"))
+    assert view(rf.get("/")).status_code == HTTPStatus.TOO_MANY_REQUESTS
+
+    assert b"".join(streaming.streaming_content) == b"token"
+    streaming.close()
+    assert view(rf.get("/")).status_code == HTTPStatus.OK
+
+
+def test_async_view_holds_concurrency_slot_until_stream_ends(
+    rf: RequestFactory,
+    settings,
+):
+    settings.LLM_MAX_CONCURRENCY = 1
+
+    async def tokens():
+        yield b"token"
+
+    @limit_concurrency
+    async def view(request):
+        return StreamingHttpResponse(tokens())
+
+    async def consume(response):
+        return b"".join([part async for part in response.streaming_content])
+
+    streaming = async_to_sync(view)(rf.get("/"))
+    assert async_to_sync(view)(rf.get("/")).status_code == HTTPStatus.TOO_MANY_REQUESTS
+
+    assert async_to_sync(consume)(streaming) == b"token"
+    assert async_to_sync(view)(rf.get("/")).status_code == HTTPStatus.OK
@@ -0,0 +1,359 @@
+"""
+Persistent store for the HTML animations of ``hx_get_visual_helpers``.
+
+Generating an animation is a full smolagents ``CodeAgent`` run, so results are stored
+per topic, section and coarse profile fingerprint (age band plus learning styles) and
+served to every similar student. Recently served animations are also kept in the cache
+(Redis in production) for ``ANIMATION_HOT_CACHE_TIMEOUT`` seconds.
+
+Stored animations older than ``ANIMATION_STORE_TTL`` are regenerated on their next
+use, and ``evict_animations`` trims the store to the ``ANIMATION_STORE_MAX_ROWS``
+most recently used rows.
+
+After a topic is created, ``reserve_animations`` adds pending rows for the topic and
+its sections that ``pregenerate_animation`` fills in from Celery, so the first learner
+does not wait for the agent either.
+"""
+
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from biilim.ai.agents import ANIMATION_ERROR_DESCRIPTION
+from biilim.ai.agents import AnimationSchema
+from biilim.ai.agents import get_html_animation_for_topic
+from biilim.core import metrics
+from biilim.learn.models import Animation
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds of the age bands animations are shared within.
+AGE_BANDS = (9, 12, 15, 18, 25)
+
+
+def age_band(age: int | None) -> str:
+    if age is None:
+        return "any"
+    lower = 0
+    for upper in AGE_BANDS:
+        if age <= upper:
+            return f"{lower}-{upper}"
+        lower = upper + 1
+    return f"{lower}+"
+
+
+def profile_fingerprint(profile) -> str:
+    """
+    Return the coarse fingerprint of the profiles that can share an animation.
+
+    Args:
+        profile (Profile): The student's profile.
+
+    Returns:
+        str: The age band and the sorted learning styles, e.g.
+        ``"13-15|simulation,visual"``.
+    """
+    styles = sorted(
+        {
+            style.strip()
+            for style in profile.learning_styles.split(",")
+            if style.strip()
+        },
+    )
+    return f"{age_band(profile.age)}|{','.join(styles)}"
+
+
+def wants_animations(profile) -> bool:
+    """Interactive visualizations are only offered to visual and simulation learners."""
+    preferred_styles = {style.strip() for style in profile.learning_styles.split(",")}
+    return bool(preferred_styles & {"simulation", "visual"})
+
+
+def _hot_cache_key(topic_id: int, section_id: int | None, fingerprint: str) -> str:
+    return f"learn:animation:{topic_id}:{section_id or 0}:{fingerprint}"
+
+
+def get_animation(
+    topic,
+    section,
+    profile,
+    *,
+    regenerate: bool = False,
+) -> AnimationSchema:
+    """
+    Return the animation for ``topic`` (or one of its sections), generating it only
+    when no fresh one is stored for the profile's fingerprint.
+
+    Args:
+        topic (Topic): The topic to visualize.
+        section (Section | None): The section to visualize, if any.
+        profile (Profile): The student's profile.
+        regenerate (bool): Ignore stored animations and generate a new one.
+
+    Returns:
+        AnimationSchema: The animation to display.
+    """
+    if (
+        not regenerate
+        and (stored := get_stored_animation(topic, section, profile)) is not None
+    ):
+        return stored
+
+    metrics.incr("animation_store.miss")
+    animation = generate_animation(topic, section, profile)
+    if animation.description == ANIMATION_ERROR_DESCRIPTION:
+        # Never store the fallback, the next click should try again
+        return animation
+
+    save_animation(
+        topic.pk,
+        section.pk if section else None,
+        profile_fingerprint(profile),
+        animation,
+    )
+    return animation
+
+
+def get_stored_animation(topic, section, profile) -> AnimationSchema | None:
+    """
+    Return the fresh stored animation of ``topic`` (or one of its sections) for the
+    profile's fingerprint, from the hot cache when possible; ``None`` if there is none.
+    """
+    fingerprint = profile_fingerprint(profile)
+    section_id = section.pk if section else None
+    hot_key = _hot_cache_key(topic.pk, section_id, fingerprint)
+
+    if (
+        settings.ANIMATION_HOT_CACHE_TIMEOUT
+        and (cached := cache.get(hot_key)) is not None
+    ):
+        metrics.incr("animation_store.hot_hit")
+        return AnimationSchema.model_validate(cached)
+
+    stored = (
+        Animation.objects.filter(
+            topic=topic,
+            section=section,
+            profile_fingerprint=fingerprint,
+            status="ready",
+        )
+        .filter(
+            created_at__gte=timezone.now()
+            - timedelta(seconds=settings.ANIMATION_STORE_TTL),
+        )
+        .only("pk", "full_html_code", "description")
+        .first()
+    )
+    if stored is None:
+        return None
+    metrics.incr("animation_store.hit")
+    Animation.objects.filter(pk=stored.pk).update(last_used_at=timezone.now())
+    animation = AnimationSchema(
+        full_html_code=stored.full_html_code,
+        description=stored.description,
+    )
+    _set_hot(hot_key, animation)
+    return animation
+
+
+def generate_animation(topic, section, profile) -> AnimationSchema:
+    """Run the visual helper agent for ``topic`` or one of its sections."""
+    return get_html_animation_for_topic(
+        topic_title=topic.title,
+        topic_description=topic.description,
+        user_profile={
+            "age": profile.age,
+            "city": profile.city,
+            "country": profile.country,
+            "hobbies": profile.hobbies,
+            "learning_styles": profile.learning_styles,
+        },
+        section_title=section.title if section else None,
+    )
+
+
+def save_animation(
+    topic_id: int,
+    section_id: int | None,
+    fingerprint: str,
+    animation: AnimationSchema,
+) -> None:
+    """Store a generated animation as ready, replacing any previous one."""
+    with transaction.atomic():
+        now = timezone.now()
+        Animation.objects.update_or_create(
+            topic_id=topic_id,
+            section_id=section_id,
+            profile_fingerprint=fingerprint,
+            defaults={
+                "status": "ready",
+                "full_html_code": animation.full_html_code,
+                "description": animation.description,
+                "created_at": now,
+                "last_used_at": now,
+            },
+        )
+    _set_hot(_hot_cache_key(topic_id, section_id, fingerprint), animation)
+    schedule_animation_eviction()
+
+
+def is_animation_pending(topic, section, profile) -> bool:
+    """Whether the animation is still being generated in the background."""
+    return Animation.objects.filter(
+        topic=topic,
+        section=section,
+        profile_fingerprint=profile_fingerprint(profile),
+        status="pending",
+        created_at__gte=timezone.now()
+        - timedelta(seconds=settings.ANIMATION_PENDING_TIMEOUT),
+    ).exists()
+
+
+def preloaded_animation_sections(topic, profile) -> set[int | None]:
+    """
+    Return the sections of ``topic`` (``None`` for the topic itself) whose animation is
+    stored or being generated for the profile's fingerprint.
+    """
+    now = timezone.now()
+    return set(
+        Animation.objects.filter(
+            topic=topic,
+            profile_fingerprint=profile_fingerprint(profile),
+        )
+        .filter(
+            Q(
+                status="ready",
+                created_at__gte=now - timedelta(seconds=settings.ANIMATION_STORE_TTL),
+            )
+            | Q(
+                status="pending",
+                created_at__gte=now
+                - timedelta(seconds=settings.ANIMATION_PENDING_TIMEOUT),
+            ),
+        )
+        .values_list("section_id", flat=True),
+    )
+
+
+def reserve_animations(topic, profile) -> list[int]:
+    """
+    Add pending animations for ``topic`` and each of its sections that have none yet
+    for the profile's fingerprint.
+
+    Returns:
+        list[int]: The primary keys of the new pending animations.
+    """
+    fingerprint = profile_fingerprint(profile)
+    existing = set(
+        Animation.objects.filter(
+            topic=topic,
+            profile_fingerprint=fingerprint,
+        ).values_list("section_id", flat=True),
+    )
+    section_ids = [None, *topic.sections.values_list("pk", flat=True)]
+    created = Animation.objects.bulk_create(
+        [
+            Animation(
+                topic=topic,
+                section_id=section_id,
+                profile_fingerprint=fingerprint,
+                status="pending",
+            )
+            for section_id in section_ids
+            if section_id not in existing
+        ],
+    )
+    return [animation.pk for animation in created]
+
+
+def pregenerate_animation(animation_id: int) -> bool:
+    """
+    Generate a pending animation for the profile of the topic's author.
+
+    A failed generation drops the pending row so the next click generates on demand.
+
+    Returns:
+        bool: Whether the animation is now ready.
+    """
+    animation = (
+        Animation.objects.select_related("topic__created_by__profile", "section")
+        .filter(pk=animation_id, status="pending")
+        .first()
+    )
+    if animation is None:
+        return False
+    author = animation.topic.created_by
+    if author is None:
+        animation.delete()
+        return False
+
+    generated = generate_animation(animation.topic, animation.section, author.profile)
+    if generated.description == ANIMATION_ERROR_DESCRIPTION:
+        animation.delete()
+        return False
+
+    save_animation(
+        animation.topic_id,
+        animation.section_id,
+        animation.profile_fingerprint,
+        generated,
+    )
+    return True
+
+
+def _set_hot(key: str, animation: AnimationSchema) -> None:
+    if settings.ANIMATION_HOT_CACHE_TIMEOUT:
+        cache.set(
+            key,
+            animation.model_dump(),
+            timeout=settings.ANIMATION_HOT_CACHE_TIMEOUT,
+        )
+
+
+def evict_animations() -> int:
+    """
+    Delete expired animations and the least recently used ones beyond the store size.
+
+    Returns:
+        int: The number of deleted animations.
+    """
+    expired, _ = Animation.objects.filter(
+        created_at__lt=timezone.now() - timedelta(seconds=settings.ANIMATION_STORE_TTL),
+    ).delete()
+
+    cutoff = (
+        Animation.objects.order_by("-last_used_at")
+        .values_list("last_used_at", flat=True)[
+            settings.ANIMATION_STORE_MAX_ROWS : settings.ANIMATION_STORE_MAX_ROWS + 1
+        ]
+        .first()
+    )
+    evicted = 0
+    if cutoff is not None:
+        evicted, _ = Animation.objects.filter(last_used_at__lte=cutoff).delete()
+
+    if expired or evicted:
+        logger.info(
+            "Evicted %s expired and %s least recently used animations",
+            expired,
+            evicted,
+        )
+    return expired + evicted
+
+
+def schedule_animation_eviction() -> None:
+    """Queue ``evict_animations`` at most once per ``ANIMATION_EVICTION_INTERVAL``."""
+    # Imported lazily: the tasks import this module
+    from biilim.learn.tasks import evict_stored_animations  # noqa: PLC0415
+
+    if cache.add(
+        "learn:animation_eviction",
+        1,
+        timeout=settings.ANIMATION_EVICTION_INTERVAL,
+    ):
+        evict_stored_animations.delay()
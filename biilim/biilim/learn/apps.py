@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class LearnConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'biilim.learn'
+
+    def ready(self):
+        from biilim.learn import signals  # noqa: F401, PLC0415
@@ -0,0 +1,77 @@
+"""
+Topic catalogue shown on the learn index and the topics listing.
+
+The recommended topics feed is loaded by every visit to the index page, so it is kept
+in the cache (Redis in production) and rebuilt after a topic is saved or deleted, see
+``learn.signals``. The topics listing is keyset paginated on ``(created_at, id)``, see
+``core.pagination``. Both fetch only the columns the topic cards display.
+"""
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from biilim.core.pagination import Page
+from biilim.core.pagination import paginate_before
+from biilim.learn.models import Topic
+
+RECOMMENDED_TOPICS_CACHE_KEY = "learn:recommended_topics:v1"
+
+# Topics on the recommended feed of the index page
+RECOMMENDED_TOPICS_LIMIT = 6
+
+# The columns the topic cards display, plus the pagination key
+TOPIC_CARD_FIELDS = ("id", "title", "description", "is_recommended", "created_at")
+
+
+def build_recommended_topics() -> list[dict]:
+    """Return the newest recommended topics as card data, with one indexed query."""
+    return list(
+        Topic.objects.filter(is_recommended=True)
+        .order_by("-created_at")
+        .values(*TOPIC_CARD_FIELDS)[:RECOMMENDED_TOPICS_LIMIT],
+    )
+
+
+def get_recommended_topics() -> list[dict]:
+    """Return the recommended topics feed from the cache, building it on a miss."""
+    topics = cache.get(RECOMMENDED_TOPICS_CACHE_KEY)
+    if topics is None:
+        topics = rebuild_recommended_topics()
+    return topics
+
+
+def rebuild_recommended_topics() -> list[dict]:
+    topics = build_recommended_topics()
+    cache.set(RECOMMENDED_TOPICS_CACHE_KEY, topics, timeout=None)
+    return topics
+
+
+def schedule_recommended_topics_rebuild() -> None:
+    """
+    Rebuild the feed once the current transaction commits.
+
+    Deferring the rebuild means the feed never caches uncommitted topics.
+    """
+    transaction.on_commit(rebuild_recommended_topics)
+
+
+def topics_page(cursor: str | None) -> Page:
+    """
+    Return one page of the topics listing, newest first.
+
+    Args:
+        cursor (str | None): The ``next_cursor`` of the previous page, ``None``
+            for the first page.
+
+    Returns:
+        Page: The topics of the page and the cursor of the next page.
+
+    Raises:
+        InvalidCursorError: When the cursor is malformed.
+    """
+    return paginate_before(
+        Topic.objects.only(*TOPIC_CARD_FIELDS),
+        cursor,
+        settings.TOPICS_PAGE_SIZE,
+    )
@@ -0,0 +1,122 @@
+"""
+Context window manager for topic chats.
+
+A chat prompt gets at most ``CHAT_HISTORY_MAX_TURNS`` recent messages, fetched newest
+first with a database ``LIMIT``, plus the rolling ``ChatSummary`` of everything older.
+Summary and messages together are kept under ``CHAT_CONTEXT_TOKEN_BUDGET`` tokens by
+dropping the oldest messages first. Once ``CHAT_SUMMARY_REFRESH_EVERY`` messages have
+fallen out of the window without being summarized, ``refresh_chat_summary`` is queued
+to fold them into the summary in the background.
+"""
+
+import logging
+from dataclasses import dataclass
+from dataclasses import field
+
+from django.conf import settings
+from django.core.cache import cache
+
+from biilim.learn.models import EVALUATION_CHAT_TYPES
+from biilim.learn.models import ChatMessage
+from biilim.learn.models import ChatSummary
+
+logger = logging.getLogger(__name__)
+
+# Evaluations are one-off exchanges and are kept out of the conversation context.
+# ``learn_chatmsg_user_topic_time`` serves the filtered history as well.
+EXCLUDED_CHAT_TYPES = EVALUATION_CHAT_TYPES
+
+# Rough characters-per-token ratio of Gemini's tokenizer for English and Turkish text.
+CHARS_PER_TOKEN = 4
+
+
+def estimate_tokens(text: str) -> int:
+    """Estimate the number of tokens ``text`` costs in a prompt."""
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+@dataclass
+class ChatContext:
+    summary: str = ""
+    history: list[dict] = field(default_factory=list)
+
+    @property
+    def tokens(self) -> int:
+        return estimate_tokens(self.summary) + sum(
+            estimate_tokens(message["message_text"]) for message in self.history
+        )
+
+
+def chat_messages(user, topic):
+    """Return the messages of a user's conversation about ``topic``."""
+    return ChatMessage.objects.filter(user=user, topic=topic).exclude(
+        chat_type__in=EXCLUDED_CHAT_TYPES,
+    )
+
+
+def build_chat_context(user, topic, *, skip_latest: bool = True) -> ChatContext:
+    """
+    Collect the conversation context to send along with a new chat message.
+
+    Args:
+        user (User): The user chatting.
+        topic (Topic): The topic being discussed.
+        skip_latest (bool): Leave out the newest message, i.e. the one being answered.
+
+    Returns:
+        ChatContext: The rolling summary and the recent messages, oldest first, within
+        the token budget.
+    """
+    max_turns = settings.CHAT_HISTORY_MAX_TURNS
+    refresh_every = settings.CHAT_SUMMARY_REFRESH_EVERY
+    offset = 1 if skip_latest else 0
+
+    # Newest first, and a few more than the window to detect unsummarized overflow
+    rows = list(
+        chat_messages(user, topic)
+        .order_by("-created_at")
+        .values("sender", "message_text", "created_at")[
+            offset : offset + max_turns + refresh_every
+        ],
+    )
+    window, overflow = rows[:max_turns], rows[max_turns:]
+
+    summary = (
+        ChatSummary.objects.filter(user=user, topic=topic)
+        .values("summary_text", "summarized_until")
+        .first()
+    )
+    summary_text = summary["summary_text"] if summary else ""
+    summarized_until = summary["summarized_until"] if summary else None
+
+    if len(overflow) == refresh_every and (
+        summarized_until is None or overflow[-1]["created_at"] > summarized_until
+    ):
+        schedule_summary_refresh(user.pk, topic.pk)
+
+    context = ChatContext(summary=summary_text)
+    budget = settings.CHAT_CONTEXT_TOKEN_BUDGET - estimate_tokens(summary_text)
+    for message in window:
+        cost = estimate_tokens(message["message_text"])
+        if cost > budget:
+            break
+        budget -= cost
+        context.history.append(
+            {"sender": message["sender"], "message_text": message["message_text"]},
+        )
+
+    context.history.reverse()
+    return context
+
+
+def schedule_summary_refresh(user_id: int, topic_id: int) -> None:
+    """Queue a summary refresh of the conversation, at most once per interval."""
+    # Imported lazily: the tasks depend on the AI client, which depends on this module
+    from biilim.learn.tasks import refresh_chat_summary  # noqa: PLC0415
+
+    if cache.add(
+        f"learn:chat_summary_refresh:{user_id}:{topic_id}",
+        1,
+        timeout=settings.CHAT_SUMMARY_REFRESH_TTL,
+    ):
+        refresh_chat_summary.delay(user_id, topic_id)
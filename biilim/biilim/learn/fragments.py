@@ -0,0 +1,40 @@
+"""
+Versioned fragment caching of the ``topic_detail`` page.
+
+The sections, quizzes and choices of a topic are the same for every learner, so
+``topic_detail.html`` renders them inside ``{% cache %}`` blocks keyed by the topic id
+and its ``updated_at``. Changing a section, quiz, question or choice bumps the topic's
+``updated_at`` (see ``learn.signals``), which moves every fragment of the topic to a new
+key; stale fragments are never read again and expire after
+``TOPIC_FRAGMENT_CACHE_TIMEOUT`` seconds.
+"""
+
+from django.db.models import Q
+from django.utils import timezone
+
+from biilim.learn.models import Topic
+
+
+def fragment_version(topic) -> str:
+    """Return the part of the fragment cache keys that changes with the topic."""
+    return topic.updated_at.isoformat()
+
+
+def touch_topics(condition: Q) -> None:
+    """
+    Move the topics matching ``condition`` to new fragment cache keys.
+
+    Uses a queryset update, so neither the topic's signals nor its ``auto_now`` logic
+    run.
+    """
+    Topic.objects.filter(condition).update(updated_at=timezone.now())
+
+
+def touch_topic_of_quiz(quiz_id: int) -> None:
+    touch_topics(Q(quizzes=quiz_id) | Q(sections__quizzes=quiz_id))
+
+
+def touch_topic_of_question(question_id: int) -> None:
+    touch_topics(
+        Q(quizzes__questions=question_id) | Q(sections__quizzes__questions=question_id),
+    )
@@ -0,0 +1,295 @@
+"""
+Quiz grading service used by ``hx_submit_quiz``.
+
+A submission is graded in memory against the quiz's answer key and every
+``StudentAnswer`` is written with one ``bulk_create``. Generated quizzes never change,
+so answer keys are cached (Redis in production) as compact ``(question id, letter)``
+tuples; a hit grades without reading the database for the key. The cache keys carry
+a per-quiz version that is bumped when a question is saved or deleted (see
+``learn.signals``), so a grader that read the old questions can only fill a key that
+is never read again. The returned ``GradingResult`` carries the per-question outcome
+so feedback can be rendered without further queries.
+
+Each submission is also recorded as a numbered ``QuizAttempt`` with its score, in the
+same transaction as the answers, so score history and best scores are single indexed
+queries on the attempts.
+"""
+
+import time
+from dataclasses import dataclass
+from dataclasses import replace
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import IntegrityError
+from django.db import transaction
+from django.db.models import Max
+
+from biilim.learn.models import Question
+from biilim.learn.models import QuizAttempt
+from biilim.learn.models import StudentAnswer
+
+QUESTION_FIELD_PREFIX = "question-"
+
+# Bump when the cached answer key format changes
+ANSWER_KEY_CACHE_VERSION = 1
+
+# Longer quiz durations are not plausible and are not recorded
+MAX_QUIZ_DURATION = timedelta(hours=24)
+
+# Concurrent submissions by the same user can race for the next attempt number
+ATTEMPT_NUMBER_RETRIES = 3
+
+
+@dataclass(frozen=True)
+class AnswerKeyEntry:
+    question_id: int
+    number: int
+    correct_letter: str
+
+
+@dataclass(frozen=True)
+class QuestionResult:
+    question_id: int
+    number: int
+    selected_letter: str | None
+    correct_letter: str
+
+    @property
+    def is_answered(self) -> bool:
+        return self.selected_letter is not None
+
+    @property
+    def is_correct(self) -> bool:
+        return self.selected_letter == self.correct_letter
+
+
+@dataclass(frozen=True)
+class GradingResult:
+    questions: list[QuestionResult]
+    attempt: QuizAttempt | None = None
+
+    @property
+    def total_questions(self) -> int:
+        return len(self.questions)
+
+    @property
+    def correct_answers(self) -> int:
+        return sum(result.is_correct for result in self.questions)
+
+    @property
+    def score_percentage(self) -> int:
+        # Unanswered questions count as wrong
+        if not self.questions:
+            return 0
+        return int(self.correct_answers / self.total_questions * 100)
+
+
+def answer_key_version_key(quiz_id: int) -> str:
+    return f"learn:answer_key_version:{quiz_id}"
+
+
+def answer_key_cache_key(quiz_id: int, version: int) -> str:
+    return f"learn:answer_key:v{ANSWER_KEY_CACHE_VERSION}:{quiz_id}:{version}"
+
+
+def answer_key_version(quiz_id: int) -> int:
+    """Return the current version of the quiz's answer key cache key."""
+    version_key = answer_key_version_key(quiz_id)
+    version = cache.get(version_key)
+    if version is None:
+        _add_version(version_key)
+        version = cache.get(version_key)
+    return version
+
+
+def load_answer_key(quiz_id: int) -> list[AnswerKeyEntry]:
+    """
+    Load the answer key of a quiz from the database in question order, in one query.
+
+    Args:
+        quiz_id (int): The primary key of the quiz.
+
+    Returns:
+        list[AnswerKeyEntry]: One entry per question, numbered from 1 like the quiz
+        form.
+    """
+    rows = (
+        Question.objects.filter(quiz_id=quiz_id)
+        .order_by("index", "pk")
+        .values_list("pk", "correct_answer_letter")
+    )
+    return _entries(rows)
+
+
+def get_answer_key(quiz_id: int) -> list[AnswerKeyEntry]:
+    """Return the answer key of a quiz from the cache, loading it on a miss."""
+    # The version is read before the questions, so a concurrent invalidation orphans
+    # whatever this call caches
+    key = answer_key_cache_key(quiz_id, answer_key_version(quiz_id))
+    cached = cache.get(key)
+    if cached is not None:
+        return _entries(cached)
+
+    answer_key = load_answer_key(quiz_id)
+    if answer_key:
+        cache.set(
+            key,
+            tuple((entry.question_id, entry.correct_letter) for entry in answer_key),
+            timeout=settings.ANSWER_KEY_CACHE_TIMEOUT,
+        )
+    return answer_key
+
+
+def invalidate_answer_key(quiz_id: int) -> None:
+    """Move the quiz's answer key to a new cache key once the transaction commits."""
+    version_key = answer_key_version_key(quiz_id)
+
+    def bump():
+        _add_version(version_key)
+        cache.incr(version_key)
+
+    # After the commit, so readers of the new version only see the new questions
+    transaction.on_commit(bump)
+
+
+def _add_version(version_key: str) -> None:
+    # Starts from the clock rather than 0, so an evicted counter never reuses the
+    # version of a stale key
+    cache.add(version_key, time.time_ns(), timeout=None)
+
+
+def _entries(rows) -> list[AnswerKeyEntry]:
+    return [
+        AnswerKeyEntry(question_id=pk, number=number, correct_letter=letter)
+        for number, (pk, letter) in enumerate(rows, start=1)
+    ]
+
+
+def parse_answers(data) -> dict[int, str]:
+    """
+    Extract the selected choice letters from submitted form data.
+
+    Args:
+        data (QueryDict | dict): Form data with ``question-<pk>`` fields.
+
+    Returns:
+        dict[int, str]: Selected letter by question primary key; malformed fields are
+        ignored.
+    """
+    answers = {}
+    for name, value in data.items():
+        question_id = name.removeprefix(QUESTION_FIELD_PREFIX)
+        if (
+            name.startswith(QUESTION_FIELD_PREFIX)
+            and question_id.isdigit()
+            and len(value) == 1
+        ):
+            answers[int(question_id)] = value
+    return answers
+
+
+def parse_duration(data) -> timedelta | None:
+    """Return the ``duration_seconds`` the quiz form measured, if it is plausible."""
+    seconds = data.get("duration_seconds", "")
+    if not seconds.isdigit():
+        return None
+    duration = timedelta(seconds=int(seconds))
+    return duration if duration <= MAX_QUIZ_DURATION else None
+
+
+def grade(answer_key: list[AnswerKeyEntry], answers: dict[int, str]) -> GradingResult:
+    """
+    Grade ``answers`` against ``answer_key`` in memory; answers to other questions
+    are ignored.
+    """
+    return GradingResult(
+        questions=[
+            QuestionResult(
+                question_id=entry.question_id,
+                number=entry.number,
+                selected_letter=answers.get(entry.question_id),
+                correct_letter=entry.correct_letter,
+            )
+            for entry in answer_key
+        ],
+    )
+
+
+def submit_quiz(user, quiz, data) -> GradingResult:
+    """
+    Grade a quiz submission and save the user's attempt and answers.
+
+    Args:
+        user (User): The user submitting the quiz.
+        quiz (Quiz): The submitted quiz.
+        data (QueryDict | dict): The submitted form data.
+
+    Returns:
+        GradingResult: The per-question results, the score and the saved attempt.
+    """
+    result = grade(get_answer_key(quiz.pk), parse_answers(data))
+    duration = parse_duration(data)
+
+    for retry in range(ATTEMPT_NUMBER_RETRIES):
+        try:
+            # The attempt and all its answers are saved or none are
+            with transaction.atomic():
+                attempt = _save_attempt(user, quiz, result, duration)
+            break
+        except IntegrityError:
+            if retry == ATTEMPT_NUMBER_RETRIES - 1:
+                raise
+    return replace(result, attempt=attempt)
+
+
+def _save_attempt(
+    user,
+    quiz,
+    result: GradingResult,
+    duration: timedelta | None,
+) -> QuizAttempt:
+    previous = QuizAttempt.objects.filter(user=user, quiz=quiz).aggregate(
+        number=Max("attempt_number"),
+    )["number"]
+    attempt = QuizAttempt.objects.create(
+        user=user,
+        quiz=quiz,
+        attempt_number=(previous or 0) + 1,
+        score=result.score_percentage,
+        correct_answers=result.correct_answers,
+        total_questions=result.total_questions,
+        duration=duration,
+    )
+    StudentAnswer.objects.bulk_create(
+        [
+            StudentAnswer(
+                user=user,
+                question_id=question.question_id,
+                attempt=attempt,
+                selected_choice_letter=question.selected_letter,
+                is_correct=question.is_correct,
+            )
+            for question in result.questions
+            if question.selected_letter is not None
+        ],
+    )
+    return attempt
+
+
+def attempt_history(user, quiz):
+    """Return the user's attempts at ``quiz``, latest first, in one indexed query."""
+    return QuizAttempt.objects.filter(user=user, quiz=quiz).order_by("-attempt_number")
+
+
+def best_attempt(user, quiz) -> QuizAttempt | None:
+    """
+    Return the user's highest scoring attempt at ``quiz``, the earliest on ties, in
+    one indexed query.
+    """
+    return (
+        QuizAttempt.objects.filter(user=user, quiz=quiz)
+        .order_by("-score", "attempt_number")
+        .first()
+    )
@@ -0,0 +1,201 @@
+"""
+Topic lookup layer used by ``topic_search`` before asking the AI for a new topic.
+
+Queries and topic titles are normalized (Turkish-aware diacritic folding, case folding,
+stop word removal and light stemming) and compared with pg_trgm trigram similarity, so
+"photosynthesis basics", "how photosynthesis works" and "fotosyntesis" all resolve to
+the same existing topic instead of a new generation.
+
+The normalized title and description are stored on ``Topic`` (``lookup_title`` and
+``lookup_description``, set on save) behind trigram GIN indexes, so the ranking runs in
+the database and only the best matches are fetched. Results are paginated in the
+database too: a search counts its matches and fetches the card columns of one page.
+"""
+
+import logging
+import re
+import unicodedata
+
+from django.conf import settings
+from django.contrib.postgres.search import TrigramSimilarity
+from django.contrib.postgres.search import TrigramWordSimilarity
+from django.core.paginator import Paginator
+from django.db.models import Q
+from django.db.models import QuerySet
+from django.db.models import Value
+from django.db.models.functions import Greatest
+
+from biilim.core import metrics
+from biilim.learn.catalog import TOPIC_CARD_FIELDS
+from biilim.learn.models import Topic
+from biilim.learn.search import search_topic_titles
+from biilim.learn.search import search_topics
+
+logger = logging.getLogger(__name__)
+
+# Turkish letters are folded to their ASCII counterparts before the generic
+# diacritics removal; "I" and "İ" would otherwise lower-case incorrectly.
+TURKISH_FOLDING = str.maketrans(
+    {
+        "İ": "i",
+        "I": "i",
+        "ı": "i",  # noqa: RUF001
+        "Ç": "c",
+        "ç": "c",
+        "Ğ": "g",
+        "ğ": "g",
+        "Ö": "o",
+        "ö": "o",
+        "Ş": "s",
+        "ş": "s",
+        "Ü": "u",
+        "ü": "u",
+    },
+)
+
+STOP_WORDS = frozenset(
+    {
+        # English
+        "a",
+        "an",
+        "and",
+        "are",
+        "about",
+        "basic",
+        "basics",
+        "does",
+        "explain",
+        "explained",
+        "for",
+        "fundamental",
+        "fundamentals",
+        "guide",
+        "how",
+        "in",
+        "intro",
+        "introduction",
+        "is",
+        "learn",
+        "of",
+        "on",
+        "the",
+        "to",
+        "what",
+        "why",
+        "with",
+        "work",
+        "works",
+        # Turkish
+        "bir",
+        "da",
+        "de",
+        "giris",
+        "ile",
+        "nasil",
+        "ne",
+        "nedir",
+        "neden",
+        "temel",
+        "temelleri",
+        "ve",
+    },
+)
+
+# Suffixes stripped by the light stemmer, longest first.
+SUFFIXES = ("ing", "ies", "es", "ed", "ly", "s", "lar", "ler")
+MIN_STEM_LENGTH = 4
+
+WORD_RE = re.compile(r"[a-z0-9]+")
+
+
+def _stem(word: str) -> str:
+    for suffix in SUFFIXES:
+        if word.endswith(suffix) and len(word) - len(suffix) >= MIN_STEM_LENGTH:
+            return word[: -len(suffix)]
+    return word
+
+
+def normalize_query(text: str) -> str:
+    """
+    Normalize a search query or topic title for comparison.
+
+    Args:
+        text (str): Raw user input or topic title.
+
+    Returns:
+        str: Space separated stems without diacritics, case or stop words.
+    """
+    text = text.translate(TURKISH_FOLDING)
+    text = unicodedata.normalize("NFKD", text)
+    text = "".join(char for char in text if not unicodedata.combining(char)).casefold()
+    words = [_stem(word) for word in WORD_RE.findall(text) if word not in STOP_WORDS]
+    return " ".join(words)
+
+
+def find_similar_topics(query: str, limit: int = 6) -> QuerySet[Topic]:
+    """
+    Rank the topics against ``query`` in the database.
+
+    A topic scores the trigram similarity of its normalized title, or a discounted
+    word similarity of the query in its normalized description, whichever is higher.
+
+    Returns:
+        QuerySet[Topic]: Up to ``limit`` topics scoring at least
+        ``TOPIC_LOOKUP_THRESHOLD``, best first, annotated with their ``score``. Only
+        the card columns are fetched.
+    """
+    normalized = normalize_query(query)
+    if not normalized:
+        return Topic.objects.none()
+
+    score = Greatest(
+        TrigramSimilarity("lookup_title", normalized),
+        Value(settings.TOPIC_LOOKUP_DESCRIPTION_WEIGHT)
+        * TrigramWordSimilarity(normalized, "lookup_description"),
+    )
+    return (
+        # The % and %> operators use the trigram indexes; their pg_trgm thresholds (0.3
+        # and 0.6) stay below the scores that pass TOPIC_LOOKUP_THRESHOLD
+        Topic.objects.filter(
+            Q(lookup_title__trigram_similar=normalized)
+            | Q(lookup_description__trigram_word_similar=normalized),
+        )
+        .only(*TOPIC_CARD_FIELDS)
+        .annotate(score=score)
+        .filter(score__gte=settings.TOPIC_LOOKUP_THRESHOLD)
+        .order_by("-score", "-created_at")[:limit]
+    )
+
+
+def lookup_topics(query: str, per_page: int) -> Paginator:
+    """
+    Find existing topics answering ``query`` so no new topic has to be generated.
+
+    The database search backend is asked first, then its fuzzy title search; the
+    normalized trigram lookup catches the near-duplicates both miss (stemming, Turkish
+    characters, descriptions). The first of them with matches is paginated: its count
+    is the only query until a page is fetched. Records ``topic_lookup.hit`` /
+    ``topic_lookup.miss`` counters; every hit is an AI generation saved.
+
+    Args:
+        query (str): The user's search query.
+        per_page (int): The topics on a page.
+
+    Returns:
+        Paginator: Up to ``TOPIC_SEARCH_MAX_RESULTS`` matching topics, best first, with
+        only their card columns. Empty when a new topic is needed.
+    """
+    max_results = settings.TOPIC_SEARCH_MAX_RESULTS
+    searches = (
+        search_topics(query).only(*TOPIC_CARD_FIELDS)[:max_results],
+        search_topic_titles(query).only(*TOPIC_CARD_FIELDS)[:max_results],
+        find_similar_topics(query),
+    )
+    for topics in searches:
+        paginator = Paginator(topics, per_page)
+        if paginator.count:
+            metrics.incr("topic_lookup.hit")
+            return paginator
+
+    metrics.incr("topic_lookup.miss")
+    return paginator
@@ -0,0 +1,253 @@
+import random
+import statistics
+import time
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.db import transaction
+
+from biilim.learn.chat_context import chat_messages
+from biilim.learn.models import ChatMessage
+from biilim.learn.models import Question
+from biilim.learn.models import Quiz
+from biilim.learn.models import StudentAnswer
+from biilim.learn.models import Topic
+
+BENCH_PREFIX = "bench_chat_queries"
+
+# The composite indexes under test
+BENCH_INDEXES = [
+    "learn_chatmsg_user_topic_time",
+    "learn_studentanswer_user_q",
+]
+
+CHAT_TYPE_WEIGHTS = {
+    "general_chat": 80,
+    "explanation_submission": 8,
+    "evaluation_feedback": 8,
+    "welcome_message": 4,
+}
+
+
+class Command(BaseCommand):
+    """
+    Seed a large chat and answer history, then compare the EXPLAIN plans and latencies
+    of the chat history and answer lookups without and with their composite indexes.
+
+    The "before" run drops the indexes in a transaction that is rolled back afterwards,
+    so the schema is left as migrated. Seeded rows are reused by later runs with
+    ``--keep`` and deleted otherwise.
+    """
+
+    help = (
+        "Benchmarks the ChatMessage and StudentAnswer lookups without and with their "
+        "composite indexes."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--messages",
+            type=int,
+            default=1_000_000,
+            help="Chat messages to seed.",
+        )
+        parser.add_argument(
+            "--answers",
+            type=int,
+            default=200_000,
+            help="Student answers to seed.",
+        )
+        parser.add_argument(
+            "--users",
+            type=int,
+            default=200,
+            help="Users the rows are spread over.",
+        )
+        parser.add_argument(
+            "--topics",
+            type=int,
+            default=50,
+            help="Topics the messages are spread over.",
+        )
+        parser.add_argument(
+            "--repeat",
+            type=int,
+            default=50,
+            help="Runs of each query per scenario.",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=10_000,
+            help="Rows per seeding INSERT.",
+        )
+        parser.add_argument(
+            "--keep",
+            action="store_true",
+            help="Keep the seeded rows for the next run.",
+        )
+
+    def handle(self, *args, **options):
+        users, topics, question = self._seed(options)
+        try:
+            queries = self._queries(users[0], topics[0], question)
+
+            with transaction.atomic():
+                with connection.cursor() as cursor:
+                    for name in BENCH_INDEXES:
+                        cursor.execute(f"DROP INDEX {connection.ops.quote_name(name)}")
+                self._run(
+                    "before (foreign key indexes only)",
+                    queries,
+                    options["repeat"],
+                )
+                transaction.set_rollback(True)
+
+            self._run("after (composite indexes)", queries, options["repeat"])
+        finally:
+            if not options["keep"]:
+                self._cleanup()
+
+    def _seed(self, options):
+        user_model = get_user_model()
+        users = list(
+            user_model.objects.filter(email__startswith=BENCH_PREFIX).order_by("pk"),
+        )
+        topics = list(
+            Topic.objects.filter(title__startswith=BENCH_PREFIX).order_by("pk"),
+        )
+        quiz = Quiz.objects.filter(topic__in=topics[:1], is_graded=True).first()
+        if users and topics and quiz:
+            self.stdout.write(
+                f"Reusing {len(users)} users and {len(topics)} topics seeded earlier",
+            )
+            return users, topics, quiz.questions.order_by("index").first()
+
+        self._cleanup()
+        users = user_model.objects.bulk_create(
+            [
+                user_model(
+                    email=f"{BENCH_PREFIX}_{i}@example.com",
+                    password=make_password(None),
+                )
+                for i in range(options["users"])
+            ],
+        )
+        topics = Topic.objects.bulk_create(
+            [Topic(title=f"{BENCH_PREFIX} {i}") for i in range(options["topics"])],
+        )
+        quiz = Quiz.objects.create(topic=topics[0], is_graded=True)
+        questions = Question.objects.bulk_create(
+            [
+                Question(
+                    quiz=quiz,
+                    question_text=f"Question {i}?",
+                    correct_answer_letter="A",
+                    index=i,
+                )
+                for i in range(10)
+            ],
+        )
+
+        started = time.perf_counter()
+        chat_types, weights = zip(*CHAT_TYPE_WEIGHTS.items(), strict=True)
+        self._bulk_create(
+            ChatMessage,
+            (
+                ChatMessage(
+                    user=random.choice(users),  # noqa: S311
+                    topic=random.choice(topics),  # noqa: S311
+                    sender=random.choice(["user", "ai"]),  # noqa: S311
+                    message_text="Lorem ipsum dolor sit amet, consectetur elit.",
+                    chat_type=random.choices(chat_types, weights)[0],  # noqa: S311
+                )
+                for _ in range(options["messages"])
+            ),
+            options["batch_size"],
+        )
+        self._bulk_create(
+            StudentAnswer,
+            (
+                StudentAnswer(
+                    user=random.choice(users),  # noqa: S311
+                    question=random.choice(questions),  # noqa: S311
+                    selected_choice_letter=random.choice("ABCD"),  # noqa: S311
+                )
+                for _ in range(options["answers"])
+            ),
+            options["batch_size"],
+        )
+        if connection.vendor == "postgresql":
+            with connection.cursor() as cursor:
+                tables = [
+                    model._meta.db_table  # noqa: SLF001
+                    for model in (ChatMessage, StudentAnswer)
+                ]
+                cursor.execute(f"ANALYZE {', '.join(tables)}")
+        self.stdout.write(
+            f"Seeded {options['messages']} messages and {options['answers']} answers "
+            f"in {time.perf_counter() - started:.0f}s",
+        )
+        return users, topics, questions[0]
+
+    @staticmethod
+    def _bulk_create(model, objects, batch_size: int):
+        batch = []
+        for obj in objects:
+            batch.append(obj)
+            if len(batch) == batch_size:
+                model.objects.bulk_create(batch)
+                batch = []
+        model.objects.bulk_create(batch)
+
+    @staticmethod
+    def _queries(user, topic, question) -> dict:
+        """The lookups of the chat views, the chat context and the quiz answers."""
+        return {
+            "chat history": ChatMessage.objects.filter(user=user, topic=topic).order_by(
+                "created_at",
+            ),
+            "conversation window": chat_messages(user, topic)
+            .order_by("-created_at")
+            .values("sender", "message_text", "created_at")[:18],
+            "stream answered check": ChatMessage.objects.filter(
+                user=user,
+                topic=topic,
+                created_at__gt=topic.created_at,
+            )
+            .order_by()
+            .values("pk")[:1],
+            "answers to question": StudentAnswer.objects.filter(
+                user=user,
+                question=question,
+            ),
+        }
+
+    def _run(self, scenario: str, queries: dict, repeat: int):
+        self.stdout.write(self.style.MIGRATE_HEADING(scenario))
+        for name, queryset in queries.items():
+            timings = []
+            for _ in range(repeat):
+                started = time.perf_counter()
+                list(queryset.all())
+                timings.append((time.perf_counter() - started) * 1000)
+            p95 = (
+                statistics.quantiles(timings, n=20)[-1]
+                if len(timings) > 1
+                else timings[0]
+            )
+            self.stdout.write(
+                f"{name:<22} p50={statistics.median(timings):.2f}ms p95={p95:.2f}ms",
+            )
+            for line in queryset.explain().splitlines():
+                self.stdout.write(f"    {line}")
+
+    def _cleanup(self):
+        bench_users = get_user_model().objects.filter(email__startswith=BENCH_PREFIX)
+        # Neither model has dependent rows or signal receivers: these are single DELETEs
+        ChatMessage.objects.filter(user__in=bench_users).delete()
+        StudentAnswer.objects.filter(user__in=bench_users).delete()
+        Topic.objects.filter(title__startswith=BENCH_PREFIX).delete()
+        bench_users.delete()
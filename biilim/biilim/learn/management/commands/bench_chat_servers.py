@@ -0,0 +1,289 @@
+import asyncio
+import logging
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+from contextlib import contextmanager
+
+import httpx
+from django.conf import settings
+from django.contrib.auth import BACKEND_SESSION_KEY
+from django.contrib.auth import HASH_SESSION_KEY
+from django.contrib.auth import SESSION_KEY
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.contrib.sessions.backends.db import SessionStore
+from django.core.management.base import BaseCommand
+from django.core.management.base import CommandError
+from django.urls import reverse
+
+from biilim.ai.stub_server import run_stub_server
+from biilim.learn.models import ChatMessage
+from biilim.learn.models import Topic
+from biilim.learn.streaming import sse_event
+from biilim.users.models import Profile
+
+BENCH_PREFIX = "bench_chat_servers"
+
+SERVER_START_TIMEOUT = 30
+
+
+@contextmanager
+def run_server(command: list[str], env: dict, port: int, output=None):
+    """Run a server command for the block, once its port accepts connections."""
+    process = subprocess.Popen(  # noqa: S603
+        command,
+        env=env,
+        cwd=settings.BASE_DIR,
+        stdout=output,
+        stderr=output,
+    )
+    try:
+        deadline = time.monotonic() + SERVER_START_TIMEOUT
+        while True:
+            if process.poll() is not None:
+                msg = f"{command[2]} exited with status {process.returncode}"
+                raise CommandError(msg)
+            try:
+                socket.create_connection(("127.0.0.1", port), timeout=1).close()
+                break
+            except OSError:
+                if time.monotonic() > deadline:
+                    msg = f"{command[2]} did not start within {SERVER_START_TIMEOUT}s"
+                    raise CommandError(msg) from None
+                time.sleep(0.1)
+        yield process
+    finally:
+        process.terminate()
+        process.wait(timeout=SERVER_START_TIMEOUT)
+
+
+class Command(BaseCommand):
+    """
+    Load test the streamed chat answers (``hx_chat_stream``) under gunicorn's sync WSGI
+    workers and under uvicorn's ASGI workers, against a local stub of the Gemini API.
+
+    Both servers run the current settings with the same number of worker processes, so
+    the difference is how many streams a worker can keep open while they wait on the
+    LLM: one per thread under WSGI, as many as the event loop holds under ASGI. Every
+    request answers its own chat message; the seeded user, topics and messages are
+    deleted afterwards.
+    """
+
+    help = (
+        "Load tests the chat answer stream under WSGI and ASGI workers against a "
+        "stubbed LLM."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--requests",
+            type=int,
+            default=200,
+            help="Streams requested per scenario.",
+        )
+        parser.add_argument(
+            "--concurrency",
+            type=int,
+            default=50,
+            help="Streams the load generator keeps open.",
+        )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=2,
+            help="Worker processes of each server.",
+        )
+        parser.add_argument(
+            "--threads",
+            type=int,
+            default=1,
+            help="Threads per WSGI worker (1 is gunicorn's sync worker).",
+        )
+        parser.add_argument(
+            "--latency-ms",
+            type=float,
+            default=500,
+            help="Simulated time to the first token.",
+        )
+        parser.add_argument(
+            "--chunk-ms",
+            type=float,
+            default=50,
+            help="Simulated time between streamed tokens.",
+        )
+
+    def handle(self, *args, **options):
+        logging.disable(logging.INFO)
+        user, session = self._login()
+        cookies = {settings.SESSION_COOKIE_NAME: session.session_key}
+        try:
+            with run_stub_server(
+                latency=options["latency_ms"] / 1000,
+                chunk_latency=options["chunk_ms"] / 1000,
+            ) as stub:
+                env = {
+                    **os.environ,
+                    "GEMINI_BASE_URL": stub.base_url,
+                    "GEMINI_API_KEY": settings.GEMINI_API_KEY or "stub",
+                    # Measure the servers, not the LLM concurrency cap in front of them
+                    "LLM_MAX_CONCURRENCY": str(options["requests"]),
+                }
+                wsgi = f"{options['workers']}x{options['threads']} threads"
+                scenarios = {
+                    f"WSGI gunicorn {wsgi}": self._wsgi_command,
+                    f"ASGI uvicorn {options['workers']} workers": self._asgi_command,
+                }
+                for name, command in scenarios.items():
+                    urls = self._seed_messages(user, options["requests"])
+                    port = self._free_port()
+                    # The servers' own logs are only shown with --verbosity 2
+                    output = None if options["verbosity"] > 1 else subprocess.DEVNULL
+                    with run_server(command(port, options), env, port, output):
+                        started = time.perf_counter()
+                        results = asyncio.run(
+                            self._load(
+                                f"http://127.0.0.1:{port}",
+                                urls,
+                                cookies,
+                                options["concurrency"],
+                            ),
+                        )
+                        elapsed = time.perf_counter() - started
+                    self._report(name, results, elapsed)
+        finally:
+            session.delete()
+            self._cleanup()
+
+    @staticmethod
+    def _wsgi_command(port: int, options) -> list[str]:
+        return [
+            sys.executable, "-m", "gunicorn", "config.wsgi",
+            "--bind", f"127.0.0.1:{port}",
+            "--workers", str(options["workers"]),
+            "--threads", str(options["threads"]),
+            "--timeout", "120",
+            "--log-level", "warning",
+        ]  # fmt: skip
+
+    @staticmethod
+    def _asgi_command(port: int, options) -> list[str]:
+        # The production image runs the same app with gunicorn and
+        # uvicorn_worker.UvicornWorker
+        return [
+            sys.executable, "-m", "uvicorn", "config.asgi:application",
+            "--host", "127.0.0.1",
+            "--port", str(port),
+            "--workers", str(options["workers"]),
+            "--no-access-log",
+            "--log-level", "warning",
+        ]  # fmt: skip
+
+    @staticmethod
+    def _free_port() -> int:
+        with socket.socket() as sock:
+            sock.bind(("127.0.0.1", 0))
+            return sock.getsockname()[1]
+
+    def _login(self):
+        self._cleanup()
+        user_model = get_user_model()
+        user = user_model.objects.create(
+            email=f"{BENCH_PREFIX}@example.com",
+            password=make_password(None),
+        )
+        Profile.objects.create(user=user, learning_styles="reading_writing")
+        session = SessionStore()
+        session[SESSION_KEY] = str(user.pk)
+        session[BACKEND_SESSION_KEY] = settings.AUTHENTICATION_BACKENDS[0]
+        session[HASH_SESSION_KEY] = user.get_session_auth_hash()
+        session.create()
+        return user, session
+
+    @staticmethod
+    def _seed_messages(user, count: int) -> list[str]:
+        # One topic per message: a later message on the same topic marks earlier
+        # ones as answered
+        topics = Topic.objects.bulk_create(
+            [
+                Topic(title=f"{BENCH_PREFIX} {time.monotonic_ns()} {i}")
+                for i in range(count)
+            ],
+        )
+        messages = ChatMessage.objects.bulk_create(
+            [
+                ChatMessage(
+                    user=user,
+                    topic=topic,
+                    sender="user",
+                    message_text="Why?",
+                    chat_type="general_chat",
+                )
+                for topic in topics
+            ],
+        )
+        return [
+            reverse(
+                "learn:hx-chat-stream",
+                kwargs={"pk": message.topic_id, "message_pk": message.pk},
+            )
+            for message in messages
+        ]
+
+    @staticmethod
+    async def _load(
+        base_url: str,
+        urls: list[str],
+        cookies: dict,
+        concurrency: int,
+    ) -> list[tuple[float, bool]]:
+        open_slots = asyncio.Semaphore(concurrency)
+        limits = httpx.Limits(max_connections=concurrency)
+        async with httpx.AsyncClient(
+            base_url=base_url,
+            cookies=cookies,
+            limits=limits,
+            timeout=300,
+        ) as client:
+
+            async def stream(url: str) -> tuple[float, bool]:
+                async with open_slots:
+                    started = time.perf_counter()
+                    try:
+                        response = await client.get(url)
+                        ok = (
+                            response.status_code == httpx.codes.OK
+                            and response.text.endswith(
+                                sse_event("done"),
+                            )
+                        )
+                    except httpx.HTTPError:
+                        ok = False
+                    return (time.perf_counter() - started) * 1000, ok
+
+            return await asyncio.gather(*(stream(url) for url in urls))
+
+    def _report(self, name: str, results: list[tuple[float, bool]], elapsed: float):
+        timings = [ms for ms, ok in results if ok]
+        errors = len(results) - len(timings)
+        if not timings:
+            self.stdout.write(
+                self.style.ERROR(f"{name:<28} all {errors} streams failed"),
+            )
+            return
+        p95 = (
+            statistics.quantiles(timings, n=20)[-1] if len(timings) > 1 else timings[0]
+        )
+        self.stdout.write(
+            f"{name:<28} streams={len(timings)} errors={errors} "
+            f"throughput={len(timings) / elapsed:.1f}/s "
+            f"p50={statistics.median(timings):.0f}ms p95={p95:.0f}ms",
+        )
+
+    @staticmethod
+    def _cleanup():
+        Topic.objects.filter(title__startswith=BENCH_PREFIX).delete()
+        get_user_model().objects.filter(email__startswith=BENCH_PREFIX).delete()
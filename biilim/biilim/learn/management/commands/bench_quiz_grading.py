@@ -0,0 +1,144 @@
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from biilim.learn.grading import answer_key_cache_key
+from biilim.learn.grading import answer_key_version
+from biilim.learn.grading import get_answer_key
+from biilim.learn.grading import grade
+from biilim.learn.grading import load_answer_key
+from biilim.learn.models import Quiz
+from biilim.learn.models import Topic
+from biilim.learn.schemas import ChoiceSchema
+from biilim.learn.schemas import QuestionSchema
+from biilim.learn.schemas import QuizSchema
+from biilim.learn.schemas import TopicSchema
+from biilim.learn.services import persist_topic_schema
+
+BENCH_TOPIC_TITLE = "bench_quiz_grading"
+
+
+class Command(BaseCommand):
+    """
+    Compare quiz grading throughput with the answer key read from the database against
+    the cached answer key, under concurrent submissions.
+
+    Creates a throwaway topic with a graded quiz and deletes it afterwards.
+    """
+
+    help = "Benchmarks concurrent quiz grading with database or cached answer keys."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--submissions",
+            type=int,
+            default=2_000,
+            help="Submissions per scenario.",
+        )
+        parser.add_argument(
+            "--concurrency",
+            type=int,
+            default=8,
+            help="Concurrent submitting threads.",
+        )
+        parser.add_argument(
+            "--questions",
+            type=int,
+            default=5,
+            help="Questions in the quiz.",
+        )
+
+    def handle(self, *args, **options):
+        quiz = self._create_quiz(options["questions"])
+        try:
+            answers = {entry.question_id: "A" for entry in load_answer_key(quiz.pk)}
+            cache.delete(answer_key_cache_key(quiz.pk, answer_key_version(quiz.pk)))
+            scenarios = {
+                "database answer key": load_answer_key,
+                "cached answer key": get_answer_key,
+            }
+            for name, get_key in scenarios.items():
+                started = time.perf_counter()
+                timings = self._run(
+                    quiz.pk,
+                    answers,
+                    get_key,
+                    options["submissions"],
+                    options["concurrency"],
+                )
+                elapsed = time.perf_counter() - started
+                self._report(name, timings, elapsed)
+        finally:
+            Topic.objects.filter(title=BENCH_TOPIC_TITLE).delete()
+
+    @staticmethod
+    def _create_quiz(questions: int) -> Quiz:
+        Topic.objects.filter(title=BENCH_TOPIC_TITLE).delete()
+        quiz_schema = QuizSchema(
+            questions=[
+                QuestionSchema(
+                    question_text=f"Question {q}?",
+                    choices=[
+                        ChoiceSchema(letter=letter, text=letter) for letter in "ABCD"
+                    ],
+                    correct_answer_letter="A",
+                )
+                for q in range(questions)
+            ],
+        )
+        schema = TopicSchema(
+            title=BENCH_TOPIC_TITLE,
+            description="Throwaway topic of the quiz grading benchmark.",
+            duration=1,
+            sections=[],
+            supplementary_prompts=[],
+            is_recommended=False,
+            quiz=quiz_schema,
+        )
+        topic = persist_topic_schema(schema, get_user_model().objects.first())
+        return Quiz.objects.get(topic=topic, is_graded=True)
+
+    @staticmethod
+    def _run(
+        quiz_id: int,
+        answers: dict[int, str],
+        get_key,
+        submissions: int,
+        concurrency: int,
+    ) -> list[float]:
+        def submit(_):
+            started = time.perf_counter()
+            grade(get_key(quiz_id), answers)
+            return (time.perf_counter() - started) * 1000
+
+        def submit_many(count: int) -> list[float]:
+            try:
+                return [submit(i) for i in range(count)]
+            finally:
+                connection.close()
+
+        per_thread = [
+            submissions // concurrency + (i < submissions % concurrency)
+            for i in range(concurrency)
+        ]
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            return [
+                timing
+                for timings in executor.map(submit_many, per_thread)
+                for timing in timings
+            ]
+
+    def _report(self, name: str, timings: list[float], elapsed: float):
+        p95 = (
+            statistics.quantiles(timings, n=20)[-1] if len(timings) > 1 else timings[0]
+        )
+        self.stdout.write(
+            f"{name:<20} submissions={len(timings)} "
+            f"throughput={len(timings) / elapsed:.0f}/s "
+            f"p50={statistics.median(timings):.2f}ms p95={p95:.2f}ms",
+        )
@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from biilim.core import metrics
+
+
+class Command(BaseCommand):
+    """
+    Report how often topic_search reused an existing topic instead of generating one.
+    """
+
+    help = "Shows topic lookup hit rate, i.e. how many AI topic generations were saved."
+
+    def handle(self, *args, **options):
+        counters = metrics.get_counters("topic_lookup.hit", "topic_lookup.miss")
+        hits = counters["topic_lookup.hit"]
+        total = hits + counters["topic_lookup.miss"]
+        hit_rate = (hits / total) * 100 if total > 0 else 0
+
+        self.stdout.write(f"Lookups: {total}")
+        self.stdout.write(f"Hits (AI generations saved): {hits}")
+        self.stdout.write(f"Misses (AI generations): {counters['topic_lookup.miss']}")
+        self.stdout.write(self.style.SUCCESS(f"Hit rate: {hit_rate:.1f}%"))
@@ -0,0 +1,45 @@
+# Generated by Django 5.1.11 on 2026-10-17 06:30
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.contrib.postgres.operations import TrigramExtension
+from django.conf import settings
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('learn', '0005_question_choice_quiz_question_quiz_studentanswer'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.AddField(
+            model_name='topic',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='topic',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='learn_topic_search_vector_gin'),
+        ),
+        migrations.AddIndex(
+            model_name='topic',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['title'], name='learn_topic_title_trgm', opclasses=['gin_trgm_ops']),
+        ),
+        migrations.RunSQL(
+            sql="""
+                UPDATE learn_topic AS topic SET search_vector =
+                    setweight(to_tsvector('simple', COALESCE(topic.title, '')), 'A')
+                    || setweight(to_tsvector('simple', COALESCE(topic.description, '')), 'B')
+                    || setweight(to_tsvector('simple', COALESCE((
+                        SELECT string_agg(section.title, ' ')
+                        FROM learn_section AS section
+                        WHERE section.topic_id = topic.id
+                    ), '')), 'C');
+            """,
+            reverse_sql=migrations.RunSQL.noop,
+        ),
+    ]
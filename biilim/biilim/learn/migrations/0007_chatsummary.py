@@ -0,0 +1,33 @@
+# Generated by Django 5.1.11 on 2026-10-17 06:40
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('learn', '0006_topic_search_vector'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ChatSummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Created At')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Updated At')),
+                ('summary_text', models.TextField(blank=True)),
+                ('summarized_until', models.DateTimeField(blank=True, help_text='Creation time of the newest chat message included in the summary', null=True)),
+                ('topic', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='chat_summaries', to='learn.topic')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='chat_summaries', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Chat Summary',
+                'verbose_name_plural': 'Chat Summaries',
+                'constraints': [models.UniqueConstraint(fields=('user', 'topic'), name='learn_chatsummary_user_topic_unique')],
+            },
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.1.11 on 2026-10-17 06:42
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('learn', '0007_chatsummary'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Animation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Created At')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Updated At')),
+                ('profile_fingerprint', models.CharField(max_length=255)),
+                ('full_html_code', models.TextField()),
+                ('description', models.TextField(blank=True)),
+                ('last_used_at', models.DateTimeField(db_index=True, default=django.utils.timezone.now)),
+                ('section', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='animations', to='learn.section')),
+                ('topic', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='animations', to='learn.topic')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(condition=models.Q(('section__isnull', True)), fields=('topic', 'profile_fingerprint'), name='learn_animation_topic_unique'), models.UniqueConstraint(condition=models.Q(('section__isnull', False)), fields=('topic', 'section', 'profile_fingerprint'), name='learn_animation_section_unique')],
+            },
+        ),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 5.1.11 on 2026-10-17 06:49
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('learn', '0008_animation'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='animation',
+            name='status',
+            field=models.CharField(choices=[('pending', 'Pending'), ('ready', 'Ready')], default='ready', help_text='Pending while generated in the background after topic creation', max_length=10),
+        ),
+        migrations.AlterField(
+            model_name='animation',
+            name='full_html_code',
+            field=models.TextField(blank=True),
+        ),
+        migrations.CreateModel(
+            name='SupplementaryMaterial',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Created At')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Updated At')),
+                ('style', models.CharField(max_length=50)),
+                ('prompt', models.TextField()),
+                ('content', models.TextField(blank=True)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('ready', 'Ready'), ('failed', 'Failed')], default='pending', max_length=10)),
+                ('topic', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='supplementary_materials', to='learn.topic')),
+            ],
+            options={
+                'ordering': ['style'],
+                'constraints': [models.UniqueConstraint(fields=('topic', 'style'), name='learn_supplementarymaterial_topic_style_unique')],
+            },
+        ),
+    ]
@@ -0,0 +1,48 @@
+# Generated by Django 5.1.11 on 2026-10-17 06:56
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('learn', '0009_supplementarymaterial_animation_status'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='QuizAttempt',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Created At')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Updated At')),
+                ('attempt_number', models.PositiveIntegerField(help_text='1 for the first attempt of the user at the quiz')),
+                ('score', models.PositiveSmallIntegerField(help_text='Score in percent')),
+                ('correct_answers', models.PositiveIntegerField()),
+                ('total_questions', models.PositiveIntegerField()),
+                ('duration', models.DurationField(blank=True, help_text='Time from the first answer to the submission', null=True)),
+                ('quiz', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='attempts', to='learn.quiz')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='quiz_attempts', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-created_at'],
+                'abstract': False,
+            },
+        ),
+        migrations.AddField(
+            model_name='studentanswer',
+            name='attempt',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='answers', to='learn.quizattempt'),
+        ),
+        migrations.AddIndex(
+            model_name='quizattempt',
+            index=models.Index(fields=['quiz', 'created_at'], name='learn_quizattempt_quiz_created'),
+        ),
+        migrations.AddConstraint(
+            model_name='quizattempt',
+            constraint=models.UniqueConstraint(fields=('user', 'quiz', 'attempt_number'), name='learn_quizattempt_user_quiz_number_unique'),
+        ),
+    ]
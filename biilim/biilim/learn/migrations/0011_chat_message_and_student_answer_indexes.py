@@ -0,0 +1,34 @@
+# Generated by Django 5.1.11 on 2026-10-17 06:58
+
+import django.db.models.deletion
+from django.conf import settings
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # The chat and answer tables are large, build the indexes without blocking writes
+    atomic = False
+
+    dependencies = [
+        ('learn', '0010_quizattempt'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='chatmessage',
+            index=models.Index(fields=['user', 'topic', 'created_at'], name='learn_chatmsg_user_topic_time'),
+        ),
+        # The composite index leads with the user, which makes the foreign key's own
+        # index redundant
+        migrations.AlterField(
+            model_name='chatmessage',
+            name='user',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='chat_messages', to=settings.AUTH_USER_MODEL),
+        ),
+        AddIndexConcurrently(
+            model_name='studentanswer',
+            index=models.Index(fields=['user', 'question'], name='learn_studentanswer_user_q'),
+        ),
+    ]
@@ -0,0 +1,47 @@
+# Generated by Django 5.1.11 on 2026-10-17 07:51
+
+import django.contrib.postgres.indexes
+from django.conf import settings
+from django.db import migrations, models
+
+from biilim.learn.lookup import normalize_query
+
+
+def normalize_topics(apps, schema_editor):
+    Topic = apps.get_model("learn", "Topic")
+    topics = []
+    for topic in Topic.objects.only("title", "description").iterator(chunk_size=500):
+        topic.lookup_title = normalize_query(topic.title)
+        topic.lookup_description = normalize_query(topic.description)
+        topics.append(topic)
+    Topic.objects.bulk_update(topics, ["lookup_title", "lookup_description"], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('learn', '0012_topic_listing_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='topic',
+            name='lookup_description',
+            field=models.TextField(blank=True, editable=False),
+        ),
+        migrations.AddField(
+            model_name='topic',
+            name='lookup_title',
+            field=models.TextField(blank=True, editable=False),
+        ),
+        migrations.AddIndex(
+            model_name='topic',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['lookup_title'], name='learn_topic_lookup_title_trgm', opclasses=['gin_trgm_ops']),
+        ),
+        migrations.AddIndex(
+            model_name='topic',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['lookup_description'], name='learn_topic_lookup_desc_trgm', opclasses=['gin_trgm_ops']),
+        ),
+        migrations.RunPython(normalize_topics, reverse_code=migrations.RunPython.noop),
+    ]
@@ -1,7 +1,11 @@
 from django.db import models
+from django.utils import timezone
 from django.core.exceptions import ValidationError
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
 
 from biilim.core.models import BaseModel
+from biilim.users.models import Profile
 
 
 class Topic(BaseModel):
@@ -22,11 +26,58 @@ class Topic(BaseModel):
     )
     is_recommended = models.BooleanField(default=False, help_text="Whether this topic is recommended for users")
     supplementary_prompts = models.JSONField(default=list, blank=True, null=True)
-    
+    # Maintained by biilim.learn.search from the title, description and section titles
+    search_vector = SearchVectorField(null=True, editable=False)
+    # Normalized title and description for the trigram lookup of
+    # biilim.learn.lookup, set on save
+    lookup_title = models.TextField(blank=True, editable=False)
+    lookup_description = models.TextField(blank=True, editable=False)
+
+    class Meta(BaseModel.Meta):
+        indexes = [
+            GinIndex(fields=["search_vector"], name="learn_topic_search_vector_gin"),
+            GinIndex(
+                fields=["title"],
+                name="learn_topic_title_trgm",
+                opclasses=["gin_trgm_ops"],
+            ),
+            GinIndex(
+                fields=["lookup_title"],
+                name="learn_topic_lookup_title_trgm",
+                opclasses=["gin_trgm_ops"],
+            ),
+            GinIndex(
+                fields=["lookup_description"],
+                name="learn_topic_lookup_desc_trgm",
+                opclasses=["gin_trgm_ops"],
+            ),
+            # The recommended topics feed
+            models.Index(
+                fields=["is_recommended", "created_at"],
+                name="learn_topic_recommended_time",
+            ),
+            # The keyset paginated topics listing
+            models.Index(fields=["created_at", "id"], name="learn_topic_created_id"),
+        ]
 
     def __str__(self) -> str:
         return self.title
 
+    def save(self, *args, **kwargs):
+        # Imported lazily: the lookup layer queries this model
+        from biilim.learn.lookup import normalize_query  # noqa: PLC0415
+
+        self.lookup_title = normalize_query(self.title)
+        self.lookup_description = normalize_query(self.description)
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None and {"title", "description"} & set(update_fields):
+            kwargs["update_fields"] = {
+                *update_fields,
+                "lookup_title",
+                "lookup_description",
+            }
+        super().save(*args, **kwargs)
+
 class Section(models.Model):
     topic = models.ForeignKey("Topic", on_delete=models.CASCADE, related_name="sections")
     title = models.CharField(max_length=200)
@@ -41,6 +92,10 @@ class Section(models.Model):
         return f"{self.topic.title} - {self.title}"
 
 
+# Chat types of the one-off explanation evaluations, kept out of the conversation
+# history
+EVALUATION_CHAT_TYPES = ["explanation_submission", "evaluation_feedback"]
+
 
 class ChatMessage(BaseModel):
     """
@@ -57,7 +112,13 @@ class ChatMessage(BaseModel):
         ("welcome_message", "Welcome Message"), # For initial AI messages
     ]
 
-    user = models.ForeignKey("users.User", on_delete=models.CASCADE, related_name="chat_messages")
+    user = models.ForeignKey(
+        "users.User",
+        on_delete=models.CASCADE,
+        related_name="chat_messages",
+        # Covered by the leading column of learn_chatmsg_user_topic_time
+        db_index=False,
+    )
     topic = models.ForeignKey("Topic", on_delete=models.CASCADE, related_name="chat_messages")
     sender = models.CharField(max_length=10, choices=SENDER_CHOICES)
     message_text = models.TextField()
@@ -70,6 +131,14 @@ class ChatMessage(BaseModel):
 
     class Meta:
         ordering = ["created_at"]
+        indexes = [
+            # Chat history, stream lookups and the conversation context of a user's
+            # messages about a topic
+            models.Index(
+                fields=["user", "topic", "created_at"],
+                name="learn_chatmsg_user_topic_time",
+            ),
+        ]
         verbose_name = "Chat Message"
         verbose_name_plural = "Chat Messages"
 
@@ -77,6 +146,139 @@ class ChatMessage(BaseModel):
         return f"{self.sender.upper()} on {self.topic.title} at {self.created_at.strftime('%Y-%m-%d %H:%M')}"
 
 
+class ChatSummary(BaseModel):
+    """
+    Rolling summary of the older part of a user's chat about a topic.
+
+    Messages up to ``summarized_until`` are folded into ``summary_text`` so prompts
+    only need to include the most recent turns verbatim.
+    """
+
+    user = models.ForeignKey(
+        "users.User",
+        on_delete=models.CASCADE,
+        related_name="chat_summaries",
+    )
+    topic = models.ForeignKey(
+        "Topic",
+        on_delete=models.CASCADE,
+        related_name="chat_summaries",
+    )
+    summary_text = models.TextField(blank=True)
+    summarized_until = models.DateTimeField(
+        null=True,
+        blank=True,
+        help_text="Creation time of the newest chat message included in the summary",
+    )
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["user", "topic"],
+                name="learn_chatsummary_user_topic_unique",
+            ),
+        ]
+        verbose_name = "Chat Summary"
+        verbose_name_plural = "Chat Summaries"
+
+    def __str__(self) -> str:
+        return f"Summary of {self.user} on {self.topic.title}"
+
+
+class Animation(BaseModel):
+    """
+    Stored HTML animation generated by the visual helper agent.
+
+    Animations are shared by every student with the same coarse profile fingerprint
+    (age band and learning styles) and evicted when unused, see ``learn.animations``.
+    """
+
+    topic = models.ForeignKey(
+        "Topic",
+        on_delete=models.CASCADE,
+        related_name="animations",
+    )
+    section = models.ForeignKey(
+        "Section",
+        on_delete=models.CASCADE,
+        related_name="animations",
+        null=True,
+        blank=True,
+    )
+    STATUS_CHOICES = [
+        ("pending", "Pending"),
+        ("ready", "Ready"),
+    ]
+
+    profile_fingerprint = models.CharField(max_length=255)
+    status = models.CharField(
+        max_length=10,
+        choices=STATUS_CHOICES,
+        default="ready",
+        help_text="Pending while generated in the background after topic creation",
+    )
+    full_html_code = models.TextField(blank=True)
+    description = models.TextField(blank=True)
+    last_used_at = models.DateTimeField(default=timezone.now, db_index=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["topic", "profile_fingerprint"],
+                condition=models.Q(section__isnull=True),
+                name="learn_animation_topic_unique",
+            ),
+            models.UniqueConstraint(
+                fields=["topic", "section", "profile_fingerprint"],
+                condition=models.Q(section__isnull=False),
+                name="learn_animation_section_unique",
+            ),
+        ]
+
+    def __str__(self) -> str:
+        subject = self.section or self.topic
+        return f"Animation for {subject} ({self.profile_fingerprint})"
+
+
+class SupplementaryMaterial(BaseModel):
+    """
+    Learning material for one learning style, generated in the background from the
+    topic's ``supplementary_prompts``.
+    """
+
+    STATUS_CHOICES = [
+        ("pending", "Pending"),
+        ("ready", "Ready"),
+        ("failed", "Failed"),
+    ]
+
+    topic = models.ForeignKey(
+        "Topic",
+        on_delete=models.CASCADE,
+        related_name="supplementary_materials",
+    )
+    style = models.CharField(max_length=50)
+    prompt = models.TextField()
+    content = models.TextField(blank=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default="pending")
+
+    class Meta:
+        ordering = ["style"]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["topic", "style"],
+                name="learn_supplementarymaterial_topic_style_unique",
+            ),
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.get_style_display()} material for {self.topic.title}"
+
+    def get_style_display(self) -> str:
+        fallback = self.style.replace("_", " ").capitalize()
+        return dict(Profile.LEARNING_STYLE_CHOICES).get(self.style, fallback)
+
+
 class Quiz(models.Model):
     topic = models.ForeignKey("Topic", on_delete=models.CASCADE, related_name="quizzes", null=True, blank=True)
     section = models.ForeignKey("Section", on_delete=models.CASCADE, related_name="quizzes", null=True, blank=True)
@@ -129,12 +331,76 @@ class Choice(models.Model):
     def __str__(self) -> str:
         return f"{self.letter}: {self.text}"
 
+class QuizAttempt(BaseModel):
+    """
+    One submission of a quiz by a user, with its score denormalized from the answers.
+
+    Written in the same transaction as the attempt's ``StudentAnswer`` rows, so score
+    history and best scores never have to aggregate the answers, see
+    ``learn.grading``.
+    """
+
+    user = models.ForeignKey(
+        "users.User",
+        on_delete=models.CASCADE,
+        related_name="quiz_attempts",
+    )
+    quiz = models.ForeignKey(Quiz, on_delete=models.CASCADE, related_name="attempts")
+    attempt_number = models.PositiveIntegerField(
+        help_text="1 for the first attempt of the user at the quiz",
+    )
+    score = models.PositiveSmallIntegerField(help_text="Score in percent")
+    correct_answers = models.PositiveIntegerField()
+    total_questions = models.PositiveIntegerField()
+    duration = models.DurationField(
+        null=True,
+        blank=True,
+        help_text="Time from the first answer to the submission",
+    )
+
+    class Meta(BaseModel.Meta):
+        constraints = [
+            # Also the (user, quiz) index of the history and best score lookups
+            models.UniqueConstraint(
+                fields=["user", "quiz", "attempt_number"],
+                name="learn_quizattempt_user_quiz_number_unique",
+            ),
+        ]
+        indexes = [
+            models.Index(
+                fields=["quiz", "created_at"],
+                name="learn_quizattempt_quiz_created",
+            ),
+        ]
+
+    def __str__(self) -> str:
+        return (
+            f"Attempt {self.attempt_number} of {self.user} at quiz {self.quiz_id}: "
+            f"{self.score}%"
+        )
+
+
 class StudentAnswer(models.Model):
     user = models.ForeignKey("users.User", on_delete=models.CASCADE, related_name="answers")
     question = models.ForeignKey(Question, on_delete=models.CASCADE, related_name="student_answers")
+    attempt = models.ForeignKey(
+        QuizAttempt,
+        on_delete=models.CASCADE,
+        related_name="answers",
+        null=True,
+        blank=True,
+    )
     selected_choice_letter = models.CharField(max_length=1)
     is_correct = models.BooleanField(default=False)
     timestamp = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["user", "question"],
+                name="learn_studentanswer_user_q",
+            ),
+        ]
+
     def __str__(self) -> str:
         return f"{self.user.name} answered {self.selected_choice_letter} for Q{self.question.index}"
@@ -0,0 +1,114 @@
+"""
+PostgreSQL search backend for topics.
+
+``Topic.search_vector`` holds a weighted tsvector of the title (A), description (B)
+and section titles (C). It is refreshed incrementally by signals whenever a topic or
+one of its sections is saved, and backed by a GIN index; generated topics are inserted
+with it, see ``persist_topic_schema``. Searches that find nothing
+through full-text fall back to pg_trgm word similarity on the title
+(``search_topic_titles``), which catches partial words and typos.
+"""
+
+from django.contrib.postgres.search import SearchQuery
+from django.contrib.postgres.search import SearchRank
+from django.contrib.postgres.search import SearchVector
+from django.contrib.postgres.search import TrigramWordSimilarity
+from django.db.models import Expression
+from django.db.models import F
+from django.db.models import QuerySet
+from django.db.models import TextField
+from django.db.models import Value
+
+from biilim.learn.models import Section
+from biilim.learn.models import Topic
+
+# Topics are written in several languages (mostly Turkish and English), so we index
+# with the language-agnostic "simple" configuration instead of a stemming dictionary.
+SEARCH_CONFIG = "simple"
+
+
+def update_topic_search_vector(
+    topic_id: int,
+    section_titles: list[str] | None = None,
+) -> None:
+    """
+    Recompute the search vector of a single topic.
+
+    Args:
+        topic_id (int): The primary key of the topic.
+        section_titles (list[str] | None): The titles of the topic's sections, when
+            the caller already has them in memory; fetched otherwise.
+    """
+    if section_titles is None:
+        section_titles = list(
+            Section.objects.filter(topic_id=topic_id).values_list("title", flat=True),
+        )
+
+    Topic.objects.filter(pk=topic_id).update(
+        search_vector=topic_search_vector("title", "description", section_titles),
+    )
+
+
+def topic_search_vector(
+    title: str | Expression,
+    description: str | Expression,
+    section_titles: list[str],
+):
+    """
+    Build the weighted search vector of a topic.
+
+    Args:
+        title (str | Expression): The title field name, or an expression such as a
+            ``Value``.
+        description (str | Expression): The description field name, or an expression.
+        section_titles (list[str]): The titles of the topic's sections.
+
+    Returns:
+        CombinedSearchVector: The ``Topic.search_vector`` to update or insert.
+    """
+    return (
+        SearchVector(title, weight="A", config=SEARCH_CONFIG)
+        + SearchVector(description, weight="B", config=SEARCH_CONFIG)
+        + SearchVector(
+            Value(" ".join(section_titles), output_field=TextField()),
+            weight="C",
+            config=SEARCH_CONFIG,
+        )
+    )
+
+
+def search_topics(query: str) -> QuerySet[Topic]:
+    """
+    Search topics with full-text search, best match first.
+
+    Args:
+        query (str): The user's search query, in web search syntax.
+
+    Returns:
+        QuerySet[Topic]: Full-text matches ranked by relevance.
+    """
+    search_query = SearchQuery(query, search_type="websearch", config=SEARCH_CONFIG)
+    return (
+        Topic.objects.filter(search_vector=search_query)
+        .defer("search_vector")
+        .annotate(rank=SearchRank(F("search_vector"), search_query))
+        .order_by("-rank", "-created_at")
+    )
+
+
+def search_topic_titles(query: str) -> QuerySet[Topic]:
+    """
+    Search topic titles for partial words and typos, the fallback of ``search_topics``.
+
+    Args:
+        query (str): The user's search query.
+
+    Returns:
+        QuerySet[Topic]: Fuzzy title matches ranked by trigram word similarity.
+    """
+    return (
+        Topic.objects.filter(title__trigram_word_similar=query)
+        .defer("search_vector")
+        .annotate(similarity=TrigramWordSimilarity(query, "title"))
+        .order_by("-similarity", "-created_at")
+    )
@@ -0,0 +1,107 @@
+from django.db import transaction
+from django.db.models import TextField
+from django.db.models import Value
+
+from biilim.learn.models import Choice
+from biilim.learn.models import Question
+from biilim.learn.models import Quiz
+from biilim.learn.models import Section
+from biilim.learn.models import Topic
+from biilim.learn.schemas import TopicSchema
+from biilim.learn.search import topic_search_vector
+
+
+def persist_topic_schema(generated_topic: TopicSchema, user) -> Topic:
+    """
+    Persist a generated topic with its sections, quizzes, questions and choices.
+
+    Every level of the Topic -> Section -> Quiz -> Question -> Choice tree is written
+    with a single ``bulk_create``, so the number of INSERTs does not depend on how many
+    sections or questions the topic has.
+
+    Args:
+        generated_topic (TopicSchema): The validated topic returned by the AI.
+        user (User): The user the topic is generated for.
+
+    Returns:
+        Topic: The newly created topic.
+    """
+    with transaction.atomic():
+        # 1. Create the Topic object
+        new_topic = Topic.objects.create(
+            title=generated_topic.title,
+            description=generated_topic.description,
+            duration=generated_topic.duration,
+            is_recommended=generated_topic.is_recommended,
+            supplementary_prompts=[
+                p.model_dump() for p in generated_topic.supplementary_prompts
+            ],
+            created_by=user,
+            # Indexed on insert, section titles included, so the post_save signal
+            # leaves it alone and bulk_create needs no signals for the sections
+            search_vector=topic_search_vector(
+                Value(generated_topic.title, output_field=TextField()),
+                Value(generated_topic.description, output_field=TextField()),
+                [section_data.title for section_data in generated_topic.sections],
+            ),
+        )
+
+        # 2. Create all sections
+        new_sections = Section.objects.bulk_create(
+            [
+                Section(
+                    topic=new_topic,
+                    title=section_data.title,
+                    content=section_data.content,
+                    index=section_data.index,
+                )
+                for section_data in generated_topic.sections
+            ],
+        )
+
+        # 3. Create the graded topic quiz and one non-graded quiz per section
+        quiz_schemas = [
+            generated_topic.quiz,
+            *(section_data.quiz for section_data in generated_topic.sections),
+        ]
+        new_quizzes = Quiz.objects.bulk_create(
+            [
+                Quiz(topic=new_topic, is_graded=True),
+                *(Quiz(section=section, is_graded=False) for section in new_sections),
+            ],
+        )
+
+        # 4. Create the questions of every quiz
+        question_schemas = []
+        new_questions = []
+        for quiz, quiz_data in zip(new_quizzes, quiz_schemas, strict=True):
+            for index, question_data in enumerate(quiz_data.questions):
+                question_schemas.append(question_data)
+                new_questions.append(
+                    Question(
+                        quiz=quiz,
+                        question_text=question_data.question_text,
+                        correct_answer_letter=question_data.correct_answer_letter,
+                        index=index,
+                    ),
+                )
+        new_questions = Question.objects.bulk_create(new_questions)
+
+        # 5. Create the choices of every question
+        Choice.objects.bulk_create(
+            [
+                Choice(
+                    question=question,
+                    letter=choice_data.letter,
+                    text=choice_data.text,
+                )
+                for question, question_data in zip(
+                    new_questions,
+                    question_schemas,
+                    strict=True,
+                )
+                for choice_data in question_data.choices
+            ],
+        )
+
+    return new_topic
@@ -0,0 +1,69 @@
+from django.db.models import Q
+from django.db.models.signals import post_delete
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+
+from biilim.learn import search
+from biilim.learn.catalog import schedule_recommended_topics_rebuild
+from biilim.learn.fragments import touch_topic_of_question
+from biilim.learn.fragments import touch_topic_of_quiz
+from biilim.learn.fragments import touch_topics
+from biilim.learn.grading import invalidate_answer_key
+from biilim.learn.models import Choice
+from biilim.learn.models import Question
+from biilim.learn.models import Quiz
+from biilim.learn.models import Section
+from biilim.learn.models import Topic
+
+
+@receiver(post_save, sender=Topic)
+@receiver(post_delete, sender=Topic)
+def rebuild_recommended_topics(sender, **kwargs):
+    schedule_recommended_topics_rebuild()
+
+
+@receiver(post_save, sender=Topic)
+def update_topic_search_vector(sender, instance, created, **kwargs):
+    if created and instance.search_vector is not None:
+        # Inserted with its search vector, see persist_topic_schema
+        return
+    search.update_topic_search_vector(instance.pk)
+
+
+@receiver(post_save, sender=Section)
+@receiver(post_delete, sender=Section)
+def update_section_topic_search_vector(sender, instance, **kwargs):
+    search.update_topic_search_vector(instance.topic_id)
+
+
+@receiver(post_save, sender=Question)
+@receiver(post_delete, sender=Question)
+def invalidate_quiz_answer_key(sender, instance, **kwargs):
+    invalidate_answer_key(instance.quiz_id)
+
+
+@receiver(post_save, sender=Section)
+@receiver(post_delete, sender=Section)
+def invalidate_section_topic_fragments(sender, instance, **kwargs):
+    touch_topics(Q(pk=instance.topic_id))
+
+
+@receiver(post_save, sender=Quiz)
+@receiver(post_delete, sender=Quiz)
+def invalidate_quiz_topic_fragments(sender, instance, **kwargs):
+    if instance.topic_id:
+        touch_topics(Q(pk=instance.topic_id))
+    elif instance.section_id:
+        touch_topics(Q(sections=instance.section_id))
+
+
+@receiver(post_save, sender=Question)
+@receiver(post_delete, sender=Question)
+def invalidate_question_topic_fragments(sender, instance, **kwargs):
+    touch_topic_of_quiz(instance.quiz_id)
+
+
+@receiver(post_save, sender=Choice)
+@receiver(post_delete, sender=Choice)
+def invalidate_choice_topic_fragments(sender, instance, **kwargs):
+    touch_topic_of_question(instance.question_id)
@@ -0,0 +1,104 @@
+"""
+Single-flight coalescing of topic generations.
+
+Concurrent searches for the same (normalized) query share one generation job: the
+first request claims a lock in the cache (Redis in production) holding the id of the
+Celery job it enqueues, and every follower polls that same job and is redirected to
+the same topic. Locks expire after ``TOPIC_GENERATION_LOCK_TTL`` seconds; a lock whose
+job failed or was revoked is recovered by exactly one follower, which starts a new job
+and records its id for the other followers to join.
+"""
+
+import hashlib
+import logging
+import time
+import uuid
+
+from celery import states
+from celery.result import AsyncResult
+from django.conf import settings
+from django.core.cache import cache
+
+from biilim.core import metrics
+from biilim.learn.lookup import normalize_query
+from biilim.learn.tasks import generate_topic
+
+logger = logging.getLogger(__name__)
+
+STALE_JOB_STATES = frozenset({states.FAILURE, states.REVOKED})
+
+LOCK_ATTEMPTS = 3
+# Seconds between attempts to claim a lock that changed hands
+LOCK_RETRY_DELAY = 0.05
+
+
+def topic_generation_lock_key(query: str) -> str:
+    normalized = normalize_query(query) or query.strip().casefold()
+    digest = hashlib.sha256(normalized.encode()).hexdigest()
+    return f"learn:topic_generation:{digest}"
+
+
+def _is_stale(job_id: str) -> bool:
+    return AsyncResult(job_id).state in STALE_JOB_STATES
+
+
+def start_topic_generation(user_id: int, query: str) -> str:
+    """
+    Return the id of the job generating a topic for ``query``, enqueueing one only if
+    no generation for the same normalized query is already in flight.
+
+    Args:
+        user_id (int): The user requesting the topic; used when a new job is started.
+        query (str): The user's search query.
+
+    Returns:
+        str: The Celery task id to poll.
+    """
+    key = topic_generation_lock_key(query)
+
+    for attempt in range(LOCK_ATTEMPTS):
+        if attempt:
+            time.sleep(LOCK_RETRY_DELAY)
+        job_id = cache.get(key)
+        if job_id and not _is_stale(job_id):
+            metrics.incr("topic_generation.coalesced")
+            return job_id
+
+        new_job_id = str(uuid.uuid4())
+        if job_id:
+            # Only one follower may recover a given stale lock; it records the job it
+            # starts, which the others join.
+            recover_key = f"{key}:recover:{job_id}"
+            if cache.add(
+                recover_key,
+                new_job_id,
+                timeout=settings.TOPIC_GENERATION_LOCK_TTL,
+            ):
+                logger.warning(
+                    "Recovering stale topic generation lock %s held by job %s",
+                    key,
+                    job_id,
+                )
+                # Replaced in place: nobody else can claim a lock that is still held
+                cache.set(key, new_job_id, timeout=settings.TOPIC_GENERATION_LOCK_TTL)
+                return _start(user_id, query, new_job_id)
+            recovering_job_id = cache.get(recover_key)
+            if recovering_job_id:
+                metrics.incr("topic_generation.coalesced")
+                return recovering_job_id
+        elif cache.add(key, new_job_id, timeout=settings.TOPIC_GENERATION_LOCK_TTL):
+            return _start(user_id, query, new_job_id)
+
+    # The lock kept changing hands; join whichever job holds it now, and only
+    # generate without coalescing when none does.
+    job_id = cache.get(key)
+    if job_id and not _is_stale(job_id):
+        metrics.incr("topic_generation.coalesced")
+        return job_id
+    return _start(user_id, query, str(uuid.uuid4()))
+
+
+def _start(user_id: int, query: str, job_id: str) -> str:
+    generate_topic.apply_async(args=(user_id, query), task_id=job_id)
+    metrics.incr("topic_generation.started")
+    return job_id
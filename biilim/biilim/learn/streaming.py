@@ -0,0 +1,98 @@
+"""
+Server-Sent Events stream of the AI's reply to a chat message.
+
+The chatbox in ``topic_detail.html`` connects to it with the htmx SSE extension: every
+``token`` event carries an HTML-escaped piece of the answer that is appended to the AI
+bubble, and the final ``done`` event closes the connection. The complete answer is
+saved as a ``ChatMessage`` once the stream ends.
+
+The stream is an async generator: under ASGI a worker serves many open streams while
+they wait on the LLM, instead of holding a thread for each. Its metrics go to the cache,
+so they are recorded through ``sync_to_async`` rather than blocking the event loop.
+"""
+
+import logging
+import time
+from collections.abc import AsyncGenerator
+from contextlib import aclosing
+
+from asgiref.sync import sync_to_async
+from django.utils.html import escape
+
+from biilim.ai.api_client import astream_student_reply
+from biilim.core import metrics
+from biilim.learn.models import ChatMessage
+
+logger = logging.getLogger(__name__)
+
+
+def sse_event(event: str, data: str = "") -> str:
+    """Format one Server-Sent Event; ``data`` must not contain newlines."""
+    return f"event: {event}\ndata: {data}\n\n"
+
+
+def _as_html(text: str) -> str:
+    return escape(text).replace("\r\n", "\n").replace("\n", "<br>")
+
+
+async def astream_chat_reply(message: ChatMessage, profile) -> AsyncGenerator[str]:
+    """
+    Stream the AI's reply to the user's ``message`` as Server-Sent Events.
+
+    Records the ``chat.ttft`` (time to first token) and ``chat.stream`` (whole answer)
+    timings.
+
+    Args:
+        message (ChatMessage): The user's message to answer, with ``user`` and
+            ``topic`` loaded.
+        profile (Profile): The user's profile, used to personalize the answer.
+
+    Yields:
+        str: ``token`` events with pieces of the answer, then a ``done`` event.
+    """
+    chat_type = message.chat_type
+    started = time.perf_counter()
+    parts: list[str] = []
+    try:
+        # Closed right away on client disconnects, which releases the LLM connection
+        async with aclosing(
+            astream_student_reply(
+                message.message_text,
+                topic=message.topic,
+                profile=profile,
+                chat_type=chat_type,
+            ),
+        ) as texts:
+            async for text in texts:
+                if not parts:
+                    await sync_to_async(metrics.timing)(
+                        "chat.ttft",
+                        (time.perf_counter() - started) * 1000,
+                        chat_type=chat_type,
+                    )
+                parts.append(text)
+                yield sse_event("token", _as_html(text))
+    finally:
+        # Runs on client disconnects too, so a partially streamed answer is kept
+        if parts:
+            await ChatMessage.objects.acreate(
+                user=message.user,
+                topic=message.topic,
+                sender="ai",
+                message_text="".join(parts),
+                chat_type="evaluation_feedback"
+                if chat_type == "explanation"
+                else "general_chat",
+            )
+        await sync_to_async(metrics.timing)(
+            "chat.stream",
+            (time.perf_counter() - started) * 1000,
+            chat_type=chat_type,
+        )
+
+    yield sse_event("done")
+
+
+async def astream_done() -> AsyncGenerator[str]:
+    """A stream with nothing to answer, e.g. for an ``EventSource`` reconnect."""
+    yield sse_event("done")
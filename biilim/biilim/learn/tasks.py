@@ -0,0 +1,257 @@
+import logging
+import random
+
+from celery import group
+from celery import shared_task
+from celery.exceptions import SoftTimeLimitExceeded
+from django.conf import settings
+from django.db import IntegrityError
+
+from biilim.ai.api_client import generate_supplementary_material
+from biilim.ai.api_client import generate_topic_json
+from biilim.ai.api_client import summarize_chat
+from biilim.ai.resilience import LLMError
+from biilim.ai.resilience import task_soft_time_limit
+from biilim.core.concurrency import SemaphoreFullError
+from biilim.core.concurrency import cache_semaphore
+from biilim.learn import animations
+from biilim.learn.chat_context import chat_messages
+from biilim.learn.models import ChatSummary
+from biilim.learn.models import SupplementaryMaterial
+from biilim.learn.models import Topic
+from biilim.learn.schemas import TopicSchema
+from biilim.learn.services import persist_topic_schema
+from biilim.users.models import User
+
+logger = logging.getLogger(__name__)
+
+
+def _set_progress(task, step: str) -> None:
+    """Publish the current pipeline step so the polling partial can display it."""
+    if task.request.id and not task.request.is_eager:
+        task.update_state(state="PROGRESS", meta={"step": step})
+
+
+@shared_task(bind=True, soft_time_limit=task_soft_time_limit("topic"))
+def generate_topic(self, user_id: int, query: str) -> int:
+    """
+    Generate a topic for ``query`` with the AI, validate it and persist it.
+
+    Args:
+        user_id (int): The primary key of the user requesting the topic.
+        query (str): The user-provided topic query.
+
+    Returns:
+        int: The primary key of the persisted topic.
+    """
+    user = User.objects.select_related("profile").get(pk=user_id)
+
+    _set_progress(self, "generating")
+    json_data = generate_topic_json(
+        user_profile=user.profile,
+        prompt=query,
+        response_schema=TopicSchema,
+    )
+
+    _set_progress(self, "validating")
+    if isinstance(json_data, dict):
+        generated_topic = TopicSchema.model_validate(json_data)
+    else:
+        generated_topic = TopicSchema.model_validate_json(json_data)
+
+    _set_progress(self, "saving")
+    try:
+        topic = persist_topic_schema(generated_topic, user)
+    except IntegrityError:
+        # Another generation produced the same title first; reuse that topic.
+        existing = Topic.objects.filter(title=generated_topic.title).first()
+        if existing is None:
+            raise
+        topic = existing
+        logger.info("Reusing existing topic '%s' for query '%s'", topic.title, query)
+    else:
+        generate_topic_materials.delay(topic.pk)
+
+    return topic.pk
+
+
+@shared_task(soft_time_limit=task_soft_time_limit("summary"))
+def refresh_chat_summary(user_id: int, topic_id: int) -> None:
+    """
+    Fold chat messages that fell out of the context window into the rolling summary.
+
+    At most ``CHAT_SUMMARY_BATCH_SIZE`` messages are summarized per run, oldest first;
+    later runs pick up the rest.
+
+    Args:
+        user_id (int): The primary key of the user chatting.
+        topic_id (int): The primary key of the topic being discussed.
+    """
+    messages = chat_messages(user_id, topic_id)
+    # The newest message older than the recent turns sent verbatim with every prompt
+    boundary = (
+        messages.order_by("-created_at")
+        .values_list("created_at", flat=True)[
+            settings.CHAT_HISTORY_MAX_TURNS : settings.CHAT_HISTORY_MAX_TURNS + 1
+        ]
+        .first()
+    )
+    if boundary is None:
+        return
+
+    summary, _created = ChatSummary.objects.select_related("topic").get_or_create(
+        user_id=user_id,
+        topic_id=topic_id,
+    )
+    pending = messages.filter(created_at__lte=boundary)
+    if summary.summarized_until:
+        pending = pending.filter(created_at__gt=summary.summarized_until)
+    pending = list(
+        pending.order_by("created_at").values("sender", "message_text", "created_at")[
+            : settings.CHAT_SUMMARY_BATCH_SIZE
+        ],
+    )
+    if not pending:
+        return
+
+    summary.summary_text = summarize_chat(
+        summary.summary_text,
+        pending,
+        topic=summary.topic,
+        max_tokens=settings.CHAT_SUMMARY_MAX_TOKENS,
+    )
+    summary.summarized_until = pending[-1]["created_at"]
+    summary.save(update_fields=["summary_text", "summarized_until", "updated_at"])
+    logger.info(
+        "Summarized %s chat messages of user %s on topic %s",
+        len(pending),
+        user_id,
+        topic_id,
+    )
+
+
+@shared_task
+def evict_stored_animations() -> int:
+    """Trim the animation store, see ``learn.animations.evict_animations``."""
+    return animations.evict_animations()
+
+
+def _retry_later(task, exc: Exception):
+    # Jittered so tasks waiting for a slot do not all come back at once
+    return task.retry(exc=exc, countdown=random.uniform(5, 15))  # noqa: S311
+
+
+@shared_task
+def generate_topic_materials(topic_id: int) -> None:
+    """
+    Fan out the background generation of a new topic's supplementary materials and of
+    the animations of the topic and its sections for its author's profile.
+
+    The work runs in parallel Celery tasks, bounded by ``AI_BACKGROUND_CONCURRENCY``
+    concurrent AI calls and ``AI_BACKGROUND_RATE_LIMIT`` per worker. Pending rows are
+    created up front so ``topic_detail`` can show placeholders while they run.
+
+    Args:
+        topic_id (int): The primary key of the new topic.
+    """
+    topic = Topic.objects.select_related("created_by__profile").get(pk=topic_id)
+
+    SupplementaryMaterial.objects.bulk_create(
+        [
+            SupplementaryMaterial(
+                topic=topic,
+                style=item["style"],
+                prompt=item["prompt"],
+            )
+            for item in topic.supplementary_prompts or []
+        ],
+        ignore_conflicts=True,
+    )
+    material_ids = list(
+        SupplementaryMaterial.objects.filter(topic=topic, status="pending").values_list(
+            "pk",
+            flat=True,
+        ),
+    )
+
+    animation_ids = []
+    profile = getattr(topic.created_by, "profile", None)
+    if profile is not None and animations.wants_animations(profile):
+        animation_ids = animations.reserve_animations(topic, profile)
+
+    group(
+        *(generate_material.s(pk) for pk in material_ids),
+        *(pregenerate_animation.s(pk) for pk in animation_ids),
+    ).apply_async()
+    logger.info(
+        "Queued %s supplementary materials and %s animations for topic %s",
+        len(material_ids),
+        len(animation_ids),
+        topic_id,
+    )
+
+
+@shared_task(
+    bind=True,
+    rate_limit=settings.AI_BACKGROUND_RATE_LIMIT,
+    max_retries=40,
+    soft_time_limit=task_soft_time_limit("material"),
+)
+def generate_material(self, material_id: int) -> None:
+    """Generate one pending supplementary material."""
+    material = (
+        SupplementaryMaterial.objects.select_related("topic")
+        .filter(pk=material_id, status="pending")
+        .first()
+    )
+    if material is None:
+        return
+
+    try:
+        with cache_semaphore(
+            "ai_background",
+            settings.AI_BACKGROUND_CONCURRENCY,
+            timeout=settings.CELERY_TASK_TIME_LIMIT,
+        ):
+            material.content = generate_supplementary_material(
+                material.topic,
+                material.style,
+                material.prompt,
+            )
+    except (SemaphoreFullError, SoftTimeLimitExceeded) as exc:
+        # No AI slot was free, or the task ran out of time: neither is the LLM's answer
+        if self.request.retries < self.max_retries:
+            raise _retry_later(self, exc) from exc
+        # Out of retries: mark it failed, or the partial would poll for it forever
+        logger.warning(
+            "Gave up on supplementary material %s after %s retries",
+            material_id,
+            self.request.retries,
+        )
+        material.status = "failed"
+    except LLMError:
+        logger.exception("Failed to generate supplementary material %s", material_id)
+        material.status = "failed"
+    else:
+        material.status = "ready"
+    material.save(update_fields=["content", "status", "updated_at"])
+
+
+@shared_task(
+    bind=True,
+    rate_limit=settings.AI_BACKGROUND_RATE_LIMIT,
+    max_retries=40,
+    soft_time_limit=task_soft_time_limit("animation"),
+)
+def pregenerate_animation(self, animation_id: int) -> bool:
+    """Generate one pending animation, see ``animations.pregenerate_animation``."""
+    try:
+        with cache_semaphore(
+            "ai_background",
+            settings.AI_BACKGROUND_CONCURRENCY,
+            timeout=settings.CELERY_TASK_TIME_LIMIT,
+        ):
+            return animations.pregenerate_animation(animation_id)
+    except (SemaphoreFullError, SoftTimeLimitExceeded) as exc:
+        # The animation stays pending for the retry
+        raise _retry_later(self, exc) from exc
@@ -0,0 +1,90 @@
+from factory import Faker
+from factory import SubFactory
+from factory.django import DjangoModelFactory
+
+from biilim.learn.models import ChatMessage
+from biilim.learn.models import Topic
+from biilim.learn.schemas import ChoiceSchema
+from biilim.learn.schemas import QuestionSchema
+from biilim.learn.schemas import QuizSchema
+from biilim.learn.schemas import SectionSchema
+from biilim.learn.schemas import SupplementaryPromptSchema
+from biilim.learn.schemas import TopicSchema
+from biilim.users.models import Profile
+from biilim.users.tests.factories import UserFactory
+
+
+class ProfileFactory(DjangoModelFactory[Profile]):
+    user = SubFactory(UserFactory)
+    age = 16
+    city = "Istanbul"
+    country = "Turkey"
+    hobbies = "football, chess"
+    learning_styles = "visual,reading_writing"
+
+    class Meta:
+        model = Profile
+        django_get_or_create = ["user"]
+
+
+class TopicFactory(DjangoModelFactory[Topic]):
+    title = Faker("sentence", nb_words=4)
+    description = Faker("paragraph")
+    duration = 30
+
+    class Meta:
+        model = Topic
+        django_get_or_create = ["title"]
+
+
+class ChatMessageFactory(DjangoModelFactory[ChatMessage]):
+    user = SubFactory(UserFactory)
+    topic = SubFactory(TopicFactory)
+    sender = "user"
+    message_text = Faker("sentence")
+    chat_type = "general_chat"
+
+    class Meta:
+        model = ChatMessage
+
+
+def build_quiz_schema(questions: int = 3) -> QuizSchema:
+    return QuizSchema(
+        questions=[
+            QuestionSchema(
+                question_text=f"Question {q}?",
+                choices=[
+                    ChoiceSchema(letter=letter, text=f"Choice {letter}")
+                    for letter in "ABCD"
+                ],
+                correct_answer_letter="A",
+            )
+            for q in range(questions)
+        ],
+    )
+
+
+def build_topic_schema(
+    title: str = "Photosynthesis",
+    sections: int = 3,
+    questions: int = 3,
+) -> TopicSchema:
+    return TopicSchema(
+        title=title,
+        description=f"All about {title}.",
+        duration=45,
+        sections=[
+            SectionSchema(
+                title=f"Section {s}",
+                content=f"Content of section {s}.",
+                index=s,
+                quiz=build_quiz_schema(questions),
+            )
+            for s in range(sections)
+        ],
+        supplementary_prompts=[
+            SupplementaryPromptSchema(style="visual", prompt="Draw a diagram."),
+        ],
+        is_recommended=False,
+        quiz=build_quiz_schema(questions),
+    )
@@ -0,0 +1,130 @@
+from datetime import timedelta
+from unittest import mock
+
+import pytest
+from django.core.cache import cache
+from django.utils import timezone
+
+from biilim.ai.agents import ANIMATION_ERROR_DESCRIPTION
+from biilim.ai.agents import AnimationSchema
+from biilim.learn.animations import evict_animations
+from biilim.learn.animations import get_animation
+from biilim.learn.animations import profile_fingerprint
+from biilim.learn.models import Animation
+from biilim.learn.models import Section
+from biilim.learn.tests.factories import ProfileFactory
+from biilim.learn.tests.factories import TopicFactory
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture(autouse=True)
+def _clear_cache():
+    cache.clear()
+
+
+@pytest.fixture(autouse=True)
+def eviction_task():
+    with mock.patch("biilim.learn.tasks.evict_stored_animations.delay") as delay:
+        yield delay
+
+
+@pytest.fixture
+def agent():
+    with mock.patch(
+        "biilim.learn.animations.get_html_animation_for_topic",
+    ) as get_html_animation_for_topic:
+        get_html_animation_for_topic.return_value = AnimationSchema(
+            full_html_code="<div>orbit</div>",
+            description="Orbit",
+        )
+        yield get_html_animation_for_topic
+
+
+def test_profile_fingerprint_is_coarse():
+    assert (
+        profile_fingerprint(
+            ProfileFactory.build(age=14, learning_styles="visual, simulation"),
+        )
+        == "13-15|simulation,visual"
+    )
+    assert (
+        profile_fingerprint(
+            ProfileFactory.build(age=15, learning_styles="simulation,visual"),
+        )
+        == "13-15|simulation,visual"
+    )
+    assert (
+        profile_fingerprint(ProfileFactory.build(age=None, learning_styles="visual"))
+        == "any|visual"
+    )
+
+
+@pytest.mark.parametrize("hot_cache_timeout", [0, 60])
+def test_similar_profiles_share_stored_animation(
+    agent,
+    eviction_task,
+    settings,
+    hot_cache_timeout,
+):
+    settings.ANIMATION_HOT_CACHE_TIMEOUT = hot_cache_timeout
+    topic = TopicFactory()
+    section = Section.objects.create(topic=topic, title="Orbits")
+
+    first = get_animation(topic, section, ProfileFactory(age=14))
+    second = get_animation(topic, section, ProfileFactory(age=15))
+
+    assert first == second
+    agent.assert_called_once()
+    assert Animation.objects.get().section == section
+    eviction_task.assert_called_once_with()
+
+
+def test_regenerate_replaces_stored_animation(agent):
+    topic, profile = TopicFactory(), ProfileFactory()
+    get_animation(topic, None, profile)
+    agent.return_value = AnimationSchema(
+        full_html_code="<div>new</div>",
+        description="New",
+    )
+
+    assert (
+        get_animation(topic, None, profile, regenerate=True).full_html_code
+        == "<div>new</div>"
+    )
+    assert get_animation(topic, None, profile).full_html_code == "<div>new</div>"
+    assert Animation.objects.get().full_html_code == "<div>new</div>"
+
+
+def test_failed_generation_is_not_stored(agent):
+    agent.return_value = AnimationSchema(
+        full_html_code="<p>Failed</p>",
+        description=ANIMATION_ERROR_DESCRIPTION,
+    )
+
+    get_animation(TopicFactory(), None, ProfileFactory())
+
+    assert not Animation.objects.exists()
+
+
+def test_eviction_drops_expired_and_least_recently_used(settings):
+    rows, max_rows = 4, 2
+    settings.ANIMATION_STORE_MAX_ROWS = max_rows
+    topic = TopicFactory()
+    now = timezone.now()
+    for minutes in range(rows):
+        Animation.objects.create(
+            topic=topic,
+            profile_fingerprint=str(minutes),
+            last_used_at=now - timedelta(minutes=minutes),
+        )
+    Animation.objects.filter(profile_fingerprint="0").update(
+        created_at=now - timedelta(seconds=settings.ANIMATION_STORE_TTL + 1),
+    )
+
+    # One expired, then the least recently used beyond the store size
+    assert evict_animations() == rows - max_rows
+    assert set(Animation.objects.values_list("profile_fingerprint", flat=True)) == {
+        "1",
+        "2",
+    }
@@ -0,0 +1,53 @@
+import pytest
+from django.core.cache import cache
+from django.test import Client
+from django.urls import reverse
+
+from biilim.learn.catalog import get_recommended_topics
+from biilim.learn.tests.factories import TopicFactory
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture(autouse=True)
+def _clear_cache():
+    cache.clear()
+
+
+def test_recommended_topics_are_served_from_cache(django_assert_num_queries):
+    topic = TopicFactory(is_recommended=True)
+    TopicFactory(is_recommended=False)
+
+    assert [item["id"] for item in get_recommended_topics()] == [topic.pk]
+    with django_assert_num_queries(0):
+        assert [item["id"] for item in get_recommended_topics()] == [topic.pk]
+
+
+def test_saving_a_topic_rebuilds_the_feed(django_capture_on_commit_callbacks):
+    topic = TopicFactory(is_recommended=False)
+    assert get_recommended_topics() == []
+
+    with django_capture_on_commit_callbacks(execute=True):
+        topic.is_recommended = True
+        topic.save()
+
+    assert [item["title"] for item in get_recommended_topics()] == [topic.title]
+
+
+def test_topics_listing_pages_with_cursor(client: Client, settings):
+    settings.TOPICS_PAGE_SIZE = 2
+    oldest, middle, newest = TopicFactory.create_batch(3)
+
+    response = client.get(reverse("learn:topics"))
+    assert response.context["topics"] == [newest, middle]
+    more = client.get(
+        reverse("learn:topics"),
+        {"before": response.context["next_cursor"]},
+        HTTP_HX_REQUEST="true",
+    )
+
+    assert more.context["topics"] == [oldest]
+    assert [template.name for template in more.templates] == [
+        "learn/hx_topic_cards.html",
+    ]
+    assert "Show More Topics" not in more.content.decode()
@@ -0,0 +1,106 @@
+from datetime import timedelta
+from unittest import mock
+
+import pytest
+from django.core.cache import cache
+from django.utils import timezone
+
+from biilim.learn.chat_context import build_chat_context
+from biilim.learn.models import ChatMessage
+from biilim.learn.models import ChatSummary
+from biilim.learn.tasks import refresh_chat_summary
+from biilim.learn.tests.factories import ChatMessageFactory
+from biilim.learn.tests.factories import TopicFactory
+from biilim.users.tests.factories import UserFactory
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture(autouse=True)
+def _chat_settings(settings):
+    settings.CHAT_HISTORY_MAX_TURNS = 4
+    settings.CHAT_SUMMARY_REFRESH_EVERY = 2
+    settings.CHAT_CONTEXT_TOKEN_BUDGET = 1_000
+    cache.clear()
+
+
+def create_conversation(messages: int):
+    user, topic = UserFactory(), TopicFactory()
+    start = timezone.now() - timedelta(hours=1)
+    for i in range(messages):
+        message = ChatMessageFactory(
+            user=user,
+            topic=topic,
+            message_text=f"message {i}",
+        )
+        ChatMessage.objects.filter(pk=message.pk).update(
+            created_at=start + timedelta(minutes=i),
+        )
+    return user, topic
+
+
+def test_only_recent_turns_are_included():
+    user, topic = create_conversation(6)
+
+    with mock.patch("biilim.learn.tasks.refresh_chat_summary.delay"):
+        context = build_chat_context(user, topic)
+
+    # The newest message is the one being answered
+    assert [message["message_text"] for message in context.history] == [
+        f"message {i}" for i in range(1, 5)
+    ]
+
+
+def test_token_budget_drops_oldest_turns(settings):
+    user, topic = create_conversation(4)
+    budget = 8
+    settings.CHAT_CONTEXT_TOKEN_BUDGET = budget
+
+    context = build_chat_context(user, topic)
+
+    assert [message["message_text"] for message in context.history] == [
+        "message 1",
+        "message 2",
+    ]
+    assert context.tokens <= budget
+
+
+def test_summary_is_included_and_refresh_scheduled_for_unsummarized_overflow():
+    user, topic = create_conversation(8)
+    ChatSummary.objects.create(
+        user=user,
+        topic=topic,
+        summary_text="They talked about plants.",
+    )
+
+    with mock.patch("biilim.learn.tasks.refresh_chat_summary.delay") as delay:
+        context = build_chat_context(user, topic)
+        build_chat_context(user, topic)
+
+    assert context.summary == "They talked about plants."
+    delay.assert_called_once_with(user.pk, topic.pk)
+
+
+def test_refresh_folds_messages_outside_window_into_summary():
+    user, topic = create_conversation(7)
+
+    with mock.patch(
+        "biilim.learn.tasks.summarize_chat",
+        return_value="Summary.",
+    ) as summarize_chat:
+        refresh_chat_summary(user.pk, topic.pk)
+
+    summarized = [
+        message["message_text"] for message in summarize_chat.call_args.args[1]
+    ]
+    assert summarized == ["message 0", "message 1", "message 2"]
+    summary = ChatSummary.objects.get(user=user, topic=topic)
+    assert summary.summary_text == "Summary."
+    assert (
+        summary.summarized_until
+        == ChatMessage.objects.get(message_text="message 2").created_at
+    )
+
+    with mock.patch("biilim.learn.tasks.summarize_chat") as summarize_chat:
+        refresh_chat_summary(user.pk, topic.pk)
+    summarize_chat.assert_not_called()
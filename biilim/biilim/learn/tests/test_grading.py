@@ -0,0 +1,179 @@
+from datetime import timedelta
+
+import pytest
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from biilim.learn.grading import AnswerKeyEntry
+from biilim.learn.grading import answer_key_cache_key
+from biilim.learn.grading import answer_key_version
+from biilim.learn.grading import attempt_history
+from biilim.learn.grading import best_attempt
+from biilim.learn.grading import get_answer_key
+from biilim.learn.grading import grade
+from biilim.learn.grading import parse_answers
+from biilim.learn.grading import parse_duration
+from biilim.learn.grading import submit_quiz
+from biilim.learn.models import Quiz
+from biilim.learn.models import StudentAnswer
+from biilim.learn.services import persist_topic_schema
+from biilim.learn.tests.factories import build_topic_schema
+
+pytestmark = pytest.mark.django_db
+
+# The answer key and the previous attempt number
+SUBMIT_SELECTS = 2
+# The attempt and its answers
+SUBMIT_INSERTS = 2
+
+
+@pytest.fixture(autouse=True)
+def _clear_cache():
+    cache.clear()
+
+
+@pytest.fixture
+def graded_quiz(user) -> Quiz:
+    topic = persist_topic_schema(build_topic_schema(sections=1, questions=4), user)
+    return Quiz.objects.get(topic=topic, is_graded=True)
+
+
+def test_grade_in_memory():
+    answer_key = [
+        AnswerKeyEntry(1, 1, "A"),
+        AnswerKeyEntry(2, 2, "B"),
+        AnswerKeyEntry(3, 3, "C"),
+    ]
+
+    result = grade(answer_key, {1: "A", 2: "C", 99: "A"})
+
+    assert [(q.number, q.is_correct, q.is_answered) for q in result.questions] == [
+        (1, True, True),
+        (2, False, True),
+        (3, False, False),
+    ]
+    assert (
+        result.correct_answers,
+        result.total_questions,
+        result.score_percentage,
+    ) == (1, 3, 33)
+
+
+def test_parse_answers_ignores_malformed_fields():
+    data = {
+        "quiz_id": "1",
+        "question-4": "B",
+        "question-x": "A",
+        "question-5": "too long",
+    }
+
+    assert parse_answers(data) == {4: "B"}
+
+
+def test_submit_quiz_reads_key_once_and_inserts_answers_in_bulk(user, graded_quiz):
+    questions = list(graded_quiz.questions.order_by("index"))
+    answered = 3
+    data = {f"question-{q.pk}": "A" for q in questions[:answered]}
+    data[f"question-{questions[answered - 1].pk}"] = "B"
+
+    with CaptureQueriesContext(connection) as ctx:
+        result = submit_quiz(user, graded_quiz, data)
+
+    statements = [q["sql"].lstrip().upper() for q in ctx.captured_queries]
+    selects = [sql for sql in statements if sql.startswith("SELECT")]
+    inserts = [sql for sql in statements if sql.startswith("INSERT")]
+    assert len(selects) == SUBMIT_SELECTS
+    assert len(inserts) == SUBMIT_INSERTS
+    assert result.correct_answers == answered - 1
+    assert [q.is_correct for q in result.questions] == [True, True, False, False]
+    answers = StudentAnswer.objects.filter(user=user, attempt=result.attempt)
+    assert answers.count() == answered
+
+
+def test_submit_quiz_records_numbered_attempts(user, graded_quiz):
+    questions = list(graded_quiz.questions.order_by("index"))
+
+    first = submit_quiz(
+        user,
+        graded_quiz,
+        {f"question-{questions[0].pk}": "A", "duration_seconds": "95"},
+    ).attempt
+    second = submit_quiz(
+        user,
+        graded_quiz,
+        {f"question-{q.pk}": "A" for q in questions},
+    ).attempt
+
+    assert first is not None
+    assert second is not None
+    assert (
+        first.attempt_number,
+        first.score,
+        first.correct_answers,
+        first.total_questions,
+    ) == (1, 25, 1, 4)
+    assert first.duration == timedelta(seconds=95)
+    assert (second.attempt_number, second.score, second.duration) == (2, 100, None)
+
+
+def test_attempt_history_and_best_attempt_are_single_queries(
+    user,
+    graded_quiz,
+    django_assert_num_queries,
+):
+    questions = list(graded_quiz.questions.order_by("index"))
+    correct_answers = (2, 4, 1)
+    for correct in correct_answers:
+        submit_quiz(
+            user,
+            graded_quiz,
+            {f"question-{q.pk}": "A" for q in questions[:correct]},
+        )
+
+    with django_assert_num_queries(1):
+        assert [attempt.score for attempt in attempt_history(user, graded_quiz)] == [
+            25,
+            100,
+            50,
+        ]
+    with django_assert_num_queries(1):
+        best = best_attempt(user, graded_quiz)
+    assert best is not None
+    assert best.attempt_number == correct_answers.index(max(correct_answers)) + 1
+
+
+def test_parse_duration_ignores_implausible_values():
+    assert parse_duration({"duration_seconds": "30"}) == timedelta(seconds=30)
+    assert parse_duration({"duration_seconds": "-1"}) is None
+    assert parse_duration({"duration_seconds": str(60 * 60 * 48)}) is None
+    assert parse_duration({}) is None
+
+
+def test_cached_answer_key_needs_no_queries(graded_quiz, django_assert_num_queries):
+    answer_key = get_answer_key(graded_quiz.pk)
+
+    with django_assert_num_queries(0):
+        assert get_answer_key(graded_quiz.pk) == answer_key
+    assert [entry.number for entry in answer_key] == [1, 2, 3, 4]
+
+
+def test_saving_a_question_invalidates_the_answer_key(
+    graded_quiz,
+    django_capture_on_commit_callbacks,
+):
+    stale_answer_key = get_answer_key(graded_quiz.pk)
+    stale_version = answer_key_version(graded_quiz.pk)
+    question = graded_quiz.questions.order_by("index").first()
+
+    with django_capture_on_commit_callbacks(execute=True):
+        question.correct_answer_letter = "D"
+        question.save()
+    # A grader that read the old questions caches them after the invalidation
+    cache.set(
+        answer_key_cache_key(graded_quiz.pk, stale_version),
+        tuple((entry.question_id, entry.correct_letter) for entry in stale_answer_key),
+    )
+
+    assert answer_key_version(graded_quiz.pk) != stale_version
+    assert get_answer_key(graded_quiz.pk)[0].correct_letter == "D"
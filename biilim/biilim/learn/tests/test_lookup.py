@@ -0,0 +1,89 @@
+import pytest
+
+from biilim.core import metrics
+from biilim.learn.lookup import find_similar_topics
+from biilim.learn.lookup import lookup_topics
+from biilim.learn.lookup import normalize_query
+from biilim.learn.tests.factories import TopicFactory
+
+pytestmark = pytest.mark.django_db
+
+PER_PAGE = 2
+
+
+def found(query: str) -> list:
+    return list(lookup_topics(query, PER_PAGE).get_page(1))
+
+
+@pytest.mark.parametrize(
+    ("query", "expected"),
+    [
+        ("Photosynthesis Basics", "photosynthesi"),
+        ("How photosynthesis works?", "photosynthesi"),
+        ("FOTOSENTEZİN Temelleri", "fotosentezin"),
+        ("Işık ve Gölge", "isik golge"),  # noqa: RUF001
+        ("Python decorators", "python decorator"),
+    ],
+)
+def test_normalize_query(query, expected):
+    assert normalize_query(query) == expected
+
+
+class TestLookupTopics:
+    @pytest.mark.parametrize(
+        "query",
+        ["photosynthesis basics", "how photosynthesis works", "photosyntesis"],
+    )
+    def test_near_duplicates_hit_existing_topic(self, query):
+        topic = TopicFactory(title="Photosynthesis")
+        TopicFactory(title="World War II Causes")
+
+        assert found(query) == [topic]
+
+    def test_description_match(self):
+        topic = TopicFactory(
+            title="How Plants Make Food",
+            description="Chlorophyll and sunlight in leaves.",
+        )
+
+        assert found("chlorophyll") == [topic]
+
+    def test_unrelated_query_misses(self):
+        TopicFactory(
+            title="Photosynthesis",
+            description="Plants turn light into sugar.",
+        )
+
+        assert found("black holes") == []
+
+    def test_records_hit_rate(self):
+        TopicFactory(title="Photosynthesis")
+        hits = metrics.get_counter("topic_lookup.hit")
+        misses = metrics.get_counter("topic_lookup.miss")
+
+        found("photosynthesis basics")
+        found("black holes")
+
+        assert metrics.get_counter("topic_lookup.hit") == hits + 1
+        assert metrics.get_counter("topic_lookup.miss") == misses + 1
+
+    def test_pages_are_fetched_in_the_database(self, django_assert_num_queries):
+        topics = [TopicFactory(title=f"Photosynthesis {number}") for number in range(3)]
+
+        with django_assert_num_queries(2):
+            # The count, then the page
+            page = lookup_topics("photosynthesis", PER_PAGE).get_page(2)
+            page_topics = list(page)
+
+        assert page_topics == [topics[0]]
+        assert "supplementary_prompts" in page_topics[0].get_deferred_fields()
+
+    def test_similar_topics_are_ranked_in_the_database(self):
+        exact = TopicFactory(title="Photosynthesis")
+        close = TopicFactory(title="Photosynthesis in Algae")
+        TopicFactory(title="Photosynthesis in Desert Cactus Plants")
+
+        topics = list(find_similar_topics("photosynthesis basics", limit=2))
+
+        assert topics == [exact, close]
+        assert topics[0].score > topics[1].score  # type: ignore[attr-defined]
@@ -0,0 +1,62 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from biilim.learn.models import Section
+from biilim.learn.search import search_topic_titles
+from biilim.learn.search import search_topics
+from biilim.learn.services import persist_topic_schema
+from biilim.learn.tests.factories import TopicFactory
+from biilim.learn.tests.factories import build_topic_schema
+from biilim.users.tests.factories import UserFactory
+
+pytestmark = pytest.mark.django_db
+
+
+def test_search_vector_is_updated_on_save():
+    topic = TopicFactory(
+        title="Photosynthesis",
+        description="Plants turn light into sugar.",
+    )
+    topic.refresh_from_db()
+
+    assert "photosynthesis" in str(topic.search_vector)
+
+
+def test_section_titles_are_searchable():
+    topic = TopicFactory(title="Plant Biology", description="How plants live.")
+    Section.objects.create(topic=topic, title="Chlorophyll", content="Green pigment.")
+
+    assert list(search_topics("chlorophyll")) == [topic]
+
+
+def test_title_matches_rank_above_description_matches():
+    description_match = TopicFactory(
+        title="Plant Biology",
+        description="Includes photosynthesis.",
+    )
+    title_match = TopicFactory(title="Photosynthesis", description="Light to sugar.")
+
+    assert list(search_topics("photosynthesis")) == [title_match, description_match]
+
+
+def test_partial_words_match_by_trigram_similarity():
+    topic = TopicFactory(title="Photosynthesis", description="Light to sugar.")
+    TopicFactory(title="World War II Causes", description="History.")
+
+    assert not search_topics("photosynth").exists()
+    assert list(search_topic_titles("photosynth")) == [topic]
+
+
+def test_generated_topic_is_indexed_once_with_its_sections():
+    schema = build_topic_schema(sections=2)
+
+    with CaptureQueriesContext(connection) as ctx:
+        topic = persist_topic_schema(schema, UserFactory())
+
+    assert not [
+        query
+        for query in ctx.captured_queries
+        if query["sql"].startswith('UPDATE "learn_topic"')
+    ]
+    assert list(search_topics(schema.sections[1].title)) == [topic]
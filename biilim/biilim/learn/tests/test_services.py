@@ -0,0 +1,62 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from biilim.learn.models import Choice
+from biilim.learn.models import Question
+from biilim.learn.models import Quiz
+from biilim.learn.services import persist_topic_schema
+from biilim.learn.tests.factories import build_topic_schema
+
+pytestmark = pytest.mark.django_db
+
+SECTIONS = 2
+QUESTIONS = 3
+CHOICES = len("ABCD")
+# Topic, sections, quizzes, questions and choices: one INSERT per level
+TREE_LEVELS = 5
+
+
+def _count_queries(schema, user) -> int:
+    with CaptureQueriesContext(connection) as ctx:
+        persist_topic_schema(schema, user)
+    return len(
+        [
+            q
+            for q in ctx.captured_queries
+            if q["sql"].lstrip().upper().startswith("INSERT")
+        ],
+    )
+
+
+def test_persist_topic_schema_builds_whole_tree(user):
+    schema = build_topic_schema(sections=SECTIONS, questions=QUESTIONS)
+
+    topic = persist_topic_schema(schema, user)
+
+    assert topic.created_by == user
+    assert list(topic.sections.values_list("title", flat=True)) == [
+        "Section 0",
+        "Section 1",
+    ]
+    graded_quiz = Quiz.objects.get(topic=topic, is_graded=True)
+    assert list(graded_quiz.questions.values_list("index", flat=True)) == [0, 1, 2]
+    assert (
+        Quiz.objects.filter(section__topic=topic, is_graded=False).count() == SECTIONS
+    )
+    questions = QUESTIONS * (SECTIONS + 1)
+    assert Question.objects.count() == questions
+    assert Choice.objects.count() == questions * CHOICES
+
+
+def test_persist_topic_schema_query_count_is_constant(user):
+    small = _count_queries(
+        build_topic_schema(title="Small", sections=1, questions=1),
+        user,
+    )
+    large = _count_queries(
+        build_topic_schema(title="Large", sections=8, questions=5),
+        user,
+    )
+
+    assert small == large == TREE_LEVELS
@@ -0,0 +1,76 @@
+from unittest import mock
+
+import pytest
+from celery import states
+from django.core.cache import cache
+
+from biilim.learn.singleflight import start_topic_generation
+from biilim.learn.singleflight import topic_generation_lock_key
+
+
+@pytest.fixture
+def generate_topic():
+    with mock.patch("biilim.learn.singleflight.generate_topic") as task:
+        yield task
+
+
+@pytest.fixture
+def job_state():
+    with mock.patch("biilim.learn.singleflight.AsyncResult") as async_result:
+        async_result.return_value.state = states.PENDING
+        yield async_result.return_value
+
+
+@pytest.fixture(autouse=True)
+def _clear_locks():
+    cache.delete(topic_generation_lock_key("black holes"))
+    yield
+    cache.delete(topic_generation_lock_key("black holes"))
+
+
+def test_identical_queries_share_one_job(generate_topic, job_state):
+    first = start_topic_generation(1, "Black holes")
+    follower = start_topic_generation(2, "how black holes work")
+
+    assert follower == first
+    generate_topic.apply_async.assert_called_once_with(
+        args=(1, "Black holes"),
+        task_id=first,
+    )
+
+
+def test_failed_job_lock_is_recovered(generate_topic, job_state):
+    first = start_topic_generation(1, "black holes")
+    job_state.state = states.FAILURE
+
+    second = start_topic_generation(2, "black holes")
+
+    assert second != first
+    generate_topic.apply_async.assert_called_with(
+        args=(2, "black holes"),
+        task_id=second,
+    )
+    assert cache.get(topic_generation_lock_key("black holes")) == second
+
+
+def test_followers_join_the_job_recovering_a_failed_lock(generate_topic, job_state):
+    first = start_topic_generation(1, "black holes")
+    job_state.state = states.FAILURE
+    key = topic_generation_lock_key("black holes")
+    # Another follower won the recovery and is about to start its job
+    cache.add(f"{key}:recover:{first}", "recovering-job")
+
+    with mock.patch("biilim.learn.singleflight.time.sleep") as sleep:
+        joined = start_topic_generation(2, "black holes")
+
+    assert joined == "recovering-job"
+    sleep.assert_not_called()
+    generate_topic.apply_async.assert_called_once()
+    generate_topic.delay.assert_not_called()
+
+
+def test_expired_lock_starts_new_job(generate_topic, job_state):
+    first = start_topic_generation(1, "black holes")
+    cache.delete(topic_generation_lock_key("black holes"))  # TTL elapsed
+
+    assert start_topic_generation(2, "black holes") != first
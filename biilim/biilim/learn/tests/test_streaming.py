@@ -0,0 +1,62 @@
+from unittest import mock
+
+import pytest
+from asgiref.sync import async_to_sync
+
+from biilim.core import metrics
+from biilim.learn.models import ChatMessage
+from biilim.learn.streaming import astream_chat_reply
+from biilim.learn.tests.factories import ChatMessageFactory
+from biilim.learn.tests.factories import ProfileFactory
+
+pytestmark = pytest.mark.django_db
+
+
+async def fake_reply(*texts):
+    for text in texts:
+        yield text
+
+
+@pytest.fixture
+def message():
+    profile = ProfileFactory()
+    return ChatMessageFactory(user=profile.user, message_text="Why is the sky blue?")
+
+
+def test_tokens_are_streamed_and_answer_is_saved(message):
+    async def consume():
+        return [
+            event
+            async for event in astream_chat_reply(message, profile=message.user.profile)
+        ]
+
+    with mock.patch(
+        "biilim.learn.streaming.astream_student_reply",
+        return_value=fake_reply("Rayleigh ", "<scattering>\n"),
+    ):
+        events = async_to_sync(consume)()
+
+    assert events == [
+        "event: token\ndata: Rayleigh \n\n",
+        "event: token\ndata: &lt;scattering&gt;<br>\n\n",
+        "event: done\ndata: \n\n",
+    ]
+    answer = ChatMessage.objects.get(sender="ai")
+    assert answer.message_text == "Rayleigh <scattering>\n"
+    assert answer.chat_type == "general_chat"
+    assert metrics.get_counter("chat.ttft.count") >= 1
+
+
+def test_partial_answer_is_saved_when_client_disconnects(message):
+    async def disconnect_after_first_event():
+        events = astream_chat_reply(message, profile=message.user.profile)
+        await anext(events)
+        await events.aclose()
+
+    with mock.patch(
+        "biilim.learn.streaming.astream_student_reply",
+        return_value=fake_reply("Rayleigh ", "scattering"),
+    ):
+        async_to_sync(disconnect_after_first_event)()
+
+    assert ChatMessage.objects.get(sender="ai").message_text == "Rayleigh "
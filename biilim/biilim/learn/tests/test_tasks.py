@@ -0,0 +1,232 @@
+from unittest import mock
+
+import pytest
+from celery.exceptions import Retry
+from celery.exceptions import SoftTimeLimitExceeded
+from celery.result import EagerResult
+
+from biilim.ai.agents import AnimationSchema
+from biilim.ai.resilience import LLMUnavailableError
+from biilim.ai.resilience import call_deadline
+from biilim.core.concurrency import cache_semaphore
+from biilim.learn.animations import profile_fingerprint
+from biilim.learn.models import Animation
+from biilim.learn.models import Question
+from biilim.learn.models import SupplementaryMaterial
+from biilim.learn.models import Topic
+from biilim.learn.tasks import generate_material
+from biilim.learn.tasks import generate_topic
+from biilim.learn.tasks import generate_topic_materials
+from biilim.learn.tasks import pregenerate_animation
+from biilim.learn.tasks import refresh_chat_summary
+from biilim.learn.tests.factories import ProfileFactory
+from biilim.learn.tests.factories import TopicFactory
+from biilim.learn.tests.factories import build_topic_schema
+
+pytestmark = pytest.mark.django_db
+
+SECTIONS = 2
+QUESTIONS = 2
+
+
+def test_generate_topic_persists_topic(settings):
+    profile = ProfileFactory()
+    schema = build_topic_schema(sections=SECTIONS, questions=QUESTIONS)
+    settings.CELERY_TASK_ALWAYS_EAGER = True
+
+    with (
+        mock.patch(
+            "biilim.learn.tasks.generate_topic_json",
+            return_value=schema.model_dump_json(),
+        ),
+        mock.patch(
+            "biilim.learn.tasks.generate_topic_materials.delay",
+        ) as generate_topic_materials,
+    ):
+        task_result = generate_topic.delay(profile.user.pk, "photosynthesis")
+
+    assert isinstance(task_result, EagerResult)
+    generate_topic_materials.assert_called_once_with(task_result.result)
+    topic = Topic.objects.get(pk=task_result.result)
+    assert topic.title == schema.title
+    assert topic.created_by == profile.user
+    assert topic.sections.count() == SECTIONS
+    # The questions of the topic quiz and of each section quiz
+    assert Question.objects.count() == QUESTIONS * (SECTIONS + 1)
+
+
+def test_generate_topic_reuses_topic_with_same_title(settings):
+    profile = ProfileFactory()
+    schema = build_topic_schema()
+    existing = Topic.objects.create(title=schema.title)
+    settings.CELERY_TASK_ALWAYS_EAGER = True
+
+    with (
+        mock.patch(
+            "biilim.learn.tasks.generate_topic_json",
+            return_value=schema.model_dump(),
+        ),
+        mock.patch(
+            "biilim.learn.tasks.generate_topic_materials.delay",
+        ) as generate_topic_materials,
+    ):
+        task_result = generate_topic.delay(profile.user.pk, "photosynthesis")
+
+    assert task_result.result == existing.pk
+    assert Topic.objects.count() == 1
+    generate_topic_materials.assert_not_called()
+
+
+def test_topic_materials_are_generated_in_the_background(settings):
+    settings.CELERY_TASK_ALWAYS_EAGER = True
+    profile = ProfileFactory(learning_styles="visual,kinesthetic")
+    schema = build_topic_schema(sections=SECTIONS)
+    with mock.patch("biilim.learn.tasks.generate_topic_materials.delay"):
+        topic = Topic.objects.get(pk=generate_topic_with(schema, profile))
+
+    with (
+        mock.patch(
+            "biilim.learn.tasks.generate_supplementary_material",
+            return_value="Draw it.",
+        ) as material,
+        mock.patch(
+            "biilim.learn.animations.get_html_animation_for_topic",
+            return_value=AnimationSchema(
+                full_html_code="<div></div>",
+                description="Diagram",
+            ),
+        ) as agent,
+        mock.patch("biilim.learn.tasks.evict_stored_animations.delay"),
+    ):
+        generate_topic_materials.delay(topic.pk)
+
+    material.assert_called_once()
+    assert SupplementaryMaterial.objects.get(topic=topic).status == "ready"
+    # The topic itself and both sections
+    assert agent.call_count == SECTIONS + 1
+    assert set(
+        Animation.objects.filter(topic=topic).values_list("status", flat=True),
+    ) == {"ready"}
+
+
+def test_material_waits_for_a_free_ai_slot(settings):
+    settings.AI_BACKGROUND_CONCURRENCY = 1
+    topic = TopicFactory()
+    material = SupplementaryMaterial.objects.create(
+        topic=topic,
+        style="visual",
+        prompt="Draw it.",
+    )
+
+    with (
+        cache_semaphore("ai_background", 1, timeout=60),
+        mock.patch(
+            "biilim.learn.tasks.generate_supplementary_material",
+        ) as generate_supplementary_material,
+        pytest.raises(Retry),
+    ):
+        generate_material.apply(args=(material.pk,), throw=True)
+
+    generate_supplementary_material.assert_not_called()
+    material.refresh_from_db()
+    assert material.status == "pending"
+
+
+def test_material_is_failed_once_retries_ran_out(settings):
+    settings.AI_BACKGROUND_CONCURRENCY = 1
+    material = SupplementaryMaterial.objects.create(
+        topic=TopicFactory(),
+        style="visual",
+        prompt="Draw it.",
+    )
+
+    with cache_semaphore("ai_background", 1, timeout=60):
+        generate_material.apply(
+            args=(material.pk,),
+            retries=generate_material.max_retries,
+            throw=True,
+        )
+
+    material.refresh_from_db()
+    assert material.status == "failed"
+
+
+def test_material_is_retried_after_the_time_limit():
+    material = SupplementaryMaterial.objects.create(
+        topic=TopicFactory(),
+        style="visual",
+        prompt="Draw it.",
+    )
+
+    with (
+        mock.patch(
+            "biilim.learn.tasks.generate_supplementary_material",
+            side_effect=SoftTimeLimitExceeded(),
+        ),
+        pytest.raises(Retry),
+    ):
+        generate_material.apply(args=(material.pk,), throw=True)
+
+    material.refresh_from_db()
+    assert material.status == "pending"
+
+
+def test_material_is_failed_when_the_llm_is_unavailable():
+    material = SupplementaryMaterial.objects.create(
+        topic=TopicFactory(),
+        style="visual",
+        prompt="Draw it.",
+    )
+
+    with mock.patch(
+        "biilim.learn.tasks.generate_supplementary_material",
+        side_effect=LLMUnavailableError("material call exceeded its deadline"),
+    ):
+        generate_material.apply(args=(material.pk,), throw=True)
+
+    material.refresh_from_db()
+    assert material.status == "failed"
+
+
+def test_animation_stays_pending_after_the_time_limit():
+    profile = ProfileFactory()
+    topic = TopicFactory(created_by=profile.user)
+    animation = Animation.objects.create(
+        topic=topic,
+        profile_fingerprint=profile_fingerprint(profile),
+        status="pending",
+    )
+
+    with (
+        mock.patch(
+            "biilim.learn.animations.get_html_animation_for_topic",
+            side_effect=SoftTimeLimitExceeded(),
+        ),
+        pytest.raises(Retry),
+    ):
+        pregenerate_animation.apply(args=(animation.pk,), throw=True)
+
+    animation.refresh_from_db()
+    assert animation.status == "pending"
+
+
+def generate_topic_with(schema, profile) -> int:
+    with mock.patch(
+        "biilim.learn.tasks.generate_topic_json",
+        return_value=schema.model_dump_json(),
+    ):
+        return generate_topic.delay(profile.user.pk, schema.title).result
+
+
+@pytest.mark.parametrize(
+    ("task", "call_type"),
+    [
+        (generate_topic, "topic"),
+        (refresh_chat_summary, "summary"),
+        (generate_material, "material"),
+        (pregenerate_animation, "animation"),
+    ],
+)
+def test_llm_tasks_outlive_the_call_deadline(settings, task, call_type):
+    assert call_deadline(call_type) < task.soft_time_limit
+    assert task.soft_time_limit < settings.CELERY_TASK_TIME_LIMIT
@@ -0,0 +1,524 @@
+from datetime import timedelta
+from http import HTTPStatus
+from unittest import mock
+
+import pytest
+from asgiref.sync import async_to_sync
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from biilim.ai.agents import AnimationSchema
+from biilim.learn.animations import profile_fingerprint
+from biilim.learn.models import Animation
+from biilim.learn.models import ChatMessage
+from biilim.learn.models import Choice
+from biilim.learn.models import Quiz
+from biilim.learn.models import SupplementaryMaterial
+from biilim.learn.services import persist_topic_schema
+from biilim.learn.tests.factories import ChatMessageFactory
+from biilim.learn.tests.factories import ProfileFactory
+from biilim.learn.tests.factories import TopicFactory
+from biilim.learn.tests.factories import build_topic_schema
+from biilim.users.models import Profile
+
+pytestmark = pytest.mark.django_db
+
+
+async def fake_reply(*texts):
+    for text in texts:
+        yield text
+
+
+def streamed_body(response) -> str:
+    async def consume():
+        return b"".join([part async for part in response.streaming_content])
+
+    return async_to_sync(consume)().decode()
+
+
+class ProfileClient(Client):
+    """A client logged in as the user of ``profile``."""
+
+    profile: Profile
+
+
+@pytest.fixture
+def profile_client() -> ProfileClient:
+    client = ProfileClient()
+    client.profile = ProfileFactory()
+    client.force_login(client.profile.user)
+    return client
+
+
+class TestTopicSearch:
+    def test_existing_topic_is_listed(self, profile_client: ProfileClient):
+        topic = TopicFactory(title="Photosynthesis Basics")
+        with mock.patch(
+            "biilim.learn.views.start_topic_generation",
+        ) as start_topic_generation:
+            response = profile_client.get(
+                reverse("learn:topic_search"),
+                {"query": "photosynthesis"},
+            )
+
+        assert response.status_code == HTTPStatus.OK
+        assert list(response.context["topics"]) == [topic]
+        start_topic_generation.assert_not_called()
+
+    def test_missing_topic_enqueues_generation(self, profile_client: ProfileClient):
+        with mock.patch(
+            "biilim.learn.views.start_topic_generation",
+            return_value="job-1",
+        ) as start_topic_generation:
+            response = profile_client.get(
+                reverse("learn:topic_search"),
+                {"query": "black holes"},
+            )
+
+        assert response.status_code == HTTPStatus.OK
+        assert response.context["job_id"] == "job-1"
+        start_topic_generation.assert_called_once_with(
+            profile_client.profile.user.pk,
+            "black holes",
+        )
+        assert (
+            reverse("learn:hx-topic-generation-status", args=["job-1"])
+            in response.content.decode()
+        )
+
+    def test_only_generation_is_rate_limited(
+        self,
+        profile_client: ProfileClient,
+        settings,
+    ):
+        settings.LLM_RATE_LIMITS = {
+            **settings.LLM_RATE_LIMITS,
+            "topic_search": {"user": "1/m", "global": "100/m"},
+        }
+        cache.clear()
+        TopicFactory(title="Photosynthesis Basics")
+        search_url = reverse("learn:topic_search")
+
+        with mock.patch(
+            "biilim.learn.views.start_topic_generation",
+            return_value="job-1",
+        ) as start_topic_generation:
+            browsing = [
+                profile_client.get(search_url),
+                profile_client.get(search_url, {"query": "photosynthesis"}),
+                profile_client.get(search_url, {"query": "photosynthesis"}),
+            ]
+            generated = profile_client.get(search_url, {"query": "black holes"})
+            limited = profile_client.get(search_url, {"query": "dark matter"})
+
+        assert all(response.status_code == HTTPStatus.OK for response in browsing)
+        assert generated.context["job_id"] == "job-1"
+        assert limited.status_code == HTTPStatus.TOO_MANY_REQUESTS
+        start_topic_generation.assert_called_once()
+
+
+class TestTopicGenerationStatus:
+    def test_unknown_job_is_not_found(self, profile_client: ProfileClient):
+        response = profile_client.get(
+            reverse("learn:hx-topic-generation-status", args=["job-1"]),
+        )
+        assert response.status_code == HTTPStatus.NOT_FOUND
+
+    def test_finished_job_redirects_to_topic(self, profile_client: ProfileClient):
+        topic = TopicFactory()
+        session = profile_client.session
+        session["topic_generation_jobs"] = ["job-1"]
+        session.save()
+
+        with mock.patch("biilim.learn.views.AsyncResult") as async_result:
+            async_result.return_value.successful.return_value = True
+            async_result.return_value.result = topic.pk
+            response = profile_client.get(
+                reverse("learn:hx-topic-generation-status", args=["job-1"]),
+            )
+
+        assert response.status_code == HTTPStatus.OK
+        assert response["HX-Redirect"] == reverse(
+            "learn:topic_detail",
+            kwargs={"pk": topic.pk},
+        )
+
+
+class TestChat:
+    def test_history_loads_newest_page_first(
+        self,
+        profile_client: ProfileClient,
+        settings,
+    ):
+        settings.CHAT_HISTORY_PAGE_SIZE = 2
+        user = profile_client.profile.user
+        first, second, third = ChatMessageFactory.create_batch(
+            3,
+            user=user,
+            topic=TopicFactory(),
+        )
+        url = reverse("learn:hx-get-chat-history-of-topic", args=[first.topic_id])
+
+        response = profile_client.get(url)
+        assert response.context["chat_history"] == [second, third]
+        older = profile_client.get(url, {"before": response.context["next_cursor"]})
+
+        assert older.context["chat_history"] == [first]
+        assert older.context["next_cursor"] is None
+        assert "Load earlier messages" in response.content.decode()
+        assert "Load earlier messages" not in older.content.decode()
+
+    def test_message_is_saved_and_answer_streamed_separately(
+        self,
+        profile_client: ProfileClient,
+    ):
+        topic = TopicFactory()
+        response = profile_client.post(
+            reverse("learn:hx-chat", args=[topic.pk]),
+            {"user_message": "Hi!", "chat_type": "general_chat"},
+        )
+
+        message = ChatMessage.objects.get()
+        assert message.sender == "user"
+        stream_url = reverse(
+            "learn:hx-chat-stream",
+            kwargs={"pk": topic.pk, "message_pk": message.pk},
+        )
+        assert f'sse-connect="{stream_url}"' in response.content.decode()
+
+    def test_stream(self, profile_client: ProfileClient):
+        message = ChatMessageFactory(user=profile_client.profile.user)
+        with mock.patch(
+            "biilim.learn.streaming.astream_student_reply",
+            return_value=fake_reply("Hello"),
+        ):
+            response = profile_client.get(
+                reverse(
+                    "learn:hx-chat-stream",
+                    kwargs={"pk": message.topic_id, "message_pk": message.pk},
+                ),
+            )
+            body = streamed_body(response)
+
+        assert response["Content-Type"] == "text/event-stream"
+        assert body == "event: token\ndata: Hello\n\nevent: done\ndata: \n\n"
+
+    def test_answered_message_is_not_streamed_again(
+        self,
+        profile_client: ProfileClient,
+    ):
+        message = ChatMessageFactory(user=profile_client.profile.user)
+        ChatMessageFactory(user=message.user, topic=message.topic, sender="ai")
+        with mock.patch(
+            "biilim.learn.streaming.astream_student_reply",
+        ) as astream_student_reply:
+            response = profile_client.get(
+                reverse(
+                    "learn:hx-chat-stream",
+                    kwargs={"pk": message.topic_id, "message_pk": message.pk},
+                ),
+            )
+            body = streamed_body(response)
+
+        assert body == "event: done\ndata: \n\n"
+        astream_student_reply.assert_not_called()
+
+    def test_later_user_message_does_not_count_as_an_answer(
+        self,
+        profile_client: ProfileClient,
+    ):
+        message = ChatMessageFactory(user=profile_client.profile.user)
+        # Sent from another tab before this message's stream connected
+        ChatMessageFactory(user=message.user, topic=message.topic, sender="user")
+        with mock.patch(
+            "biilim.learn.streaming.astream_student_reply",
+            return_value=fake_reply("Hello"),
+        ):
+            response = profile_client.get(
+                reverse(
+                    "learn:hx-chat-stream",
+                    kwargs={"pk": message.topic_id, "message_pk": message.pk},
+                ),
+            )
+            body = streamed_body(response)
+
+        assert body == "event: token\ndata: Hello\n\nevent: done\ndata: \n\n"
+
+    def test_other_users_message_is_not_found(self, profile_client: ProfileClient):
+        message = ChatMessageFactory()
+        response = profile_client.get(
+            reverse(
+                "learn:hx-chat-stream",
+                kwargs={"pk": message.topic_id, "message_pk": message.pk},
+            ),
+        )
+        assert response.status_code == HTTPStatus.NOT_FOUND
+
+
+class TestTopicDetail:
+    @pytest.fixture(autouse=True)
+    def _clear_cache(self):
+        cache.clear()
+
+    def test_topic_body_is_rendered_from_fragment_cache(
+        self,
+        profile_client: ProfileClient,
+    ):
+        topic = persist_topic_schema(
+            build_topic_schema(sections=2, questions=2),
+            profile_client.profile.user,
+        )
+        url = reverse("learn:topic_detail", args=[topic.pk])
+        profile_client.get(url)
+
+        with CaptureQueriesContext(connection) as ctx:
+            response = profile_client.get(url)
+
+        tables = ("learn_section", "learn_quiz", "learn_question", "learn_choice")
+        assert not [
+            query
+            for query in ctx.captured_queries
+            if any(table in query["sql"] for table in tables)
+        ]
+        for section in topic.sections.all():
+            assert section.title in response.content.decode()
+
+    def test_choice_change_invalidates_topic_fragments(
+        self,
+        profile_client: ProfileClient,
+    ):
+        topic = persist_topic_schema(
+            build_topic_schema(sections=1, questions=1),
+            profile_client.profile.user,
+        )
+        url = reverse("learn:topic_detail", args=[topic.pk])
+        profile_client.get(url)
+
+        choice = Choice.objects.filter(question__quiz__topic=topic).first()
+        assert choice is not None
+        choice.text = "Freshly edited choice"
+        choice.save()
+
+        assert "Freshly edited choice" in profile_client.get(url).content.decode()
+
+    def test_quiz_forms_send_csrf_token_as_header(self, profile_client: ProfileClient):
+        topic = persist_topic_schema(
+            build_topic_schema(sections=1, questions=1),
+            profile_client.profile.user,
+        )
+
+        content = profile_client.get(
+            reverse("learn:topic_detail", args=[topic.pk]),
+        ).content.decode()
+
+        assert "csrfmiddlewaretoken" not in content.split('id="ai-chatbox"')[0]
+        assert 'hx-headers=\'{"X-CSRFToken": "' in content
+
+
+class TestBackgroundMaterials:
+    def test_topic_detail_preloads_pending_animation_and_materials(
+        self,
+        profile_client: ProfileClient,
+    ):
+        topic = TopicFactory()
+        Animation.objects.create(
+            topic=topic,
+            profile_fingerprint=profile_fingerprint(profile_client.profile),
+            status="pending",
+        )
+        SupplementaryMaterial.objects.create(
+            topic=topic,
+            style="kinesthetic",
+            prompt="Build a model.",
+        )
+
+        response = profile_client.get(reverse("learn:topic_detail", args=[topic.pk]))
+
+        assert response.context["preload_topic_animation"]
+        assert response.context["materials_pending"]
+        assert (
+            reverse("learn:hx-supplementary-materials", args=[topic.pk])
+            in response.content.decode()
+        )
+
+    def test_stale_pending_material_stops_polling_and_can_be_retried(
+        self,
+        profile_client: ProfileClient,
+        settings,
+        django_capture_on_commit_callbacks,
+    ):
+        topic = TopicFactory()
+        material = SupplementaryMaterial.objects.create(
+            topic=topic,
+            style="kinesthetic",
+            prompt="Build a model.",
+        )
+        SupplementaryMaterial.objects.filter(pk=material.pk).update(
+            updated_at=timezone.now()
+            - timedelta(seconds=settings.SUPPLEMENTARY_MATERIAL_PENDING_TIMEOUT + 1),
+        )
+        retry_url = reverse(
+            "learn:hx-retry-supplementary-material",
+            args=[topic.pk, material.pk],
+        )
+
+        response = profile_client.get(
+            reverse("learn:hx-supplementary-materials", args=[topic.pk]),
+        )
+        assert not response.context["materials_pending"]
+        assert retry_url in response.content.decode()
+
+        with (
+            mock.patch(
+                "biilim.learn.views.generate_material.delay",
+            ) as generate_material,
+            django_capture_on_commit_callbacks(execute=True),
+        ):
+            retried = profile_client.post(retry_url)
+            again = profile_client.post(retry_url)
+
+        assert retried.context["materials_pending"]
+        assert again.context["materials_pending"]
+        generate_material.assert_called_once_with(material.pk)
+
+    def test_pending_animation_renders_placeholder(self, profile_client: ProfileClient):
+        topic = TopicFactory()
+        Animation.objects.create(
+            topic=topic,
+            profile_fingerprint=profile_fingerprint(profile_client.profile),
+            status="pending",
+        )
+
+        with mock.patch(
+            "biilim.learn.animations.get_html_animation_for_topic",
+        ) as agent:
+            response = profile_client.get(
+                reverse(
+                    "learn:hx-get-visual-helpers-topic",
+                    kwargs={"topic_pk": topic.pk},
+                ),
+            )
+
+        agent.assert_not_called()
+        assert "Preparing the visualization" in response.content.decode()
+
+    def test_only_generation_counts_against_the_visual_helpers_limits(
+        self,
+        profile_client: ProfileClient,
+        settings,
+    ):
+        settings.LLM_RATE_LIMITS = {
+            **settings.LLM_RATE_LIMITS,
+            "visual_helpers": {"user": "1/m", "global": "100/m"},
+        }
+        settings.LLM_MAX_CONCURRENCY = 1
+        cache.clear()
+        topic = persist_topic_schema(
+            build_topic_schema(sections=1),
+            profile_client.profile.user,
+        )
+        section = topic.sections.get()
+        fingerprint = profile_fingerprint(profile_client.profile)
+        Animation.objects.create(
+            topic=topic,
+            profile_fingerprint=fingerprint,
+            full_html_code="<div>stored</div>",
+        )
+        Animation.objects.create(
+            topic=topic,
+            section=section,
+            profile_fingerprint=fingerprint,
+            status="pending",
+        )
+        topic_url = reverse(
+            "learn:hx-get-visual-helpers-topic",
+            kwargs={"topic_pk": topic.pk},
+        )
+        section_url = reverse(
+            "learn:hx-get-visual-helpers-section",
+            kwargs={"topic_pk": topic.pk, "section_pk": section.pk},
+        )
+
+        with (
+            mock.patch("biilim.learn.animations.get_html_animation_for_topic") as agent,
+            mock.patch("biilim.learn.tasks.evict_stored_animations.delay"),
+        ):
+            stored = [profile_client.get(topic_url) for _ in range(3)]
+            polls = [profile_client.get(section_url) for _ in range(3)]
+            agent.assert_not_called()
+
+            agent.return_value = AnimationSchema(
+                full_html_code="<div>new</div>",
+                description="New",
+            )
+            generated = profile_client.get(topic_url, {"regenerate": "1"})
+            limited = profile_client.get(topic_url, {"regenerate": "1"})
+
+        assert all(
+            response.context["animation_code"] == "<div>stored</div>"
+            for response in stored
+        )
+        assert all(
+            "Preparing the visualization" in response.content.decode()
+            for response in polls
+        )
+        assert generated.context["animation_code"] == "<div>new</div>"
+        assert limited.status_code == HTTPStatus.TOO_MANY_REQUESTS
+        assert agent.call_count == 1
+
+
+class TestSubmitQuiz:
+    def test_feedback_lists_wrong_answers(self, profile_client: ProfileClient):
+        topic = persist_topic_schema(
+            build_topic_schema(sections=1, questions=2),
+            profile_client.profile.user,
+        )
+        quiz = Quiz.objects.get(section__topic=topic)
+        first, second = quiz.questions.order_by("index")
+
+        response = profile_client.post(
+            reverse("learn:hx-submit-quiz", args=[topic.pk]),
+            {
+                "quiz_id": quiz.pk,
+                f"question-{first.pk}": "A",
+                f"question-{second.pk}": "C",
+            },
+        )
+
+        assert response.context["correct_answers"] == 1
+        assert "Q2: you chose C, the correct answer is A." in response.content.decode()
+
+    def test_feedback_shows_attempt_and_best_score(self, profile_client: ProfileClient):
+        topic = persist_topic_schema(
+            build_topic_schema(sections=1, questions=2),
+            profile_client.profile.user,
+        )
+        quiz = Quiz.objects.get(section__topic=topic)
+        first, _second = quiz.questions.order_by("index")
+        url = reverse("learn:hx-submit-quiz", args=[topic.pk])
+
+        profile_client.post(url, {"quiz_id": quiz.pk, f"question-{first.pk}": "A"})
+        response = profile_client.post(
+            url,
+            {"quiz_id": quiz.pk, f"question-{first.pk}": "B"},
+        )
+
+        assert "Attempt #2 · Your best score: 50%" in response.content.decode()
+
+    def test_quiz_of_another_topic_is_not_found(self, profile_client: ProfileClient):
+        topic = persist_topic_schema(
+            build_topic_schema(sections=1, questions=1),
+            profile_client.profile.user,
+        )
+        quiz = Quiz.objects.get(topic=topic)
+
+        response = profile_client.post(
+            reverse("learn:hx-submit-quiz", args=[TopicFactory().pk]),
+            {"quiz_id": quiz.pk},
+        )
+
+        assert response.status_code == HTTPStatus.NOT_FOUND
@@ -9,6 +9,21 @@ urlpatterns = [
     # htmx paths
     path("hx/recommended-topics/", view=views.hx_recommended_topics, name="hx-recommended-topics"),
     path("hx/<int:pk>/chat", view=views.hx_chat_about_topic, name="hx-chat"),
+    path(
+        "hx/<int:pk>/chat/<int:message_pk>/stream",
+        view=views.hx_chat_stream,
+        name="hx-chat-stream",
+    ),
+    path(
+        "hx/<int:pk>/supplementary-materials",
+        view=views.hx_supplementary_materials,
+        name="hx-supplementary-materials",
+    ),
+    path(
+        "hx/<int:pk>/supplementary-materials/<int:material_pk>/retry",
+        view=views.hx_retry_supplementary_material,
+        name="hx-retry-supplementary-material",
+    ),
     path("hx/<int:pk>/submit-quiz", view=views.hx_submit_quiz, name="hx-submit-quiz"),
     # URL for topic-level visual helpers (no section_pk)
     path(
@@ -23,6 +38,11 @@ urlpatterns = [
         views.hx_get_visual_helpers,
         name="hx-get-visual-helpers-section",
     ),
+    path(
+        "hx/topic-generation/<str:job_id>/",
+        view=views.hx_topic_generation_status,
+        name="hx-topic-generation-status",
+    ),
     path("hx/<int:pk>/chat-history-of-topic", view=views.get_chat_history_of_topic, name="hx-get-chat-history-of-topic"),
 
 
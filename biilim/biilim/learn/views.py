@@ -1,24 +1,55 @@
 import logging
+from datetime import timedelta
+
+from django.conf import settings
 from django.shortcuts import render, get_object_or_404
-from django.shortcuts import redirect
+from django.shortcuts import aget_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.db import transaction
 from django.contrib import messages
-
+from django.http import Http404
+from django.http import HttpResponseBadRequest
+from django.http import StreamingHttpResponse
+from django.db.models import Q
+from django.urls import reverse
+from django.utils import timezone
+from django.views.decorators.http import require_POST
+from django_htmx.http import HttpResponseClientRedirect
+from celery.result import AsyncResult
+from asgiref.sync import sync_to_async
+
+from biilim.core.pagination import InvalidCursorError
+from biilim.core.pagination import paginate_before
+from biilim.core.ratelimit import limit_concurrency
+from biilim.core.ratelimit import rate_limit
 from biilim.core.views import HtmxHttpRequest
 from biilim.learn.models import Topic
-from biilim.learn.models import Section, Quiz, Question, Choice
-from biilim.learn.models import StudentAnswer
+from biilim.learn.models import Section, Quiz
 from biilim.learn.models import ChatMessage
-from biilim.learn.schemas import TopicSchema
-from biilim.ai.api_client import gemini_generate_topic
-from biilim.ai.api_client import evaluate_student_explanation, chat_with_student
-from biilim.ai.agents import get_html_animation_for_topic
+from biilim.learn.models import SupplementaryMaterial
+from biilim.learn.singleflight import start_topic_generation
+from biilim.learn.tasks import generate_material
+from biilim.learn.catalog import get_recommended_topics
+from biilim.learn.catalog import topics_page
+from biilim.learn.fragments import fragment_version
+from biilim.learn.grading import best_attempt
+from biilim.learn.grading import submit_quiz
+from biilim.learn.lookup import lookup_topics
+from biilim.learn.streaming import astream_chat_reply
+from biilim.learn.streaming import astream_done
+from biilim.learn.animations import get_animation
+from biilim.learn.animations import get_stored_animation
+from biilim.learn.animations import is_animation_pending
+from biilim.learn.animations import preloaded_animation_sections
+from biilim.learn.animations import wants_animations
+from biilim.users.models import Profile
 
 
 
 logger = logging.getLogger(__name__)
 
+TOPIC_GENERATION_JOBS_SESSION_KEY = "topic_generation_jobs"
+
 def index(request):
     """
     Render the index page for the learn app.
@@ -39,35 +70,115 @@ def index(request):
 def topic_detail(request, pk):
     """
     Render the detail page for a specific topic, including all quiz data.
+
+    The sections, quizzes and choices are the same for every learner and are rendered
+    from versioned fragment caches, see ``learn.fragments``. Their querysets are lazy,
+    so they only run when a fragment has to be rendered again.
     """
-    # Fetch topic and all related quiz data in a single, efficient query
-    topic = get_object_or_404(
-        Topic.objects.prefetch_related(
-            'sections__quizzes__questions__choices',  # Quizzes for each section
-            'quizzes__questions__choices'             # Quizzes for the entire topic
-        ), 
-        pk=pk
-    )
-    # Get the main topic quiz (where section is null and it's not graded)
-    # This assumes your main topic quiz is graded and not linked to a section
-    main_topic_quiz = topic.quizzes.filter(section__isnull=True, is_graded=True).first()
+    topic = get_object_or_404(Topic, pk=pk)
+
+    # Visual helpers that are stored or being generated for this profile load right away
+    preloaded_sections = set()
+    if wants_animations(request.user.profile):
+        preloaded_sections = preloaded_animation_sections(topic, request.user.profile)
 
     ctx = {
         "title": topic.title,
         "topic": topic,
-        "sections": topic.sections.all(),
-        "main_topic_quiz": main_topic_quiz,
-
+        "sections": topic.sections.prefetch_related("quizzes__questions__choices"),
+        # The main topic quiz is the graded one, it is not linked to a section
+        "graded_quizzes": topic.quizzes.filter(
+            section__isnull=True,
+            is_graded=True,
+        ).prefetch_related("questions__choices"),
+        "fragment_cache_timeout": settings.TOPIC_FRAGMENT_CACHE_TIMEOUT,
+        "fragment_version": fragment_version(topic),
+        "preload_topic_animation": None in preloaded_sections,
+        "preloaded_section_ids": sorted(
+            section_id for section_id in preloaded_sections if section_id is not None
+        ),
+        **_supplementary_materials_context(topic),
     }
     
     return render(request, "learn/topic_detail.html", ctx)
 
-def topics(request):
+
+def _materials_stale_before():
+    """
+    Materials still pending since before this are given up on, see
+    ``SUPPLEMENTARY_MATERIAL_PENDING_TIMEOUT``.
+    """
+    timeout = settings.SUPPLEMENTARY_MATERIAL_PENDING_TIMEOUT
+    return timezone.now() - timedelta(seconds=timeout)
+
+
+def _supplementary_materials_context(topic) -> dict:
+    materials = list(topic.supplementary_materials.all())
+    stale_before = _materials_stale_before()
+    for material in materials:
+        # Its task died or gave up without marking it: show it as failed, so that
+        # polling stops
+        if material.status == "pending" and material.updated_at < stale_before:
+            material.status = "failed"
+    return {
+        "supplementary_materials": materials,
+        "materials_pending": any(
+            material.status == "pending" for material in materials
+        ),
+    }
+
+
+@login_required
+def hx_supplementary_materials(request: HtmxHttpRequest, pk):
+    """
+    Render the supplementary materials of a topic; the partial keeps polling this view
+    while some of them are still being generated.
+    """
+    topic = get_object_or_404(Topic, pk=pk)
     ctx = {
-        "title": "All Topics",
-        "topics": Topic.objects.all().order_by("-created_at"),
+        "topic": topic,
+        **_supplementary_materials_context(topic),
     }
+    return render(request, "learn/hx_supplementary_materials.html", ctx)
+
+
+@require_POST
+@login_required
+def hx_retry_supplementary_material(request: HtmxHttpRequest, pk, material_pk):
+    """
+    Generate a failed or stale supplementary material again and render the materials,
+    which poll until it is ready.
+    """
+    retried = (
+        SupplementaryMaterial.objects.filter(pk=material_pk, topic_id=pk)
+        .filter(
+            Q(status="failed")
+            | Q(status="pending", updated_at__lt=_materials_stale_before()),
+        )
+        .update(status="pending", updated_at=timezone.now())
+    )
+    if retried:
+        transaction.on_commit(lambda: generate_material.delay(material_pk))
+    return hx_supplementary_materials(request, pk)
+
+def topics(request: HtmxHttpRequest):
+    """
+    Render the topics listing, newest first. Later pages are appended by htmx with
+    the ``before`` cursor of the previous page, see ``learn.catalog``.
+    """
+    cursor = request.GET.get("before")
+    try:
+        page = topics_page(cursor)
+    except InvalidCursorError:
+        return HttpResponseBadRequest("Invalid cursor.")
 
+    ctx = {
+        "title": "All Topics",
+        "topics": page.items,
+        "next_cursor": page.next_cursor,
+    }
+    if request.htmx and cursor:
+        return render(request, "learn/hx_topic_cards.html", ctx)
     return render(request, "learn/topics.html", ctx)
 
 
@@ -86,10 +197,16 @@ def upload(request):
     """
     return render(request, "learn/upload.html", {"title": "Upload Content"})
 
+@transaction.non_atomic_requests
 @login_required
 def topic_search(request):
     """
     Render the topic selection page for the learn app.
+
+    When no existing topic matches the query (see ``lookup_topics``), topic
+    generation is handed off to a Celery job and the page polls its progress
+    until the topic is ready. Only that hand-off is charged to the ``topic_search``
+    rate limit, browsing existing results is not.
     
     Args:
         request: The HTTP request object.
@@ -97,106 +214,76 @@ def topic_search(request):
     Returns:
         HttpResponse: Rendered topic selection page.
     """
-    user = request.user
     query = request.GET.get("query")
+    ctx = {
+        "title": "Search Results",
+        "query": query,
+    }
     if query:
-        ctx = {
-            "title": "Search Results",
-            "query": query,
-        }
-        topics = Topic.objects.filter(title__icontains=query).order_by("-created_at") # NOTE we may increase search functionality later
-        if topics.exists():
-            ctx["topics"] = topics
+        paginator = lookup_topics(query, settings.TOPIC_SEARCH_PAGE_SIZE)
+        page_obj = paginator.get_page(request.GET.get("page"))
+        if page_obj.object_list:
+            ctx["topics"] = page_obj
+            ctx["page_obj"] = page_obj
         else:
-            try:
-                # Call AI to generate topic
-                json_data = gemini_generate_topic(
-                    user_profile=user.profile,
-                    prompt=query,
-                    response_schema=TopicSchema,
-                )
-                
-                with transaction.atomic():
-                    if isinstance(json_data, dict):
-                        generated_topic = TopicSchema.model_validate(json_data)
-                    else:
-                        generated_topic = TopicSchema.model_validate_json(json_data)
-                    
-                    # 1. Convert supplementary prompts to a format suitable for the database
-                    supplementary_prompts_for_db = [p.model_dump() for p in generated_topic.supplementary_prompts]
-                    
-                    # 2. Create the Topic object
-                    new_topic = Topic.objects.create(
-                        title=generated_topic.title,
-                        description=generated_topic.description,
-                        duration=generated_topic.duration,
-                        is_recommended=generated_topic.is_recommended,
-                        supplementary_prompts=supplementary_prompts_for_db,
-                        created_by=user,
-                    )
-                    
-                    # 3. Create Quizzes for each section and the main topic
-                    
-                    # Create Quiz object for the main topic
-                    topic_quiz = Quiz.objects.create(
-                        topic=new_topic,
-                        is_graded=True,
-                    )
-                    # Create questions and choices for the main topic quiz
-                    for question_data in generated_topic.quiz.questions:
-                        new_question = Question.objects.create(
-                            quiz=topic_quiz,
-                            question_text=question_data.question_text,
-                            correct_answer_letter=question_data.correct_answer_letter,
-                        )
-                        for choice_data in question_data.choices:
-                            Choice.objects.create(
-                                question=new_question,
-                                letter=choice_data.letter,
-                                text=choice_data.text,
-                            )
-                    
-                    # 4. Create Sections and their quizzes
-                    for section_data in generated_topic.sections:
-                        new_section = Section.objects.create(
-                            topic=new_topic,
-                            title=section_data.title,
-                            content=section_data.content,
-                            index=section_data.index,
-                        )
-                        
-                        # Create Quiz object for the current section
-                        section_quiz = Quiz.objects.create(
-                            section=new_section,
-                            is_graded=False,
-                        )
-                        # Create questions and choices for the section quiz
-                        for question_data in section_data.quiz.questions:
-                            new_question = Question.objects.create(
-                                quiz=section_quiz,
-                                question_text=question_data.question_text,
-                                correct_answer_letter=question_data.correct_answer_letter,
-                            )
-                            for choice_data in question_data.choices:
-                                Choice.objects.create(
-                                    question=new_question,
-                                    letter=choice_data.letter,
-                                    text=choice_data.text,
-                                )
-
-                    ctx["topic"] = new_topic
-                    messages.success(request, f"Topic '{new_topic.title}' and its quizzes were successfully generated!")
-                    return redirect("learn:topic_detail", pk=new_topic.pk)
-            
-            except Exception as e:
-                msg = f"Error saving generated topic and quizzes: {str(e)}"
-                logger.error(msg)
-                messages.error(request, msg)
-
-            return render(request, "learn/topic_search.html", ctx)
-        
+            return _start_topic_generation(request, query, ctx)
+
+    return render(request, "learn/topic_search.html", ctx)
+
+
+@rate_limit("topic_search")
+def _start_topic_generation(request, query: str, ctx: dict):
+    """Hand the generation of ``query`` off to a Celery job within its rate budget."""
+    # Concurrent searches for the same query share a single generation job
+    job_id = start_topic_generation(request.user.pk, query)
+    # Remember the job so only the users waiting on it can poll it
+    request.session[TOPIC_GENERATION_JOBS_SESSION_KEY] = [
+        *request.session.get(TOPIC_GENERATION_JOBS_SESSION_KEY, [])[-9:],
+        job_id,
+    ]
+    ctx["job_id"] = job_id
+    ctx["step"] = "queued"
     return render(request, "learn/topic_search.html", ctx)
 
+
+@login_required
+def hx_topic_generation_status(request: HtmxHttpRequest, job_id):
+    """
+    Handle HTMX polling for a topic generation job.
+
+    Args:
+        request: The HTMX HTTP request object.
+        job_id: The Celery task id returned by ``topic_search``.
+
+    Returns:
+        HttpResponse: A client redirect to the topic once it is ready, otherwise
+        the progress partial.
+    """
+    if job_id not in request.session.get(TOPIC_GENERATION_JOBS_SESSION_KEY, []):
+        msg = "Unknown topic generation job."
+        raise Http404(msg)
+
+    result = AsyncResult(job_id)
+    ctx = {"job_id": job_id, "step": "queued"}
+
+    if result.successful():
+        topic = get_object_or_404(Topic, pk=result.result)
+        messages.success(
+            request,
+            f"Topic '{topic.title}' and its quizzes were successfully generated!",
+        )
+        return HttpResponseClientRedirect(
+            reverse("learn:topic_detail", kwargs={"pk": topic.pk}),
+        )
+
+    if result.failed():
+        logger.error("Error generating topic for job %s: %s", job_id, result.result)
+        ctx["error"] = "We couldn't generate this topic. Please try again."
+    elif result.state == "PROGRESS" and isinstance(result.info, dict):
+        ctx["step"] = result.info.get("step", "queued")
+
+    return render(request, "learn/hx_topic_generation_status.html", ctx)
+
 def hx_recommended_topics(request: HtmxHttpRequest):
     """
     Handle HTMX request to fetch recommended topics.
@@ -207,15 +294,25 @@ def hx_recommended_topics(request: HtmxHttpRequest):
     Returns:
         HttpResponse: Rendered HTMX response with recommended topics.
     """
-    recommended_topics = Topic.objects.filter(is_recommended=True).order_by("-created_at")[:6]
-    return render(request, "learn/hx_recommended_topics.html", {"recommended_topics": recommended_topics})
+    return render(
+        request,
+        "learn/hx_recommended_topics.html",
+        {"recommended_topics": get_recommended_topics()},
+    )
 
 from django.http import HttpResponse
 
+@transaction.non_atomic_requests
 @login_required
-def hx_chat_about_topic(request:HtmxHttpRequest, pk):
+@rate_limit("chat")
+async def hx_chat_about_topic(request:HtmxHttpRequest, pk):
     """
     Handle HTMX request to chat about a specific topic.
+
+    Saves the user's message and renders it together with an empty AI bubble that
+    streams the answer from ``hx_chat_stream`` over Server-Sent Events. The view is
+    async, so it is non-atomic; the message is saved with a single query.
+
     Args:
         request: The HTMX HTTP request object.
         pk: The primary key of the topic to chat about.
@@ -225,41 +322,27 @@ def hx_chat_about_topic(request:HtmxHttpRequest, pk):
     """
     chat_type = request.POST.get("chat_type")
     user_message = request.POST.get("user_message")
-    user = request.user
-    profile = user.profile
-    topic = Topic.objects.get(pk=pk)
+    user = await request.auser()
+    topic = await aget_object_or_404(Topic, pk=pk)
     if not user_message:
         # If user sends an empty message, return an empty response (HTMX will do nothing)
         return HttpResponse("") 
-    # 1. Save User's Message to the database
-    ChatMessage.objects.create(
+    # Save User's Message to the database; the AI's answer is saved when its stream ends
+    message = await ChatMessage.objects.acreate(
         user=user,
         topic=topic,
         sender="user",
         message_text=user_message,
-        chat_type=chat_type
+        chat_type=chat_type,
     )
-    ai_response = ""
-    if chat_type == "explanation":
-        # Assumed this function returns a string with the AI's feedback
-        ai_response = evaluate_student_explanation(user_message, topic=topic, profile=profile)
-    else:
-        # Assumed this function returns a string with the AI's chat response
-        ai_response = chat_with_student(user_message, topic=topic, profile=profile)
 
-    # 2. Save the AI's Response to the database
-    ChatMessage.objects.create(
-        user=user,
-        topic=topic,
-        sender="ai",
-        message_text=ai_response,
-        chat_type="evaluation_feedback" if chat_type == "explanation" else "general_chat"
-    )
-
-    # 3. Render ONLY the new user message and AI response using your partial
+    # Render ONLY the new user message and the streaming AI bubble using your partial
     ctx = {
         "user_message": user_message, # Pass the actual message text
-        "ai_response": ai_response,
+        "stream_url": reverse(
+            "learn:hx-chat-stream",
+            kwargs={"pk": topic.pk, "message_pk": message.pk},
+        ),
         "chat_type": chat_type, # This might be useful for conditional styling in the partial
     }
     
@@ -267,11 +350,88 @@ def hx_chat_about_topic(request:HtmxHttpRequest, pk):
     return render(request, "learn/hx_chat_message.html", ctx)
 
 
+@transaction.non_atomic_requests
+@login_required
+@limit_concurrency
+async def hx_chat_stream(request: HtmxHttpRequest, pk, message_pk):
+    """
+    Stream the AI's answer to one of the user's chat messages as Server-Sent Events.
+
+    The view is async: under ASGI an open stream waits on the LLM without holding a
+    worker thread. It is non-atomic, and the answer is saved when the stream ends.
+
+    Args:
+        request: The HTTP request object of the ``EventSource``.
+        pk: The primary key of the topic.
+        message_pk: The primary key of the user's message to answer.
+    Returns:
+        StreamingHttpResponse: A ``text/event-stream`` response.
+    """
+    user = await request.auser()
+    message = await aget_object_or_404(
+        ChatMessage.objects.select_related("topic", "user"),
+        pk=message_pk,
+        topic_id=pk,
+        user=user,
+        sender="user",
+    )
+    answered = await ChatMessage.objects.filter(
+        user=user,
+        topic_id=pk,
+        sender="ai",
+        created_at__gt=message.created_at,
+    ).aexists()
+    if answered:
+        # EventSource reconnects must not generate (and bill) the answer twice
+        events = astream_done()
+    else:
+        profile = await Profile.objects.aget(user=user)
+        events = astream_chat_reply(message, profile=profile)
+
+    response = StreamingHttpResponse(events, content_type="text/event-stream")
+    response["Cache-Control"] = "no-cache"
+    # Stop nginx from buffering the stream
+    response["X-Accel-Buffering"] = "no"
+    return response
+
+
 @login_required
 def get_chat_history_of_topic(request, pk):
-    topic = Topic.objects.get(pk=pk)
-    chat_history = ChatMessage.objects.filter(user=request.user, topic=topic).order_by('created_at')
-    return render(request, "learn/hx_chat_messages_list.html", {"chat_history": chat_history})
+    """
+    Render one page of the user's chat history about a topic, oldest message first.
+
+    The newest page is rendered first; a "load earlier" trigger at its top fetches the
+    page before it with the ``before`` cursor, see ``core.pagination``.
+
+    Args:
+        request: The HTTP request object.
+        pk: The primary key of the topic.
+    Returns:
+        HttpResponse: Rendered HTMX partial with the messages of the page.
+    """
+    cursor = request.GET.get("before")
+    messages_of_topic = ChatMessage.objects.filter(user=request.user, topic_id=pk).only(
+        "pk",
+        "created_at",
+        "sender",
+        "message_text",
+    )
+    try:
+        page = paginate_before(
+            messages_of_topic,
+            cursor,
+            settings.CHAT_HISTORY_PAGE_SIZE,
+        )
+    except InvalidCursorError:
+        return HttpResponseBadRequest("Invalid cursor.")
+
+    ctx = {
+        "topic_pk": pk,
+        "chat_history": page.items[::-1],
+        "next_cursor": page.next_cursor,
+        "is_first_page": not cursor,
+    }
+    return render(request, "learn/hx_chat_messages_list.html", ctx)
 
 
 @login_required
@@ -293,60 +453,51 @@ def hx_submit_quiz(request: HtmxHttpRequest, pk):
     user = request.user
     topic = get_object_or_404(Topic, pk=pk)
 
-    try:
-        quiz_id = request.POST.get("quiz_id")
-        quiz = get_object_or_404(Quiz, pk=quiz_id)
-
-        correct_answers_count = 0
-        total_questions_count = quiz.questions.count()
-        
-        # Use a transaction to ensure all answers are saved or none are
-        with transaction.atomic():
-            for question in quiz.questions.all():
-                # The name of the input is 'question-{{ question.pk }}'
-                student_answer_letter = request.POST.get(f"question-{question.pk}")
-                
-                if student_answer_letter:
-                    is_correct = (student_answer_letter == question.correct_answer_letter)
-                    
-                    if is_correct:
-                        correct_answers_count += 1
-                        
-                    # Save the student's answer to the database
-                    StudentAnswer.objects.create(
-                        user=user,
-                        question=question,
-                        selected_choice_letter=student_answer_letter,
-                        is_correct=is_correct
-                    )
-        
-        # Calculate the score
-        score_percentage = (correct_answers_count / total_questions_count) * 100 if total_questions_count > 0 else 0
-        
-        # Prepare context for the feedback partial
-        ctx = {
-            "is_graded": quiz.is_graded,
-            "score_percentage": int(score_percentage),
-            "correct_answers": correct_answers_count,
-            "total_questions": total_questions_count,
-            "quiz_id": quiz_id,
-        }
-        
-        # Return the rendered feedback partial
-        return render(request, "learn/hx_quiz_feedback.html", ctx)
+    quiz_id = request.POST.get("quiz_id", "")
+    if not quiz_id.isdigit():
+        return HttpResponseBadRequest("Invalid quiz.")
+    # The quiz must belong to the topic, directly or through one of its sections
+    quizzes = Quiz.objects.filter(Q(topic=topic) | Q(section__topic=topic))
+    quiz = get_object_or_404(quizzes, pk=quiz_id)
 
-    except Exception as e:
+    try:
+        result = submit_quiz(user, quiz, request.POST)
+    except Exception:
         # Log the error for debugging
-        # logger.error(f"Error submitting quiz for topic {pk}: {e}")
-        return HttpResponse(f"An error occurred: {str(e)}", status=500)
+        logger.exception("Error submitting quiz for topic %s", pk)
+        return HttpResponse(
+            "An error occurred while grading your quiz. Please try again.",
+            status=500,
+        )
 
+    # Prepare context for the feedback partial
+    ctx = {
+        "is_graded": quiz.is_graded,
+        "score_percentage": result.score_percentage,
+        "correct_answers": result.correct_answers,
+        "total_questions": result.total_questions,
+        "question_results": result.questions,
+        "quiz_id": quiz.pk,
+    }
+    if result.attempt is not None and (best := best_attempt(user, quiz)) is not None:
+        ctx["attempt_number"] = result.attempt.attempt_number
+        ctx["best_score"] = best.score
 
+    # Return the rendered feedback partial
+    return render(request, "learn/hx_quiz_feedback.html", ctx)
 
 
+@transaction.non_atomic_requests
 @login_required
-def hx_get_visual_helpers(request: HtmxHttpRequest, topic_pk, section_pk=None):
+async def hx_get_visual_helpers(request: HtmxHttpRequest, topic_pk, section_pk=None):
     """
     Handles HTMX request to get visual helpers (HTML animations) from the AI agent.
+    Stored animations are served when available, see ``learn.animations``; pass
+    ``?regenerate=1`` to generate a new one. Only generating an animation counts
+    against the ``visual_helpers`` rate limit and takes a concurrency slot: stored
+    animations and the polls of pending ones are served without either. The view is
+    async and non-atomic; the agent is synchronous, so it runs in a thread and no
+    transaction is held open while it works.
     
     Args:
         request: The HTTP request.
@@ -356,42 +507,79 @@ def hx_get_visual_helpers(request: HtmxHttpRequest, topic_pk, section_pk=None):
     Returns:
         HttpResponse: A rendered HTML partial with the generated animation code.
     """
-    user_profile = request.user.profile
-    preferred_styles = [s.strip() for s in user_profile.learning_styles.split(',')]
+    user_profile = await Profile.objects.aget(user=await request.auser())
     
     # Ensure 'simulation' or 'visual' is in preferred styles for this feature
-    if 'simulation' not in preferred_styles and 'visual' not in preferred_styles:
+    if not wants_animations(user_profile):
         return HttpResponse('<div class="alert alert-warning">Interactive visualizations are not enabled for your learning style.</div>')
     
-    topic = get_object_or_404(Topic, pk=topic_pk)
-    section_title = None
+    topic = await aget_object_or_404(Topic, pk=topic_pk)
+    section = None
     
     if section_pk:
-        section = get_object_or_404(Section, pk=section_pk, topic=topic)
-        section_title = section.title
-
-    # Prepare user profile data for the agent
-    user_profile_data = {
-        "age": user_profile.age,
-        "city": user_profile.city,
-        "country": user_profile.country,
-        "hobbies": user_profile.hobbies,
-        "learning_styles": user_profile.learning_styles,
+        section = await aget_object_or_404(Section, pk=section_pk, topic=topic)
+
+    if section:
+        helper_url = reverse(
+            "learn:hx-get-visual-helpers-section",
+            kwargs={"topic_pk": topic.pk, "section_pk": section.pk},
+        )
+    else:
+        helper_url = reverse(
+            "learn:hx-get-visual-helpers-topic",
+            kwargs={"topic_pk": topic.pk},
+        )
+    source_title = section.title if section else topic.title
+
+    ctx = {
+        "source_type": "section" if section_pk else "topic",
+        "source_title": source_title,
+        "regenerate_url": f"{helper_url}?regenerate=1",
     }
-    
-    # Call the AI agent to get the HTML animation
-    animation_data = get_html_animation_for_topic(
-        topic_title=topic.title,
-        topic_description=topic.description,
-        user_profile=user_profile_data,
-        section_title=section_title
+
+    # Serve the stored animation for similar profiles unless a new one is asked for
+    if request.GET.get("regenerate") != "1":
+        if await sync_to_async(is_animation_pending)(topic, section, user_profile):
+            # Still being generated in the background since the topic was created
+            return render(
+                request,
+                "learn/hx_visual_helpers_pending.html",
+                {"poll_url": helper_url, "source_title": source_title},
+            )
+        animation_data = await sync_to_async(get_stored_animation)(
+            topic,
+            section,
+            user_profile,
+        )
+        if animation_data is not None:
+            return _render_visual_helpers(request, animation_data, ctx)
+
+    return await _hx_generate_visual_helpers(request, topic, section, user_profile, ctx)
+
+
+@rate_limit("visual_helpers")
+@limit_concurrency
+async def _hx_generate_visual_helpers(
+    request: HtmxHttpRequest,
+    topic,
+    section,
+    user_profile,
+    ctx,
+):
+    """Run the visual helper agent within its rate budget and a concurrency slot."""
+    animation_data = await sync_to_async(get_animation)(
+        topic,
+        section,
+        user_profile,
+        regenerate=True,
     )
-    
+    return _render_visual_helpers(request, animation_data, ctx)
+
+
+def _render_visual_helpers(request: HtmxHttpRequest, animation_data, ctx):
     ctx = {
+        **ctx,
         "animation_code": animation_data.full_html_code,
         "animation_description": animation_data.description,
-        "source_type": "section" if section_pk else "topic",
-        "source_title": section_title if section_pk else topic.title
     }
-    
     return render(request, 'learn/hx_visual_helpers.html', ctx)
@@ -0,0 +1,12 @@
+import htmx from 'htmx.org';
+
+// htmx extensions register themselves on the global htmx object
+window.htmx = htmx;
+
+// Rate limited requests (429) come with a partial explaining when to try again
+document.addEventListener('htmx:beforeSwap', (event) => {
+  if (event.detail.xhr.status === 429) {
+    event.detail.shouldSwap = true;
+    event.detail.isError = false;
+  }
+});
@@ -1,6 +1,7 @@
 import '@popperjs/core';
 import * as bootstrap from 'bootstrap';
-import 'htmx.org';
+import './htmx';
+import 'htmx-ext-sse';
 
 
-window.bootstrap = bootstrap;
\ No newline at end of file
+window.bootstrap = bootstrap;
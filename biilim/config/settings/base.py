@@ -48,6 +48,8 @@ LOCALE_PATHS = [str(BASE_DIR / "locale")]
 # https://docs.djangoproject.com/en/dev/ref/settings/#databases
 DATABASES = {"default": env.db("DATABASE_URL")}
 DATABASES["default"]["ATOMIC_REQUESTS"] = True
+# Views waiting on LLM calls opt out with @transaction.non_atomic_requests and open
+# short transactions around their writes, so no connection idles in a transaction.
 # https://docs.djangoproject.com/en/stable/ref/settings/#std:setting-DEFAULT_AUTO_FIELD
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
@@ -69,6 +71,7 @@ DJANGO_APPS = [
     "django.contrib.staticfiles",
     # "django.contrib.humanize", # Handy template tags
     "django.contrib.admin",
+    "django.contrib.postgres",
     "django.forms",
 ]
 THIRD_PARTY_APPS = [
@@ -146,6 +149,8 @@ MIDDLEWARE = [
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
     "allauth.account.middleware.AccountMiddleware",
+    "biilim.core.middleware.TransactionTimingMiddleware",
+    "biilim.ai.middleware.AICallOriginMiddleware",
 ]
 
 # STATIC
@@ -339,4 +344,124 @@ WEBPACK_LOADER = {
 }
 # Your stuff...
 # ------------------------------------------------------------------------------
+# Milliseconds a request may hold database transactions before the time is recorded as
+# the db.transaction_held timing, see core.middleware.
+DB_TRANSACTION_HELD_THRESHOLD_MS = env.int("DB_TRANSACTION_HELD_THRESHOLD_MS", default=200)
+# Expose the time held to the browser devtools in a Server-Timing header.
+DB_TRANSACTION_SERVER_TIMING = env.bool("DB_TRANSACTION_SERVER_TIMING", default=DEBUG)
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
+# Overrides the Gemini API endpoint, e.g. to point at a local stub server.
+GEMINI_BASE_URL = env("GEMINI_BASE_URL", default=None)
+# Read timeout of a single Gemini request, in milliseconds.
+GEMINI_TIMEOUT = env.int("GEMINI_TIMEOUT", default=60_000)
+# TCP/TLS connect timeout of a Gemini request, in seconds.
+GEMINI_CONNECT_TIMEOUT = env.float("GEMINI_CONNECT_TIMEOUT", default=5.0)
+# Keep-alive connections kept per process to the Gemini API.
+GEMINI_POOL_MAXSIZE = env.int("GEMINI_POOL_MAXSIZE", default=10)
+# LLM backend of the AI features: "gemini", or "stub" to replay the recorded responses of
+# LLM_STUB_RESPONSES_DIR offline, e.g. for benchmarks and capacity tests.
+LLM_PROVIDER = env("LLM_PROVIDER", default="gemini")
+# Model of the "gemini" backend.
+LLM_MODEL = env("LLM_MODEL", default="gemini-2.0-flash")
+LLM_STUB_RESPONSES_DIR = env("LLM_STUB_RESPONSES_DIR", default=str(APPS_DIR / "ai" / "example_responses"))
+# Simulated latency of a "stub" response (or its first streamed word) and its random
+# +/- jitter, and the delay between streamed words, in milliseconds.
+LLM_STUB_LATENCY = env.float("LLM_STUB_LATENCY", default=800)
+LLM_STUB_JITTER = env.float("LLM_STUB_JITTER", default=200)
+LLM_STUB_CHUNK_LATENCY = env.float("LLM_STUB_CHUNK_LATENCY", default=30)
+# Seconds LLM responses are cached per call type, see ai.response_cache. Call types left
+# out are never cached, like the creative supplementary "material".
+LLM_RESPONSE_CACHE_TTLS = {
+    "topic": 7 * 24 * 60 * 60,
+    "explanation": 24 * 60 * 60,
+    "summary": 24 * 60 * 60,
+    "chat": 10 * 60,
+}
+# Responses kept in each process' in-memory tier of the LLM response cache.
+LLM_RESPONSE_CACHE_LOCAL_SIZE = env.int("LLM_RESPONSE_CACHE_LOCAL_SIZE", default=256)
+# Concurrent Gemini connections per event loop for async views (one loop per ASGI worker).
+GEMINI_ASYNC_MAX_CONNECTIONS = env.int("GEMINI_ASYNC_MAX_CONNECTIONS", default=100)
+# Minimum similarity (0-1) for topic_search to reuse an existing topic instead of generating one.
+TOPIC_LOOKUP_THRESHOLD = env.float("TOPIC_LOOKUP_THRESHOLD", default=0.5)
+# Weight of a match on the topic description compared to a match on its title.
+TOPIC_LOOKUP_DESCRIPTION_WEIGHT = env.float("TOPIC_LOOKUP_DESCRIPTION_WEIGHT", default=0.6)
+# Seconds a topic generation lock lives; concurrent identical searches share the job meanwhile.
+TOPIC_GENERATION_LOCK_TTL = env.int("TOPIC_GENERATION_LOCK_TTL", default=5 * 60)
+# Topics per page in topic_search results.
+TOPIC_SEARCH_PAGE_SIZE = env.int("TOPIC_SEARCH_PAGE_SIZE", default=12)
+# Topics topic_search lists at most, i.e. over all of its pages.
+TOPIC_SEARCH_MAX_RESULTS = env.int("TOPIC_SEARCH_MAX_RESULTS", default=120)
+# Most recent chat messages sent verbatim with every chat prompt.
+CHAT_HISTORY_MAX_TURNS = env.int("CHAT_HISTORY_MAX_TURNS", default=12)
+# Estimated tokens the chat summary and recent messages may take in a prompt together.
+CHAT_CONTEXT_TOKEN_BUDGET = env.int("CHAT_CONTEXT_TOKEN_BUDGET", default=2_000)
+# Messages that must fall out of the recent window before the chat summary is refreshed.
+CHAT_SUMMARY_REFRESH_EVERY = env.int("CHAT_SUMMARY_REFRESH_EVERY", default=6)
+# Seconds before another chat summary refresh can be queued for the same conversation.
+CHAT_SUMMARY_REFRESH_TTL = env.int("CHAT_SUMMARY_REFRESH_TTL", default=60)
+# Messages folded into the chat summary per refresh, and the summary's length limit in tokens.
+CHAT_SUMMARY_BATCH_SIZE = env.int("CHAT_SUMMARY_BATCH_SIZE", default=50)
+CHAT_SUMMARY_MAX_TOKENS = env.int("CHAT_SUMMARY_MAX_TOKENS", default=300)
+# Seconds a stored visual helper animation is served before it is regenerated.
+ANIMATION_STORE_TTL = env.int("ANIMATION_STORE_TTL", default=30 * 24 * 60 * 60)
+# Stored animations kept; the least recently used ones beyond this are evicted.
+ANIMATION_STORE_MAX_ROWS = env.int("ANIMATION_STORE_MAX_ROWS", default=5_000)
+# Seconds recently served animations stay in the cache; 0 disables the hot tier.
+ANIMATION_HOT_CACHE_TIMEOUT = env.int("ANIMATION_HOT_CACHE_TIMEOUT", default=60 * 60)
+# Minimum seconds between two runs of the animation eviction task.
+ANIMATION_EVICTION_INTERVAL = env.int("ANIMATION_EVICTION_INTERVAL", default=60 * 60)
+# Stored animations still pending after this many seconds are generated on demand instead.
+ANIMATION_PENDING_TIMEOUT = env.int("ANIMATION_PENDING_TIMEOUT", default=10 * 60)
+# Supplementary materials still pending after this many seconds are shown as failed, with a
+# button to generate them again, e.g. when their worker died.
+SUPPLEMENTARY_MATERIAL_PENDING_TIMEOUT = env.int("SUPPLEMENTARY_MATERIAL_PENDING_TIMEOUT", default=15 * 60)
+# AI calls the background materials tasks may run at the same time across all workers,
+# and the Celery rate limit of each of those tasks per worker.
+AI_BACKGROUND_CONCURRENCY = env.int("AI_BACKGROUND_CONCURRENCY", default=4)
+AI_BACKGROUND_RATE_LIMIT = env("AI_BACKGROUND_RATE_LIMIT", default="30/m")
+# Seconds quiz answer keys stay cached; they are also dropped whenever a question changes.
+ANSWER_KEY_CACHE_TIMEOUT = env.int("ANSWER_KEY_CACHE_TIMEOUT", default=24 * 60 * 60)
+# Chat messages per page of the chat history in topic_detail; older pages load on demand.
+CHAT_HISTORY_PAGE_SIZE = env.int("CHAT_HISTORY_PAGE_SIZE", default=30)
+# Seconds the learner-independent fragments of topic_detail stay cached; content changes
+# move them to new keys right away.
+TOPIC_FRAGMENT_CACHE_TIMEOUT = env.int("TOPIC_FRAGMENT_CACHE_TIMEOUT", default=24 * 60 * 60)
+# Topics per page of the topics listing; later pages load on demand.
+TOPICS_PAGE_SIZE = env.int("TOPICS_PAGE_SIZE", default=20)
+# Token buckets of the LLM-backed views as "<requests>/<s|m|h>": the burst size, refilled
+# evenly over the period. "user" applies to each user, "global" to all users together.
+LLM_RATE_LIMITS = {
+    "topic_search": {"user": "10/m", "global": "300/m"},
+    "chat": {"user": "20/m", "global": "600/m"},
+    "visual_helpers": {"user": "6/m", "global": "120/m"},
+}
+# LLM calls the web workers may have in flight at the same time across all processes,
+# and the seconds after which a slot of a crashed request frees itself.
+LLM_MAX_CONCURRENCY = env.int("LLM_MAX_CONCURRENCY", default=16)
+LLM_CONCURRENCY_SLOT_TIMEOUT = env.int("LLM_CONCURRENCY_SLOT_TIMEOUT", default=5 * 60)
+# Seconds all attempts of an LLM call may take together, per call type, see ai.resilience.
+LLM_CALL_DEADLINES = {
+    "topic": 120,
+    "explanation": 30,
+    "chat": 30,
+    "summary": 60,
+    "material": 60,
+    "animation": 120,
+}
+# Seconds a Celery task making an LLM call may run past the call's deadline before its
+# soft time limit, for the task's own queries; see ai.resilience.task_soft_time_limit.
+LLM_TASK_TIME_LIMIT_MARGIN = env.int("LLM_TASK_TIME_LIMIT_MARGIN", default=30)
+# Attempts of an LLM call failing with a transient error, and the base and maximum of
+# the jittered exponential backoff between them, in seconds.
+LLM_RETRY_ATTEMPTS = env.int("LLM_RETRY_ATTEMPTS", default=3)
+LLM_RETRY_BASE_DELAY = env.float("LLM_RETRY_BASE_DELAY", default=0.5)
+LLM_RETRY_MAX_DELAY = env.float("LLM_RETRY_MAX_DELAY", default=8.0)
+# Transient LLM failures within the window (seconds) that open the circuit breaker, and
+# the seconds it fails calls fast before letting a probe call through.
+LLM_CIRCUIT_FAILURE_THRESHOLD = env.int("LLM_CIRCUIT_FAILURE_THRESHOLD", default=5)
+LLM_CIRCUIT_FAILURE_WINDOW = env.int("LLM_CIRCUIT_FAILURE_WINDOW", default=60)
+LLM_CIRCUIT_RESET_TIMEOUT = env.int("LLM_CIRCUIT_RESET_TIMEOUT", default=30)
+# USD per million prompt and output tokens of each model, for the cost in ai_call_stats.
+LLM_TOKEN_PRICES = {
+    "gemini-2.0-flash": (0.10, 0.40),
+}